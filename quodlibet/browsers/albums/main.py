@@ -38,6 +38,7 @@ from quodlibet.qltk.views import AllTreeView
 from quodlibet.qltk.x import MenuItem, ScrolledWindow, RadioMenuItem
 from quodlibet.qltk.x import SymbolicIconImage
 from quodlibet.query import Query
+from quodlibet.unisearch import fold
 from quodlibet.util import connect_obj, DeferredSignal
 from quodlibet.util import copool, connect_destroy, cmp
 from quodlibet.util.i18n import numeric_phrase
@@ -501,6 +502,13 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate, DisplayPatternMixi
 
         self.__bg_filter = background_filter()
         self.__filter = None
+        # folded words of a free text search, checked before the filter
+        self.__words = None
+        # (words, background) of the last free text search and the albums
+        # shown since, a superset of what a narrower search can show
+        self.__last_search = None
+        self.__matched = None
+        self.__candidates = None
         model_filter.set_visible_func(self.__parse_query)
 
         render = Gtk.CellRendererPixbuf()
@@ -672,11 +680,29 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate, DisplayPatternMixi
         model = self.view.get_model()
 
         self.__filter = None
+        self.__words = None
         query = self.__search.get_query(star=["~people", "album"])
         if not query.matches_all:
             self.__filter = query.search
+            if query.words:
+                self.__words = [fold(word) for word in query.words]
         self.__bg_filter = background_filter()
 
+        # If every word of the last search is part of a word of this one,
+        # only the albums shown for the last search can match this one.
+        words = query.words
+        background = config.gettext("browsers", "background")
+        last = self.__last_search
+        if (
+            words
+            and last is not None
+            and last[1] == background
+            and all(any(old in new for new in words) for old in last[0])
+        ):
+            self.__candidates = self.__matched
+        self.__last_search = (words, background) if words else None
+        self.__matched = set() if words else None
+
         self.__inhibit()
 
         # We could be smart and try to scroll to a selected album
@@ -688,7 +714,10 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate, DisplayPatternMixi
 
         # Don't filter on restore if there is nothing to filter
         if not restore or self.__filter or self.__bg_filter:
-            model.refilter()
+            try:
+                model.refilter()
+            finally:
+                self.__candidates = None
 
         self.__uninhibit()
 
@@ -701,12 +730,24 @@ class AlbumList(Browser, util.InstanceTracker, VisibleUpdate, DisplayPatternMixi
             album = model.get_album(iter_)
             if album is None:
                 return True
-            elif b is None:
-                return f(album)
+            candidates = self.__candidates
+            if candidates is not None and album not in candidates:
+                return False
+            words = self.__words
+            if words is not None:
+                text = album.search_text
+                for word in words:
+                    if word not in text:
+                        return False
+            if b is None:
+                visible = f(album)
             elif f is None:
-                return b(album)
+                visible = b(album)
             else:
-                return b(album) and f(album)
+                visible = b(album) and f(album)
+            if visible and self.__matched is not None:
+                self.__matched.add(album)
+            return visible
 
     def __search_func(self, model, column, key, iter_, data):
         album = model.get_album(iter_)
@@ -15,7 +15,9 @@ from http.client import HTTPException
 from os.path import splitext
 from threading import Thread
 from collections.abc import Collection, Callable, Iterable
-from urllib.request import urlopen
+from email.utils import formatdate
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
 
 import re
 from gi.repository import Gtk, GLib, Pango
@@ -30,6 +32,8 @@ from quodlibet import util
 from quodlibet import config
 
 from quodlibet.browsers import Browser
+from quodlibet.formats import read_audio_files, write_audio_files
+from quodlibet.formats import SerializationError
 from quodlibet.formats.remote import RemoteFile
 from quodlibet.formats._audio import TAG_TO_SORT, MIGRATE, AudioFile
 from quodlibet.library import SongLibrary
@@ -38,8 +42,9 @@ from quodlibet.qltk.getstring import GetStringDialog
 from quodlibet.qltk.songsmenu import SongsMenu
 from quodlibet.qltk.notif import Task
 from quodlibet.qltk import Icons, ErrorMessage, WarningMessage
-from quodlibet.util import copool, connect_destroy, sanitize_tags, connect_obj
+from quodlibet.util import connect_destroy, sanitize_tags, connect_obj
 from quodlibet.util.i18n import numeric_phrase
+from quodlibet.util.atomic import atomic_save
 from quodlibet.util.path import uri_is_valid
 from quodlibet.util.string import decode, encode
 from quodlibet.util import print_w
@@ -51,6 +56,7 @@ from quodlibet.qltk.x import MenuItem, Align, ScrolledWindow, Button
 STATION_LIST_URL = "https://quodlibet.github.io/radio/radiolist.bz2"
 STATIONS_FAV = os.path.join(quodlibet.get_user_dir(), "stations")
 STATIONS_ALL = os.path.join(quodlibet.get_user_dir(), "stations_all")
+STATIONS_CACHE = os.path.join(quodlibet.get_user_dir(), "stations_cache")
 
 # TODO: - Ranking: reduce duplicate stations (max 3 URLs per station)
 #                  prefer stations that match a genre?
@@ -267,74 +273,139 @@ def _get_stations_from(
     on_done(irfs, uri)
 
 
-def download_taglist(url, callback, cofuncid, step=1024 * 10):
-    """Generator for loading the bz2 compressed tag list.
-
-    Calls callback with the decompressed data or None in case of
-    an error."""
+def _read_taglist_lines(fileobj, step, on_read):
+    """Yields the lines of the bz2 compressed tag list in fileobj, reading
+    and decompressing `step` bytes at a time. Calls `on_read` with the
+    number of compressed bytes read so far."""
+
+    decomp = bz2.BZ2Decompressor()
+    rest = b""
+    read = 0
+    while not decomp.eof:
+        temp = fileobj.read(step)
+        if not temp:
+            raise EOFError("Unexpected end of station list")
+        read += len(temp)
+        on_read(read)
+        lines = decomp.decompress(temp).split(b"\n")
+        # only the last, incomplete line is carried over
+        lines[0] = rest + lines[0]
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def download_taglist(url, callback, step=1024 * 10, cache=None):
+    """Downloads and parses the bz2 compressed tag list, returning the
+    stations or None in case of an error.
+
+    Blocks, so it's meant to be run in a thread. The progress task only
+    gets touched from the main loop, where callback gets called with the
+    same result once done.
+
+    If the filename `cache` is given the stations get written there in the
+    binary library format and are read from it instead if the list didn't
+    change since.
+    """
 
-    with Task(_("Internet Radio"), _("Downloading station list")) as task:
-        if cofuncid:
-            task.copool(cofuncid)
+    tasks = []
 
-        try:
-            response = urlopen(url)
-        except (OSError, HTTPException) as e:
-            print_e(f"Failed fetching from {url}", e)
-            GLib.idle_add(callback, None)
-            return
-        try:
-            size = int(response.info().get("content-length", 0))
-        except ValueError:
-            size = 0
+    def start_task():
+        tasks.append(Task(_("Internet Radio"), _("Downloading station list")))
 
-        decomp = bz2.BZ2Decompressor()
+    def update_task(frac):
+        for task in tasks:
+            if frac is None:
+                task.pulse()
+            else:
+                task.update(frac)
+
+    def finish(stations):
+        for task in tasks:
+            task.finish()
+        callback(stations)
+
+    GLib.idle_add(start_task)
+    try:
+        stations = _download_taglist(url, step, cache, update_task)
+    except Exception:
+        util.print_exc()
+        stations = None
+    GLib.idle_add(finish, stations)
+    return stations
 
-        data = b""
-        temp = b""
-        read = 0
-        while temp or not data:
-            read += len(temp)
 
-            if size:
-                task.update(float(read) / size)
-            else:
-                task.pulse()
-            yield True
+def _download_taglist(url, step, cache, update_task):
+    request = Request(url)
+    if cache is not None and os.path.exists(cache):
+        modified = formatdate(os.path.getmtime(cache), usegmt=True)
+        request.add_header("If-Modified-Since", modified)
 
-            try:
-                data += decomp.decompress(temp)
-                temp = response.read(step)
-            except (OSError, EOFError):
-                data = None
-                break
+    try:
+        response = urlopen(request)
+    except HTTPError as e:
+        if e.code == 304:
+            return _read_cached_taglist(cache)
+        print_e(f"Failed fetching from {url}", e)
+        return None
+    except (OSError, HTTPException) as e:
+        print_e(f"Failed fetching from {url}", e)
+        return None
+    try:
+        size = int(response.info().get("content-length", 0))
+    except ValueError:
+        size = 0
+
+    def on_read(read):
+        GLib.idle_add(update_task, float(read) / size if size else None)
+
+    try:
+        lines = _read_taglist_lines(response, step, on_read)
+        stations = list(iter_taglist(lines))
+    except (OSError, EOFError) as e:
+        print_e(f"Failed reading station list from {url}", e)
+        return None
+    finally:
         response.close()
 
-        yield True
+    print_d(f"Got {len(stations)} station(s)")
+    if stations and cache is not None:
+        _write_cached_taglist(cache, stations)
+    return stations or None
 
-        stations = None
-        if data:
-            stations = parse_taglist(data)
-        print_d(f"Got {len(stations or [])} station(s)")
-        GLib.idle_add(callback, stations)
 
+def _read_cached_taglist(cache):
+    try:
+        with open(cache, "rb") as fileobj:
+            stations = read_audio_files(fileobj)
+    except (OSError, SerializationError) as e:
+        print_w(f"Couldn't read cached station list {cache!r} ({e})")
+        try:
+            # so the next update downloads the list again
+            os.utime(cache, (0, 0))
+        except OSError:
+            pass
+        return None
+    print_d(f"Station list unchanged, got {len(stations)} cached station(s)")
+    return stations or None
 
-def parse_taglist(data):
-    """Parses a dump file like list of tags and returns a list of IRFiles
 
-    uri=http://...
-    tag=value1
-    tag2=value
-    tag=value2
-    uri=http://...
-    ...
+def _write_cached_taglist(cache, stations):
+    try:
+        with atomic_save(cache, "wb") as fileobj:
+            write_audio_files(fileobj, stations)
+    except (OSError, SerializationError) as e:
+        print_w(f"Couldn't cache station list to {cache!r} ({e})")
 
-    """
 
-    stations = []
+def iter_taglist(lines):
+    """Parses the lines of a dump file like list of tags and yields IRFiles,
+    see `parse_taglist`"""
+
     station = None
 
-    for l in data.split(b"\n"):
+    for l in lines:
         if not l:
             continue
         key = l.split(b"=")[0]
@@ -343,7 +414,7 @@ def parse_taglist(data):
         value = decode(value)
         if key == "uri":
             if station:
-                stations.append(station)
+                yield station
             station = IRFile(value)
             continue
 
@@ -366,9 +437,22 @@ def parse_taglist(data):
             station[key] = value
 
     if station:
-        stations.append(station)
+        yield station
 
-    return stations
+
+def parse_taglist(data):
+    """Parses a dump file like list of tags and returns a list of IRFiles
+
+    uri=http://...
+    tag=value1
+    tag2=value
+    tag=value2
+    uri=http://...
+    ...
+
+    """
+
+    return list(iter_taglist(data.split(b"\n")))
 
 
 class AddNewStation(GetStringDialog):
@@ -709,15 +793,20 @@ class InternetRadio(Browser, util.InstanceTracker):
 
     def __update(self, *args):
         self.qbar.hide()
-        copool.add(
-            download_taglist,
-            self.station_list_url,
-            self.__update_done,
-            cofuncid="radio-load",
-            funcid="radio-load",
-        )
+        self._update_button.set_sensitive(False)
+
+        Thread(
+            target=download_taglist,
+            args=(self.station_list_url, self.__update_done),
+            kwargs={"cache": STATIONS_CACHE},
+            daemon=True,
+        ).start()
 
     def __update_done(self, stations):
+        if self.__stations is None:
+            # the browser got destroyed while loading
+            return
+        self._update_button.set_sensitive(True)
         if not stations:
             print_w("Loading remote station list failed.")
             return
@@ -110,27 +110,40 @@ class PaneModel(ObjectStore):
         super().__init__()
         self.__sort_cache = {}  # text to sort text cache
         self.__key_cache = {}  # song to key cache
+        self.__rows = {}  # entry key to iter, for all SongsEntry rows
+        self.__song_keys = {}  # song to the entry keys it was added to
+        self.__empty = set()  # keys of entries left without songs
         self.config = pattern_config
 
+    def __format_keys(self, song):
+        # We filter out empty values, so Unknown can be ""
+        return [v for v in self.config.format(song) if v[0]]
+
     def get_format_keys(self, song):
         try:
             return self.__key_cache[song]
         except KeyError:
-            # We filter out empty values, so Unknown can be ""
-            self.__key_cache[song] = [v for v in self.config.format(song) if v[0]]
+            self.__key_cache[song] = self.__format_keys(song)
             return self.__key_cache[song]
 
-    def __human_sort_key(self, text, reg=re.compile("<.*?>")):
-        try:
-            return self.__sort_cache[text], text
-        except KeyError:
-            # remove the markup so it doesn't affect the sort order
-            if self.config.has_markup:
-                text_stripped = reg.sub("", text)
-            else:
-                text_stripped = text
-            self.__sort_cache[text] = util.human_sort_key(text_stripped)
-            return self.__sort_cache[text], text
+    def __sort_key_for(self, text, reg=re.compile("<.*?>")):
+        # remove the markup so it doesn't affect the sort order
+        if self.config.has_markup:
+            text = reg.sub("", text)
+        return util.human_sort_key(text)
+
+    def get_caches(self):
+        """Copies of the format key and sort key caches, for `group_songs`
+        to read from in a thread
+        """
+
+        return dict(self.__key_cache), dict(self.__sort_cache)
+
+    def clear(self):
+        super().clear()
+        self.__rows.clear()
+        self.__song_keys.clear()
+        self.__empty.clear()
 
     def get_songs(self, paths):
         """Get all songs for the given paths (from a selection e.g.)"""
@@ -141,8 +154,7 @@ class PaneModel(ObjectStore):
 
         first_path = paths[0]
         if isinstance(self[first_path][0], AllEntry):
-            for entry in self.itervalues():
-                s.update(entry.songs)
+            s.update(self.__song_keys)
         else:
             for path in paths:
                 s.update(self[path][0].songs)
@@ -152,55 +164,91 @@ class PaneModel(ObjectStore):
     def get_keys(self, paths):
         return {self[p][0].key for p in paths}
 
+    def __entry_changed(self, key):
+        iter_ = self.__rows[key]
+        entry = self.get_value(iter_)
+        entry.finalize()
+        self.row_changed(self.get_path(iter_), iter_)
+        return entry
+
     def remove_songs(self, songs, remove_if_empty):
         """Remove all songs from the entries.
 
         If remove_if_empty == True, entries with no songs will be removed.
         """
 
-        songs = set(songs)
-
+        changed = set()
         for song in songs:
-            if song in self.__key_cache:
-                del self.__key_cache[song]
-
-        to_remove = []
-        for iter_, entry in self.iterrows():
-            if isinstance(entry, AllEntry):
+            self.__key_cache.pop(song, None)
+            keys = self.__song_keys.pop(song, None)
+            if keys is None:
                 continue
-            entry.songs -= songs
-            entry.finalize()
-            self.row_changed(self.get_path(iter_), iter_)
-            if not entry.songs:
-                to_remove.append(iter_)
+            for key in keys:
+                self.get_value(self.__rows[key]).songs.discard(song)
+            changed.update(keys)
+
+        for key in changed:
+            if not self.__entry_changed(key).songs:
+                self.__empty.add(key)
 
-        if not remove_if_empty:
+        if not remove_if_empty or not self.__empty:
             return
 
-        # remove from cache and the model
-        for iter_ in to_remove:
-            try:
-                key = self.get_value(iter_).key
-                del self.__sort_cache[key]
-            except KeyError:
-                pass
-            self.remove(iter_)
+        # remove from the model, the sort cache stays for the next refresh
+        for key in self.__empty:
+            self.remove(self.__rows.pop(key))
+        self.__empty.clear()
 
         if len(self) == 1 and isinstance(self[0][0], AllEntry):
             # only All is left.. clear everything
             self.clear()
-        elif to_remove and len(self) == 2:
+        elif len(self) == 2 and isinstance(self[0][0], AllEntry):
             # Only one entry + All -> remove All
             self.remove(self.get_iter_first())
 
-    def add_songs(self, songs):
-        """Add new songs to the list, creating new rows"""
+    def __find_position(self, sort_key, lo, hi):
+        """The position of the first row in [lo, hi) sorting after sort_key"""
 
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if sort_key < self.get_value(self.iter_nth_child(None, mid)).sort:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def group_songs(self, songs, cancellable=None, caches=None):
+        """Returns the format keys of all songs, the entries for them
+        sorted, with the entry for songs without keys last, and the sort
+        keys computed on the way.
+
+        This only reads the caches, `add_entries` stores the results. Given
+        a copy of `songs` and of the caches (see `get_caches`) it can be
+        called from a thread.
+        Returns None if `cancellable` gets cancelled in the meantime.
+        """
+
+        key_cache, sort_cache = caches or (self.__key_cache, self.__sort_cache)
+        format_keys = {}
+        sort_keys = {}
         collection = {}
         unknown = UnknownEntry()
-        human_sort = self.__human_sort_key
-        for song in songs:
-            items = self.get_format_keys(song)
+
+        def human_sort(text):
+            hsort = sort_cache.get(text)
+            if hsort is None:
+                hsort = sort_keys.get(text)
+                if hsort is None:
+                    hsort = sort_keys[text] = self.__sort_key_for(text)
+            return hsort, text
+
+        for i, song in enumerate(songs):
+            if cancellable and not i % 1000 and cancellable.is_cancelled():
+                return None
+            items = key_cache.get(song)
+            if items is None:
+                items = self.__format_keys(song)
+            format_keys[song] = items
             if not items:
                 unknown.songs.add(song)
             for key, sort in items:
@@ -216,72 +264,69 @@ class PaneModel(ObjectStore):
                     collection[key] = (entry, hsort, bool(sort))
                     entry.songs.add(song)
 
-        items = sorted(collection.items(), key=lambda s: s[1][1], reverse=True)
-
-        # fast path
-        if not len(self):
-            if unknown.songs:
-                self.insert(0, [unknown])
-            entries = []
-            for _key, (val, _sort_key, _srtp) in items:
-                entries.append(val)
-            self.insert_many(0, reversed(entries))
-            if len(self) > 1:
-                self.insert(0, [AllEntry()])
-            return
+        entries = sorted(
+            (e for e, _sort, _srtp in collection.values()), key=lambda e: e.sort
+        )
+        if unknown.songs:
+            entries.append(unknown)
+        return format_keys, entries, sort_keys
 
-        # insert all new songs
-        key = None
-        val = None
-        sort_key = None
+    def add_songs(self, songs):
+        """Add new songs to the list, creating new rows"""
 
-        for iter_, entry in self.iterrows():
-            if not isinstance(entry, SongsEntry):
-                continue
+        self.add_entries(*self.group_songs(songs))
 
-            if key is None:
-                if not items:
-                    break
-                key, (val, sort_key, srtp) = items.pop(-1)
-
-            if key == entry.key:  # Display strings the same
-                entry.songs |= val.songs
-                entry.finalize()
-                self.row_changed(self.get_path(iter_), iter_)
-                key = None
-            elif sort_key < entry.sort:
-                self.insert_before(iter_, row=[val])
-                key = None
-
-        # the last one failed, add it again
-        if key:
-            items.append((key, (val, sort_key, srtp)))
-
-        # insert the left over songs
-        if items:
-            entries = []
-            for _key, (val, _srt, _srtp) in items:
-                entries.append(val)
-            if isinstance(self[-1][0], UnknownEntry):
-                self.insert_many(len(self) - 1, entries)
+    def add_entries(self, format_keys, entries, sort_keys=None):
+        """Add the result of `group_songs`, merging the entries into the
+        existing rows or creating new ones
+        """
+
+        if sort_keys:
+            self.__sort_cache.update(sort_keys)
+        key_cache = self.__key_cache
+        song_keys = self.__song_keys
+        for song, items in format_keys.items():
+            key_cache.setdefault(song, items)
+            song_keys[song] = [key for key, _sort in items] or [""]
+
+        # merge into existing rows, only new keys need a row
+        rows = self.__rows
+        new = []
+        unknown = None
+        for entry in entries:
+            key = entry.key
+            if key in rows:
+                self.get_value(rows[key]).songs |= entry.songs
+                self.__entry_changed(key)
+                self.__empty.discard(key)
+            elif key:
+                new.append(entry)
+            else:
+                unknown = entry
+
+        # new songs entries go between All and Unknown
+        lo = 1 if len(self) and isinstance(self[0][0], AllEntry) else 0
+        hi = len(self) - 1 if "" in rows else len(self)
+        runs = []
+        for entry in new:
+            lo = self.__find_position(entry.sort, lo, hi)
+            if runs and runs[-1][0] == lo:
+                runs[-1][1].append(entry)
             else:
-                self.append_many(entries)
+                runs.append((lo, [entry]))
+
+        # insert from the back, so the positions of the others stay valid
+        for position, run in reversed(runs):
+            for i, entry in enumerate(run):
+                rows[entry.key] = self.insert(position + i, row=[entry])
+
+        if unknown is not None:
+            rows[""] = self.append(row=[unknown])
 
         # check if All needs to be inserted
         if len(self) > 1 and not isinstance(self[0][0], AllEntry):
             self.insert(0, [AllEntry()])
 
-        # check if Unknown needs to be inserted or updated
-        if unknown.songs:
-            last_row = self[-1]
-            entry = last_row[0]
-            if isinstance(entry, UnknownEntry):
-                entry.songs |= unknown.songs
-                entry.finalize()
-                self.row_changed(last_row.path, last_row.iter)
-            else:
-                self.append(row=[unknown])
-
     def matches(self, paths, song):
         """If the song is included in the selection defined by the paths.
 
@@ -301,11 +346,10 @@ class PaneModel(ObjectStore):
         if not keys and isinstance(self[paths[-1]][0], UnknownEntry):
             return True
 
-        for path in paths:
-            entry = self.get_value(self.get_iter(path))
-            for key in keys:
-                if entry.key == (key[0] if isinstance(key, tuple) else key):
-                    return True
+        selected = {self[path][0].key for path in paths}
+        for key in keys:
+            if (key[0] if isinstance(key, tuple) else key) in selected:
+                return True
 
         return False
 
@@ -16,7 +16,8 @@ from quodlibet.qltk.songsmenu import SongsMenu
 from quodlibet.qltk.properties import SongProperties
 from quodlibet.qltk.information import Information
 from quodlibet.qltk import is_accel
-from quodlibet.util import connect_obj
+from quodlibet.util import connect_obj, copool, print_exc
+from quodlibet.util.thread import call_async, Cancellable
 
 from .models import PaneModel
 from .util import PaneConfig
@@ -28,6 +29,13 @@ class Pane(AllTreeView):
     TARGET_INFO_QL = 1
     TARGET_INFO_URI_LIST = 2
 
+    ASYNC_FILL = 5000
+    """Number of songs from which on the entries get built in a thread"""
+
+    FILL_BATCH = 1000
+    """Number of entries added per main loop iteration when filling from a
+    thread"""
+
     def __init__(self, library, prefs, next_=None):
         super().__init__()
         self.set_fixed_height_mode(True)
@@ -37,6 +45,10 @@ class Pane(AllTreeView):
         self.__restore_values = None
 
         self.__no_fill = 0
+        self.__fill_cancel = None
+        # songs added (None) or removed (remove_if_empty) while filling, to
+        # apply to the new entries
+        self.__pending = []
 
         column = TreeViewColumnButton(title=self.config.title)
 
@@ -175,6 +187,7 @@ class Pane(AllTreeView):
         return self.config.tags
 
     def __destroy(self, *args):
+        self.__cancel_fill()
         # needed for gc
         self.__next = None
 
@@ -201,9 +214,15 @@ class Pane(AllTreeView):
             self.__next.fill(self.__get_selected_songs())
 
     def add(self, songs):
+        if self.__fill_cancel is not None:
+            self.__pending.append((list(songs), None))
+            return
         self.get_model().add_songs(songs)
 
     def remove(self, songs, remove_if_empty=True):
+        if self.__fill_cancel is not None:
+            self.__pending.append((list(songs), remove_if_empty))
+            return
         self.inhibit()
         self.get_model().remove_songs(songs, remove_if_empty)
         self.uninhibit()
@@ -230,6 +249,65 @@ class Pane(AllTreeView):
         self.__no_fill -= 1
 
     def fill(self, songs):
+        """Replace all entries with the ones for songs.
+
+        Entries for many songs get built in a thread and added in batches.
+        Filling again cancels any unfinished fill.
+        """
+
+        self.__cancel_fill()
+        self.__pending.clear()
+        model = self.get_model()
+
+        if len(songs) < self.ASYNC_FILL:
+            self.__fill_sync(songs)
+            return
+
+        # the thread only reads these copies, the model's caches get
+        # updated once the results are added in the main loop
+        songs = list(songs)
+        caches = model.get_caches()
+
+        def group(cancellable):
+            try:
+                return model.group_songs(songs, cancellable, caches)
+            except Exception:
+                print_exc()
+                return None
+
+        def on_grouped(result):
+            if result is not None:
+                copool.add(self.__fill, *result, batch=self.FILL_BATCH, funcid=self)
+                return
+
+            # grouping failed, fill in the main loop instead
+            self.__fill_cancel = None
+            pending = self.__pending[:]
+            self.__pending.clear()
+            self.__fill_sync(songs)
+            for pending_songs, remove_if_empty in pending:
+                if remove_if_empty is None:
+                    self.add(pending_songs)
+                else:
+                    self.remove(pending_songs, remove_if_empty)
+
+        self.__fill_cancel = cancellable = Cancellable()
+        call_async(group, cancellable, on_grouped, (cancellable,))
+
+    def __fill_sync(self, songs):
+        for _ in self.__fill(*self.get_model().group_songs(songs)):
+            pass
+
+    def __cancel_fill(self):
+        if self.__fill_cancel is not None:
+            self.__fill_cancel.cancel()
+            self.__fill_cancel = None
+            try:
+                copool.remove(self)
+            except ValueError:
+                pass
+
+    def __fill(self, format_keys, entries, sort_keys, batch=None):
         # Restore the selection
         if self.__restore_values is not None:
             selected = self.__restore_values
@@ -242,10 +320,33 @@ class Pane(AllTreeView):
         if not selected or len(model) == len(selected):
             selected = [None]
 
-        self.inhibit()
-        with self.without_model():
-            model.clear()
-            model.add_songs(songs)
+        if batch is None:
+            self.inhibit()
+            with self.without_model():
+                model.clear()
+                model.add_entries(format_keys, entries, sort_keys)
+        else:
+            for start in range(0, len(entries) or 1, batch):
+                if start:
+                    yield True
+                    format_keys = sort_keys = {}
+                self.inhibit()
+                if not start:
+                    model.clear()
+                model.add_entries(
+                    format_keys, entries[start : start + batch], sort_keys
+                )
+                self.uninhibit()
+
+            # catch up with what changed in the meantime
+            self.inhibit()
+            self.__fill_cancel = None
+            for songs, remove_if_empty in self.__pending:
+                if remove_if_empty is None:
+                    model.add_songs(songs)
+                else:
+                    model.remove_songs(songs, remove_if_empty)
+            self.__pending.clear()
 
         self.set_selected(selected, jump=True)
         self.uninhibit()
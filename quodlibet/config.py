@@ -51,6 +51,25 @@ INITIAL: dict[str, dict[str, str]] = {
         "refresh_on_start": "true",
         # Watch all library files / directories for changes
         "watch": "false",
+        # Keep an index of all tag values for faster searching
+        "tag_index": "false",
+        # Append changes to a journal instead of rewriting the library file
+        "journal": "false",
+        # Number of threads reading tags of new files during a scan,
+        # 0 or 1 reads them one by one in the main loop
+        "scan_workers": "0",
+        # Don't look for new files in directories without added/removed
+        # files when rescanning. Known songs are still checked one by one.
+        "skip_unchanged_dirs": "false",
+        # Only read the songs of playlists once they get used, which makes
+        # startup faster with many large playlists
+        "lazy_playlists": "false",
+        # Compare numeric tags of all songs at once in queries. Songs edited
+        # without notifying the library keep matching their old values.
+        "columnar_queries": "false",
+        # Merge the library signals seen by browsers and plugins within this
+        # many milliseconds into one, 0 waits until idle, -1 doesn't merge
+        "coalesce_signals": "-1",
     },
     # State about the player, to restore on startup
     "memory": {
@@ -115,6 +134,8 @@ INITIAL: dict[str, dict[str, str]] = {
         "album_covers": "1",
         # include substrings in inline search
         "album_substrings": "1",
+        # cached tag values per album/playlist, 0 = no limit
+        "collection_cache_size": "24",
         # Collections browser: tag to collect, merge or not (0 = no)
         "collection_headers": "~people 0",
         # radio filter selection
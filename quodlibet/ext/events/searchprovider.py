@@ -229,7 +229,7 @@ class SearchProvider:
             query = Query("")
             for term in terms:
                 query &= Query(term)
-            songs = filter(query.search, app.library)
+            songs = query.filter(app.library)
         else:
             songs = app.library.values()
 
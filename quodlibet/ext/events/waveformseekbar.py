@@ -12,12 +12,17 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import hashlib
+import os
+import struct
+from array import array
 from functools import lru_cache
 from math import ceil, floor
 
 from gi.repository import Gtk, Gdk, Gst
 import cairo
 
+import quodlibet
 from quodlibet import _, app
 from quodlibet import print_w
 from quodlibet import util
@@ -30,7 +35,8 @@ from quodlibet.qltk.tracker import TimeTracker
 from quodlibet.qltk import get_fg_highlight_color
 from quodlibet.qltk.x import SymbolicIconImage
 from quodlibet.util import connect_destroy, print_d
-from quodlibet.util.path import uri2gsturi
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.path import mkdir, mtime, uri2gsturi
 
 
 @lru_cache
@@ -55,11 +61,220 @@ class Config:
     max_data_points = IntConfProp(_config, "max_data_points", 3000)
     show_time_labels = BoolConfProp(_config, "show_time_labels", True)
     height_px = IntConfProp(_config, "height_px", 40)
+    precompute_songs = IntConfProp(_config, "precompute_songs", 2)
 
 
 CONFIG = Config()
 
 
+def create_pipeline(song, points):
+    """Returns a (not yet started) pipeline posting "level" messages for
+    `points` equally long parts of the song, or None if it has no length.
+    """
+
+    command_template = """
+    uridecodebin name=uridec
+    ! audioconvert
+    ! level name=audiolevel interval={} post-messages=true
+    ! fakesink sync=false"""
+    interval = int(song("~#length") * 1e9 / points)
+    if not interval:
+        return None
+    print_d("Computing data for each %.3f seconds" % (interval / 1e9))
+
+    command = command_template.format(interval)
+    pipeline = Gst.parse_launch(command)
+    pipeline.get_by_name("uridec").set_property("uri", uri2gsturi(song("~uri")))
+    return pipeline
+
+
+def get_rms(message):
+    """Returns the RMS value (between 0 and 1) of a "level" message, or None
+    for other messages"""
+
+    structure = message.get_structure()
+    if structure.get_name() != "level":
+        print_w(f"Got unexpected message of type {message.type}")
+        return None
+    rms_db = structure.get_value("rms")
+    if not rms_db:
+        return None
+    # Calculate average of all channels (usually 2)
+    rms_db_avg = sum(rms_db) / len(rms_db)
+    # Normalize dB value to value between 0 and 1
+    return pow(10, (rms_db_avg / 20))
+
+
+class WaveformCache:
+    """Waveforms stored on disk, so every file only has to be decoded once.
+
+    Entries are keyed by the path and mtime of the file and the number of
+    data points. Values are stored relative to the loudest one, quantised
+    to a byte each, which is still finer than what a seekbar can show.
+    """
+
+    MAGIC = b"QLWF"
+    _HEADER = struct.Struct("<4sIf")
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(quodlibet.get_cache_dir(), "waveforms")
+        self.path = path
+
+    def _get_path(self, song, points):
+        filename = song("~filename")
+        key = f"{song('~uri')}\0{mtime(filename)}\0{points}"
+        name = hashlib.md5(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, name)
+
+    def get(self, song, points):
+        """Returns the RMS values of song, or None if not cached"""
+
+        try:
+            with open(self._get_path(song, points), "rb") as h:
+                data = h.read()
+            magic, count, scale = self._HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+
+        values = array("B", data[self._HEADER.size :])
+        if magic != self.MAGIC or len(values) != count:
+            return None
+        factor = scale / 255
+        return [v * factor for v in values]
+
+    def set(self, song, points, rms_vals):
+        """Stores the RMS values of song"""
+
+        if not rms_vals:
+            return
+        scale = max(rms_vals) or 1.0
+        factor = 255 / scale
+        values = array("B", [min(round(v * factor), 255) for v in rms_vals])
+        header = self._HEADER.pack(self.MAGIC, len(values), scale)
+
+        try:
+            mkdir(self.path, 0o700)
+            with atomic_save(self._get_path(song, points), "wb") as h:
+                h.write(header)
+                h.write(values.tobytes())
+        except OSError as e:
+            print_w(f"Couldn't save waveform of {song('~filename')!r}: {e}")
+
+    def prune(self, max_entries):
+        """Removes the least recently used entries above `max_entries`"""
+
+        try:
+            entries = list(os.scandir(self.path))
+        except OSError:
+            return
+        if len(entries) <= max_entries:
+            return
+
+        def last_used(entry):
+            try:
+                stat = entry.stat()
+            except OSError:
+                return 0
+            return max(stat.st_atime, stat.st_mtime)
+
+        entries.sort(key=last_used)
+        print_d(f"Removing {len(entries) - max_entries} cached waveforms")
+        for entry in entries[: len(entries) - max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class WaveformPrecomputer:
+    """Computes the waveforms of songs likely to be played next in the
+    background and stores them in a `WaveformCache`, running at most
+    `MAX_PIPELINES` pipelines at the same time.
+    """
+
+    MAX_PIPELINES = 2
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._pending = []
+        # song -> (pipeline, bus signal id, values)
+        self._running = {}
+
+    def update(self, songs, points):
+        """Replaces the songs waiting to be computed"""
+
+        self._pending = [
+            song
+            for song in songs
+            if song.is_file
+            and song not in self._running
+            and self._cache.get(song, points) is None
+        ]
+        self._pending.reverse()
+        self._start(points)
+
+    def discard(self, song):
+        """Stops computing the waveform of song"""
+
+        if song in self._pending:
+            self._pending.remove(song)
+        job = self._running.pop(song, None)
+        if job is not None:
+            self._stop(*job)
+
+    def destroy(self):
+        self._pending.clear()
+        for job in self._running.values():
+            self._stop(*job)
+        self._running.clear()
+
+    def _start(self, points):
+        while self._pending and len(self._running) < self.MAX_PIPELINES:
+            song = self._pending.pop()
+            pipeline = create_pipeline(song, points)
+            if pipeline is None:
+                continue
+            bus = pipeline.get_bus()
+            values = []
+            bus_id = bus.connect("message", self._on_bus_message, song, points)
+            bus.add_signal_watch()
+            self._running[song] = (pipeline, bus_id, values)
+            pipeline.set_state(Gst.State.PLAYING)
+
+    def _stop(self, pipeline, bus_id, values):
+        pipeline.set_state(Gst.State.NULL)
+        bus = pipeline.get_bus()
+        bus.remove_signal_watch()
+        bus.disconnect(bus_id)
+
+    def _on_bus_message(self, bus, message, song, points):
+        job = self._running.get(song)
+        if job is None:
+            return
+        values = job[2]
+
+        done = failed = False
+        if message.type == Gst.MessageType.ERROR:
+            error, debug = message.parse_error()
+            print_d(f"Error computing waveform of {song('~filename')!r}: {error}")
+            done = failed = True
+        elif message.type == Gst.MessageType.ELEMENT:
+            rms = get_rms(message)
+            if rms is not None:
+                values.append(rms)
+                done = len(values) >= points
+        elif message.type == Gst.MessageType.EOS:
+            done = True
+
+        if done:
+            del self._running[song]
+            self._stop(*job)
+            if not failed:
+                self._cache.set(song, points, values)
+            self._start(points)
+
+
 class WaveformSeekBar(Gtk.Box):
     """A widget containing labels and the seekbar."""
 
@@ -69,6 +284,8 @@ class WaveformSeekBar(Gtk.Box):
         self._player = player
         self._rms_vals = []
         self._hovering = False
+        self._cache = WaveformCache()
+        self._precomputer = WaveformPrecomputer(self._cache)
 
         self._elapsed_label = TimeLabel()
         self._remaining_label = TimeLabel()
@@ -120,19 +337,17 @@ class WaveformSeekBar(Gtk.Box):
         if not song.is_file:
             return
 
-        command_template = """
-        uridecodebin name=uridec
-        ! audioconvert
-        ! level name=audiolevel interval={} post-messages=true
-        ! fakesink sync=false"""
-        interval = int(song("~#length") * 1e9 / points)
-        if not interval:
+        # Don't decode the same song twice at once
+        self._precomputer.discard(song)
+        rms_vals = self._cache.get(song, points)
+        if rms_vals is not None:
+            print_d(f"Using cached waveform for {song('~filename')!r}")
+            self._set_rms_vals(rms_vals)
             return
-        print_d("Computing data for each %.3f seconds" % (interval / 1e9))
 
-        command = command_template.format(interval)
-        pipeline = Gst.parse_launch(command)
-        pipeline.get_by_name("uridec").set_property("uri", uri2gsturi(song("~uri")))
+        pipeline = create_pipeline(song, points)
+        if pipeline is None:
+            return
 
         bus = pipeline.get_bus()
         self._bus_id = bus.connect("message", self._on_bus_message, points)
@@ -141,8 +356,32 @@ class WaveformSeekBar(Gtk.Box):
         pipeline.set_state(Gst.State.PLAYING)
 
         self._pipeline = pipeline
+        self._pipeline_song = song
         self._new_rms_vals = []
 
+    def _set_rms_vals(self, rms_vals):
+        self._rms_vals = rms_vals
+        self._waveform_scale.reset(self._rms_vals)
+        self._update_redraw_interval()
+
+    def _precompute_upcoming(self, points):
+        """Starts computing the waveforms of the next songs in the queue,
+        or the one after the current song in the song list"""
+
+        count = CONFIG.precompute_songs
+        playlist = getattr(app.window, "playlist", None)
+        if count <= 0 or playlist is None:
+            return
+
+        songs = playlist.q.get()[:count]
+        if not songs:
+            iter_ = playlist.pl.current_iter
+            if iter_ is not None:
+                iter_ = playlist.pl.iter_next(iter_)
+            if iter_ is not None:
+                songs = [playlist.pl.get_value(iter_)]
+        self._precomputer.update(songs, points)
+
     def _on_bus_message(self, bus, message, points):
         force_stop = False
         if message.type == Gst.MessageType.ERROR:
@@ -150,33 +389,25 @@ class WaveformSeekBar(Gtk.Box):
             print_d(f"Error received from element {message.src.get_name()}: {error}")
             print_d(f"Debugging information: {debug}")
         elif message.type == Gst.MessageType.ELEMENT:
-            structure = message.get_structure()
-            if structure.get_name() == "level":
-                rms_db = structure.get_value("rms")
-                if rms_db:
-                    # Calculate average of all channels (usually 2)
-                    rms_db_avg = sum(rms_db) / len(rms_db)
-                    # Normalize dB value to value between 0 and 1
-                    rms = pow(10, (rms_db_avg / 20))
-                    self._new_rms_vals.append(rms)
-                    if len(self._new_rms_vals) >= points:
-                        # The audio might be much longer than we anticipated
-                        # and we would get way too many events due to the too
-                        # short interval set.
-                        force_stop = True
-            else:
-                print_w(f"Got unexpected message of type {message.type}")
+            rms = get_rms(message)
+            if rms is not None:
+                self._new_rms_vals.append(rms)
+                if len(self._new_rms_vals) >= points:
+                    # The audio might be much longer than we anticipated
+                    # and we would get way too many events due to the too
+                    # short interval set.
+                    force_stop = True
 
         if message.type == Gst.MessageType.EOS or force_stop:
             self._clean_pipeline()
+            self._cache.set(self._pipeline_song, points, self._new_rms_vals)
 
             # Update the waveform with the new data
-            self._rms_vals = self._new_rms_vals
-            self._waveform_scale.reset(self._rms_vals)
-            self._update_redraw_interval()
+            self._set_rms_vals(self._new_rms_vals)
 
-            # Clear temporary reference to the waveform data
+            # Clear temporary references to the waveform data
             del self._new_rms_vals
+            del self._pipeline_song
 
     def _clean_pipeline(self):
         if hasattr(self, "_pipeline") and self._pipeline:
@@ -197,6 +428,7 @@ class WaveformSeekBar(Gtk.Box):
 
     def _on_destroy(self, *args):
         self._clean_pipeline()
+        self._precomputer.destroy()
         self._label_tracker.destroy()
         self._redraw_tracker.destroy()
 
@@ -224,12 +456,13 @@ class WaveformSeekBar(Gtk.Box):
             self._update_label(player)
 
     def _on_song_started(self, player, song):
+        self._rms_vals = []
         if player.info:
             # Trigger a re-computation of the waveform
             self._create_waveform(player.info, CONFIG.max_data_points)
             self._resize_labels(player.info)
+            self._precompute_upcoming(CONFIG.max_data_points)
 
-        self._rms_vals.clear()
         self._update(player, True)
 
     def _on_song_ended(self, player, song, ended):
@@ -640,10 +873,14 @@ class WaveformSeekBarPlugin(EventPlugin):
     PLUGIN_CONFIG_SECTION = __name__
     PLUGIN_DESC = _("∿ A seekbar in the shape of the waveform of the current song.")
 
+    MAX_CACHED = 2000
+    """Number of waveforms kept on disk"""
+
     def __init__(self):
         self._bar = None
 
     def enabled(self):
+        WaveformCache().prune(self.MAX_CACHED)
         self._bar = WaveformSeekBar(app.player, app.librarian)
         self._bar.show()
         app.window.set_seekbar_widget(self._bar)
@@ -7,7 +7,6 @@
 # (at your option) any later version.
 
 import math
-import random
 
 from gi.repository import Gtk
 
@@ -31,41 +30,42 @@ class PlaycountEqualizer(ShufflePlugin, OrderRemembered, PluginConfigMixin):
 
     _MAGNITUDE_DEFAULT = 1
 
-    # Select the next track.
-    def next(self, playlist, current):
-        super().next(playlist, current)
-
-        remaining = self.remaining(playlist)
-
-        # Don't try to search through an empty / played playlist.
-        if len(remaining) <= 0:
-            return None
+    _max_count = 0
+    _magn = 1.0
+    _last_song = None
 
+    def _magnitude(self):
         mag_cfg = float(self.config_get("magnitude", self._MAGNITUDE_DEFAULT))
         # Adjusting input to range from 1 to 3
         # weights will be calculated as a power of this value.
-        magn = (mag_cfg * 2.0) / 100.0 + 1.0
+        return (mag_cfg * 2.0) / 100.0 + 1.0
 
-        # Set-up the search information.
-        max_count = max([song("~#playcount") for song in remaining.values()])
+    def weights(self, songs):
+        self._magn = self._magnitude()
+        self._max_count = max((song("~#playcount") for song in songs), default=0)
+        print_d(f"Weighting by play counts up to {self._max_count}")
+        return super().weights(songs)
 
-        weights = {
-            i: math.ceil(math.pow(max_count - song("~#playcount") + 1, magn))
-            for i, song in remaining.items()
-        }
+    def weight(self, song):
+        # songs added later could have been played more often
+        distance = max(1, self._max_count - song("~#playcount") + 1)
+        return math.ceil(math.pow(distance, self._magn))
 
-        weights_sum = sum(weights.values())
-        choice = int(max(1, math.ceil(weights_sum * random.random())))
-
-        print_d(f"Weighted random: {choice} for the weights sum: {weights_sum}")
-
-        # Search for a track.
-        for i, weight in weights.items():
-            choice -= weight
-            if choice <= 0:
-                return playlist.get_iter([i])
-        else:  # This should only happen if all songs have equal play counts.
-            return playlist.get_iter([random.choice(list(remaining.keys()))])
+    # Select the next track.
+    def next(self, playlist, current):
+        super().next(playlist, current)
+        song = None if current is None else playlist.get_value(current)
+        # The last song could have been counted after picking this one,
+        # a new highest play count changes the weights of all songs
+        counts = [s("~#playcount") for s in (self._last_song, song) if s is not None]
+        if max(counts, default=0) > self._max_count:
+            print_d("Play counts changed, collecting weights again")
+            self.invalidate_weights()
+        elif self._magnitude() != self._magn:
+            print_d("Magnitude changed, collecting weights again")
+            self.invalidate_weights()
+        self._last_song = song
+        return self.pick(playlist)
 
     @classmethod
     def PluginPreferences(cls, parent):
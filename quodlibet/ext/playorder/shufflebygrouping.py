@@ -6,8 +6,6 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-import random
-
 from gi.repository import Gtk, GLib
 
 from quodlibet import _
@@ -63,10 +61,9 @@ class ShuffleByGrouping(ShufflePlugin, OrderRemembered):
 
         # Keep track of played songs
         OrderRemembered.next(self, playlist, current_song)
-        remaining = OrderRemembered.remaining(self, playlist)
 
         # Check if playlist is finished or empty
-        if not remaining:
+        if OrderRemembered.pick(self, playlist) is None:
             OrderRemembered.reset(self, playlist)
             return None
 
@@ -81,11 +78,8 @@ class ShuffleByGrouping(ShufflePlugin, OrderRemembered):
 
         # Pick random song at the start of a new group
         while True:
-            song_location = random.choice(list(remaining.keys()))
-            new_song = playlist.get_iter(song_location)
-            new_song_prev = (
-                playlist.get_iter(song_location - 1) if song_location >= 1 else None
-            )
+            new_song = OrderRemembered.pick(self, playlist)
+            new_song_prev = playlist.iter_previous(new_song)
             if not same_group(new_song, new_song_prev):
                 return new_song
 
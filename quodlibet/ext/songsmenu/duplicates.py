@@ -12,6 +12,8 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+from functools import lru_cache
+
 from gi.repository import Gtk, Pango
 
 from quodlibet import app
@@ -30,6 +32,107 @@ from quodlibet.util.i18n import numeric_phrase
 from quodlibet.util.string.filter import remove_diacritics, remove_punctuation
 
 
+@lru_cache(maxsize=8)
+def make_key_func(expression, diacritics, case_insensitive, punctuation, whitespace):
+    """Returns a function giving the duplicate key of a song for the key
+    expression and matching options"""
+
+    def get_key(song):
+        key = song(expression)
+        if diacritics:
+            key = remove_diacritics(key)
+        if case_insensitive:
+            key = key.lower()
+        if punctuation:
+            key = remove_punctuation(key)
+        if whitespace:
+            key = "_".join(key.split())
+        return key
+
+    return get_key
+
+
+class DuplicateKeyIndex:
+    """The songs of a library grouped by duplicate key.
+
+    Keys of all songs get computed on first use and are kept up to date
+    through the added/changed/removed signals of the library, until the key
+    expression or matching options change.
+    """
+
+    def __init__(self, library):
+        self._library = library
+        self._options = None
+        self._key_func = None
+        self._keys: dict[int, str] = {}
+        self._groups: dict[str, set] = {}
+        self._sigs = [
+            library.connect("added", self.__added),
+            library.connect("changed", self.__changed),
+            library.connect("removed", self.__removed),
+        ]
+
+    @property
+    def library(self):
+        return self._library
+
+    def destroy(self):
+        for sig in self._sigs:
+            self._library.disconnect(sig)
+        self._sigs = []
+        self._keys.clear()
+        self._groups.clear()
+
+    def __added(self, library, songs):
+        if self._options is not None:
+            self._add(songs)
+
+    def __changed(self, library, songs):
+        if self._options is not None:
+            self._remove(songs)
+            self._add(songs)
+
+    def __removed(self, library, songs):
+        if self._options is not None:
+            self._remove(songs)
+
+    def _add(self, songs):
+        key_func = self._key_func
+        keys = self._keys
+        groups = self._groups
+        for song in songs:
+            key = keys[id(song)] = key_func(song)
+            if not key:
+                continue
+            if key in groups:
+                groups[key].add(song)
+            else:
+                groups[key] = {song}
+
+    def _remove(self, songs):
+        groups = self._groups
+        for song in songs:
+            key = self._keys.pop(id(song), None)
+            group = groups.get(key)
+            if group is not None:
+                group.discard(song)
+                if not group:
+                    del groups[key]
+
+    def groups(self, options) -> dict[str, set]:
+        """Returns the songs by key for the options passed to
+        `make_key_func` (don't modify the result)"""
+
+        if options != self._options:
+            print_d(f"Indexing duplicate keys for {options!r}")
+            self._options = options
+            self._key_func = make_key_func(*options)
+            self._keys.clear()
+            self._groups.clear()
+            self._add(self._library.values())
+        return self._groups
+
+
 class DuplicateSongsView(RCMHintedTreeView):
     """Allows full tree-like functionality on top of underlying features"""
 
@@ -90,8 +193,9 @@ class DuplicateSongsView(RCMHintedTreeView):
         model = self.get_model()
         if not model:
             return
+        get_key = Duplicates.get_key_func()
         for song in songs:
-            key = Duplicates.get_key(song)
+            key = get_key(song)
             model.add_to_existing_group(key, song)
             # TODO: handle creation of new groups based on songs that were
             #       in original list but not as a duplicate
@@ -100,8 +204,9 @@ class DuplicateSongsView(RCMHintedTreeView):
         model = self.get_model()
         if not model:  # Keeps happening on next song - bug / race condition?
             return
+        get_key = Duplicates.get_key_func()
         for song in songs:
-            key = Duplicates.get_key(song)
+            key = get_key(song)
             row = model.find_row(song)
             if row:
                 print_d(
@@ -179,22 +284,22 @@ class DuplicatesTreeModel(Gtk.TreeStore):
 
     def find_row(self, song):
         """Returns the row in the model from song, or None"""
-        for parent in self:
-            for row in parent.iterchildren():
-                if row[0] == song:
-                    self.__iter = row.iter
-                    self.sourced = True
-                    return row
-        return None
+        iter_ = self.__song_iters.get(song)
+        if iter_ is None:
+            return None
+        self.__iter = iter_
+        self.sourced = True
+        return self[iter_]
 
     def add_to_existing_group(self, key, song):
         """Tries to add a song to an existing group. Returns None if not able"""
-        for parent in self:
-            if key == parent[0]:
-                print_d("Found group", self)
-                return self.append(parent.iter, self.__make_row(song))
-            # TODO: update group
-        return None
+        parent = self.__group_iters.get(key)
+        if parent is None:
+            return None
+        # TODO: update group
+        print_d("Found group", self)
+        iter_ = self.__song_iters[song] = self.append(parent, self.__make_row(song))
+        return iter_
 
     @classmethod
     def __make_row(cls, song):
@@ -210,9 +315,10 @@ class DuplicatesTreeModel(Gtk.TreeStore):
         parent = self.append(
             None, [key] + [self.group_value(group, tag) for tag, f in self.TAG_MAP]
         )
+        self.__group_iters[key] = parent
 
         for s in songs:
-            self.append(parent, self.__make_row(s))
+            self.__song_iters[s] = self.append(parent, self.__make_row(s))
 
     def go_to(self, song, explicit=False):
         self.__iter = None
@@ -226,6 +332,13 @@ class DuplicatesTreeModel(Gtk.TreeStore):
     def remove(self, itr):
         if self.__iter and self[itr].path == self[self.__iter].path:
             self.__iter = None
+        row = self[itr]
+        if row.parent is None:
+            self.__group_iters.pop(row[0], None)
+            for child in row.iterchildren():
+                self.__song_iters.pop(child[0], None)
+        else:
+            self.__song_iters.pop(row[0], None)
         super().remove(itr)
 
     def get(self):
@@ -263,6 +376,9 @@ class DuplicatesTreeModel(Gtk.TreeStore):
 
     def __init__(self):
         super().__init__(object, str, str, str, str, str, str, str)
+        # tree store iters stay valid, so rows can be found without walking
+        self.__group_iters = {}
+        self.__song_iters = {}
 
 
 class DuplicateDialog(Gtk.Window):
@@ -376,6 +492,7 @@ class Duplicates(SongsMenuPlugin, PluginConfigMixin):
 
     # Cached values
     key_expression = None
+    _index = None
 
     @classmethod
     def get_key_expression(cls):
@@ -432,38 +549,60 @@ class Duplicates(SongsMenuPlugin, PluginConfigMixin):
         vb.show_all()
         return vb
 
+    @classmethod
+    def get_key_options(cls):
+        """Returns the key expression and matching options, as passed to
+        `make_key_func`"""
+        return (
+            cls.get_key_expression(),
+            cls.config_get_bool(cls._CFG_REMOVE_DIACRITICS),
+            cls.config_get_bool(cls._CFG_CASE_INSENSITIVE),
+            cls.config_get_bool(cls._CFG_REMOVE_PUNCTUATION),
+            cls.config_get_bool(cls._CFG_REMOVE_WHITESPACE),
+        )
+
+    @classmethod
+    def get_key_func(cls):
+        """Returns a function giving the key of a song for the current
+        options, for keying many songs"""
+        return make_key_func(*cls.get_key_options())
+
     @classmethod
     def get_key(cls, song):
-        key = song(cls.get_key_expression())
-        if cls.config_get_bool(cls._CFG_REMOVE_DIACRITICS):
-            key = remove_diacritics(key)
-        if cls.config_get_bool(cls._CFG_CASE_INSENSITIVE):
-            key = key.lower()
-        if cls.config_get_bool(cls._CFG_REMOVE_PUNCTUATION):
-            key = remove_punctuation(key)
-        if cls.config_get_bool(cls._CFG_REMOVE_WHITESPACE):
-            key = "_".join(key.split())
-        return key
+        return cls.get_key_func()(song)
+
+    @classmethod
+    def get_index(cls, library):
+        """Returns the (shared) duplicate key index of library"""
+        if cls._index is not None and cls._index.library is not library:
+            cls._index.destroy()
+            cls._index = None
+        if cls._index is None:
+            cls._index = DuplicateKeyIndex(library)
+        return cls._index
+
+    @classmethod
+    def plugin_disabled(cls):
+        if cls._index is not None:
+            cls._index.destroy()
+            cls._index = None
 
     def plugin_songs(self, songs):
         model = DuplicatesTreeModel()
 
-        # Index all songs by our custom key
-        # TODO: make this cache-friendly
         print_d("Calculating duplicates for %d song(s)..." % len(songs))
+        options = self.get_key_options()
+        get_key = make_key_func(*options)
+        library_groups = self.get_index(app.library).groups(options)
         groups = {}
         for song in songs:
-            key = self.get_key(song)
+            key = get_key(song)
             if key and key in groups:
                 print_d(f"Found duplicate based on '{key}'")
                 groups[key].add(song._song)
             elif key:
                 groups[key] = {song._song}
-
-        for song in app.library:
-            key = self.get_key(song)
-            if key in groups:
-                groups[key].add(song)
+                groups[key].update(library_groups.get(key, ()))
 
         # Now display the grouped duplicates
         for key, children in groups.items():
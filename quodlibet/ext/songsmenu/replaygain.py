@@ -8,6 +8,8 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+from collections import deque
+
 from gi.repository import Gtk
 from gi.repository import GObject
 from gi.repository import Pango
@@ -43,6 +45,14 @@ def get_num_threads():
     return threads
 
 
+def get_num_pipelines(preferred, num_albums):
+    """Returns how many albums to analyse at once, `preferred` if positive or
+    one per CPU otherwise, but never more than there are albums"""
+
+    num = preferred if preferred > 0 else get_num_threads()
+    return max(min(num, num_albums), 1)
+
+
 class UpdateMode:
     """Enum-like class for update strategies"""
 
@@ -355,19 +365,23 @@ class ReplayGainPipeline(GObject.Object):
 
 
 class RGDialog(Dialog):
-    def __init__(self, albums, parent, process_mode):
+    def __init__(self, albums, parent, process_mode, num_pipelines=0):
         super().__init__(title=_("ReplayGain Analyzer"), parent=parent)
 
         self.add_button(_("_Cancel"), Gtk.ResponseType.CANCEL)
         self.add_icon_button(_("_Save"), Icons.DOCUMENT_SAVE, Gtk.ResponseType.OK)
 
         self.process_mode = process_mode
+        self.num_pipelines = num_pipelines
         self.set_default_size(600, 400)
         self.set_border_width(6)
 
         hbox = Gtk.HBox(spacing=6)
         info = Gtk.Label()
         hbox.pack_start(info, True, True, 0)
+        self._progress = Gtk.ProgressBar(show_text=True)
+        self._progress.set_valign(Gtk.Align.CENTER)
+        hbox.pack_start(self._progress, False, True, 0)
         self.vbox.pack_start(hbox, False, False, 6)
 
         swin = Gtk.ScrolledWindow()
@@ -449,13 +463,15 @@ class RGDialog(Dialog):
         column.set_cell_data_func(peak_renderer, peak_cdf)
         view.append_column(column)
 
-        self.create_pipelines()
         self._timeout = None
         self._sigs = {}
         self._done = []
+        # album being analysed by each pipeline
+        self._active = {}
 
         self.__fill_view(view, albums)
-        num_to_process = sum(int(rga.should_process) for rga in self._todo)
+        self.create_pipelines()
+        num_to_process = self._num_to_process
         template = ngettext(
             "There is %(to-process)s album to update (of %(all)s)",
             "There are %(to-process)s albums to update (of %(all)s)",
@@ -465,29 +481,49 @@ class RGDialog(Dialog):
             template
             % {
                 "to-process": util.bold(format_int_locale(num_to_process)),
-                "all": util.bold(format_int_locale(len(self._todo))),
+                "all": util.bold(format_int_locale(self._count)),
             }
         )
+        self.__update_progress()
         self.connect("destroy", self.__destroy)
         self.connect("response", self.__response)
 
     def create_pipelines(self):
-        # create as many pipelines as threads
-        self.pipes = [ReplayGainPipeline() for _ in range(get_num_threads())]
+        # create as many pipelines as can be kept busy
+        num = get_num_pipelines(self.num_pipelines, self._num_to_process)
+        self.pipes = [ReplayGainPipeline() for _ in range(num)]
 
     def __fill_view(self, view, albums):
-        self._todo = [RGAlbum.from_songs(a, self.process_mode) for a in albums]
-        self._count = len(self._todo)
+        all_albums = [RGAlbum.from_songs(a, self.process_mode) for a in albums]
+        self._count = len(all_albums)
+
+        # Decide up front which albums need analysis, so pipelines only ever
+        # get handed albums they have to decode
+        self._todo = deque()
+        for album in all_albums:
+            if album.should_process:
+                self._todo.append(album)
+            else:
+                print_d(f"{album.title} needs no processing")
+                self._done.append(album)
+        self._num_to_process = len(self._todo)
+
+        # Paths of the rows by album and song, updates come in often
+        self._paths = {}
         self.model = model = Gtk.TreeStore(object, bool)
         insert = model.insert
-        for album in reversed(self._todo):
+        for album in reversed(all_albums):
             enabled = album.should_process
             base = insert(None, 0, row=[album, enabled])
             for song in reversed(album.songs):
                 insert(base, 0, row=[song, enabled])
+        for i, album in enumerate(all_albums):
+            self._paths[album] = Gtk.TreePath((i,))
+            for j, song in enumerate(album.songs):
+                self._paths[song] = Gtk.TreePath((i, j))
         view.set_model(model)
 
-        if len(self._todo) == 1:
+        if len(all_albums) == 1:
             view.expand_all()
 
     def start_analysis(self):
@@ -504,21 +540,14 @@ class RGDialog(Dialog):
             album = self.get_next_album()
             if not album:
                 return
+            self._active[p] = album
             p.start(album)
 
     def get_next_album(self):
-        next_album = None
-        while not next_album:
-            if not self._todo:
-                print_d("No more albums to process")
-                return None
-            next_album = self._todo.pop(0)
-            if not next_album.should_process:
-                print_d(f"{next_album.title} needs no processing")
-                self._done.append(next_album)
-                self.__update_view_for(next_album)
-                next_album = None
-        return next_album
+        if not self._todo:
+            print_d("No more albums to process")
+            return None
+        return self._todo.popleft()
 
     def __response(self, win, response):
         if response == Gtk.ResponseType.CANCEL:
@@ -539,30 +568,41 @@ class RGDialog(Dialog):
             p.quit()
 
     def __update(self, pipeline, album, song):
-        for row in self.model:
-            row_album = row[0]
-            if row_album is album:
-                self.model.row_changed(row.path, row.iter)
-                for child in row.iterchildren():
-                    row_song = child[0]
-                    if row_song is song:
-                        self.model.row_changed(child.path, child.iter)
-                        break
-                break
+        self.__update_view_for(album)
+        if song is not None:
+            self.__update_view_for(song)
 
     def __done(self, pipeline, album):
         self._done.append(album)
+        self._active.pop(pipeline, None)
         next_album = self.get_next_album()
         if next_album:
+            self._active[pipeline] = next_album
             pipeline.start(next_album)
         self.__update_view_for(album)
-
-    def __update_view_for(self, album):
-        for row in self.model:
-            row_album = row[0]
-            if row_album is album:
-                self.model.row_changed(row.path, row.iter)
-                break
+        self.__update_progress()
+
+    def __update_view_for(self, item):
+        path = self._paths.get(item)
+        if path is not None:
+            self.model.row_changed(path, self.model.get_iter(path))
+
+    def __update_progress(self):
+        total = self._num_to_process
+        active = self._active.values()
+        finished = total - len(self._todo) - len(active)
+        if total:
+            fraction = (finished + sum(a.progress for a in active)) / total
+        else:
+            fraction = 1.0
+        self._progress.set_fraction(max(min(fraction, 1.0), 0.0))
+        self._progress.set_text(
+            _("%(done)s of %(total)s")
+            % {
+                "done": format_int_locale(finished),
+                "total": format_int_locale(total),
+            }
+        )
 
     def __request_update(self):
         GLib.source_remove(self._timeout)
@@ -571,6 +611,7 @@ class RGDialog(Dialog):
         if len(self._done) < self._count:
             for p in self.pipes:
                 p.request_update()
+            self.__update_progress()
             self._timeout = GLib.timeout_add(400, self.__request_update)
         return False
 
@@ -589,7 +630,16 @@ class ReplayGain(SongsMenuPlugin, PluginConfigMixin):
 
     def plugin_albums(self, albums):
         mode = self.config_get("process_if", UpdateMode.ALWAYS)
-        win = RGDialog(albums, parent=self.plugin_window, process_mode=mode)
+        try:
+            num_pipelines = int(self.config_get("pipelines", 0))
+        except ValueError:
+            num_pipelines = 0
+        win = RGDialog(
+            albums,
+            parent=self.plugin_window,
+            process_mode=mode,
+            num_pipelines=num_pipelines,
+        )
         win.show_all()
         win.start_analysis()
 
@@ -604,7 +654,7 @@ class ReplayGain(SongsMenuPlugin, PluginConfigMixin):
         vb = Gtk.VBox(spacing=12)
 
         # Tabulate all settings for neatness
-        table = Gtk.Table(n_rows=1, n_columns=2)
+        table = Gtk.Table(n_rows=2, n_columns=2)
         table.props.expand = False
         table.set_col_spacings(6)
         table.set_row_spacings(6)
@@ -642,6 +692,21 @@ class ReplayGain(SongsMenuPlugin, PluginConfigMixin):
 
         rows.append((_("_Process albums:"), combo))
 
+        def pipelines_changed(spin):
+            cls.config_set("pipelines", spin.get_value_as_int())
+
+        try:
+            pipelines = int(cls.config_get("pipelines", 0))
+        except ValueError:
+            pipelines = 0
+        adjustment = Gtk.Adjustment(
+            value=pipelines, lower=0, upper=64, step_incr=1, page_incr=4
+        )
+        spin = Gtk.SpinButton(adjustment=adjustment, climb_rate=0.2, digits=0)
+        spin.set_tooltip_text(_("Analyze this many albums at once, 0 for one per CPU"))
+        spin.connect("value-changed", pipelines_changed)
+        rows.append((_("_Parallel analyses:"), spin))
+
         for row, (label_text, entry) in enumerate(rows):
             label = Gtk.Label(label=label_text)
             label.set_alignment(0.0, 0.5)
@@ -16,7 +16,15 @@ from ._audio import (
 )
 from ._image import EmbeddedImage, APICType
 from ._misc import AudioFileError, init, MusicFile, types, loaders, filter, mimes
-from ._serialize import load_audio_files, dump_audio_files, SerializationError
+from ._serialize import (
+    load_audio_files,
+    dump_audio_files,
+    read_audio_files,
+    write_audio_files,
+    iter_write_audio_files,
+    is_binary_format,
+    SerializationError,
+)
 
 (
     AudioFile,
@@ -37,3 +45,4 @@ from ._serialize import load_audio_files, dump_audio_files, SerializationError
     filter,
 )
 mimes, load_audio_files, dump_audio_files, SerializationError
+read_audio_files, write_audio_files, iter_write_audio_files, is_binary_format
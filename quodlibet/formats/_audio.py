@@ -16,6 +16,7 @@ import os
 import re
 import shutil
 import time
+from sys import intern
 from typing import Any, Generic, TypeVar
 from collections import OrderedDict
 from itertools import zip_longest
@@ -96,6 +97,9 @@ NUMERIC_ZERO_DEFAULT.update(SIZE_TAGS)
 FILESYSTEM_TAGS = {"~filename", "~basename", "~dirname", "~mountpoint"}
 """Values are bytes in Linux instead of unicode"""
 
+_MOUNTPOINTS: dict[fsnative, fsnative] = {}
+"""Known mount points, so all songs on one share the same ~mountpoint"""
+
 SORT_TO_TAG = {v: k for (k, v) in TAG_TO_SORT.items()}
 """Reverse map, so sort tags can fall back to the normal ones"""
 
@@ -239,6 +243,7 @@ class AudioFile(dict, ImageContainer, HasKey):
         # validate key
         if not isinstance(key, str):
             raise TypeError("key has to be str")
+        key = intern(str(key))
 
         # validate value
         if key.startswith("~#"):
@@ -991,9 +996,10 @@ class AudioFile(dict, ImageContainer, HasKey):
                 # (the unit tests use these).
                 head = head or fsnative("/")
                 if ismount(head):
-                    self["~mountpoint"] = head
+                    self["~mountpoint"] = _MOUNTPOINTS.setdefault(head, head)
         else:
-            self["~mountpoint"] = fsnative("/")
+            root = fsnative("/")
+            self["~mountpoint"] = _MOUNTPOINTS.setdefault(root, root)
 
         # Fill in necessary values.
         self.setdefault("~#added", int(time.time()))
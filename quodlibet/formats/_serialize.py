@@ -7,19 +7,57 @@
 
 """Code for serializing AudioFile instances"""
 
+import importlib
 import pickle
+import struct
+import sys
+from io import BytesIO
+
 from senf import bytes2fsn, fsn2bytes
 
 from quodlibet.util.picklehelper import pickle_loads, pickle_dumps
 from quodlibet.util import is_windows
-from ._audio import AudioFile
+from ._audio import AudioFile, FILESYSTEM_TAGS
 
 
 class SerializationError(Exception):
     pass
 
 
+SHARED_TAGS = {
+    "~mountpoint",
+    "album",
+    "albumartist",
+    "albumartistsort",
+    "albumsort",
+    "artist",
+    "artistsort",
+    "composer",
+    "conductor",
+    "date",
+    "discnumber",
+    "genre",
+    "labelid",
+    "language",
+    "musicbrainz_albumartistid",
+    "musicbrainz_albumid",
+    "musicbrainz_artistid",
+    "musicbrainz_releasegroupid",
+    "organization",
+    "originaldate",
+    "performer",
+    "releasecountry",
+    "replaygain_album_gain",
+    "replaygain_album_peak",
+    "tracknumber",
+}
+"""Tags with values which are usually the same for many songs. Loaded songs
+share one object for equal values of these."""
+
+
 def _py2_to_py3(items):
+    intern = sys.intern
+    shared: dict[str, str] = {}
     for i in items:
         try:
             li = list(i.items())
@@ -53,6 +91,9 @@ def _py2_to_py3(items):
                 except UnicodeEncodeError:
                     v = v.encode("utf-8", "replace").decode("utf-8")
 
+            k = intern(k)
+            if k in SHARED_TAGS and isinstance(v, str):
+                v = shared.setdefault(v, v)
             i[k] = v
 
     return items
@@ -80,19 +121,27 @@ def load_audio_files(data, process=True):
     """unpickles the item list and if some class isn't found unpickle
     as a dict and filter them out afterwards.
 
+    Data in the binary format (see `write_audio_files`) gets passed to
+    `read_audio_files` instead.
+
     In case everything gets filtered out will raise SerializationError
     (because then likely something larger went wrong)
 
     Args:
         data (bytes)
         process (bool): if the dict key/value types should be converted,
-            either to be usable from py3 or to convert to newer types
+            either to be usable from py3 or to convert to newer types.
+            This also interns the keys and makes songs share equal values
+            of `SHARED_TAGS`
     Returns:
         List[AudioFile]
     Raises:
         SerializationError
     """
 
+    if is_binary_format(data):
+        return read_audio_files(BytesIO(data))
+
     dummy = type("dummy", (dict,), {})
     error_occured = []
     temp_type_cache = {}
@@ -158,3 +207,376 @@ def dump_audio_files(item_list, process=True):
         return pickle_dumps(item_list, 2)
     except pickle.PicklingError as e:
         raise SerializationError(e) from e
+
+
+BINARY_MAGIC = b"QLSONGS\x00"
+"""Start of files in the binary format"""
+
+BINARY_VERSION = 1
+"""Current version of the binary format, older readers refuse newer files"""
+
+# The file consists of records, each starting with the record type and the
+# size of its payload. Songs are written in chunks, every chunk first
+# defines the classes, tag keys, text values and paths which weren't used in
+# previous chunks, songs then reference those by their index. Values which
+# don't fit any of the field types (like integers not fitting into 64 bits)
+# get pickled.
+_REC_END = 0
+_REC_CHUNK = 1
+
+_VERSION = struct.Struct("<H")
+_RECORD = struct.Struct("<BI")
+# number of songs, new classes, new keys, new texts and new paths
+_CHUNK = struct.Struct("<IIIII")
+# class index, number of text, path, int, float and pickled fields
+_SONG = struct.Struct("<IHHHHH")
+_SIZE = struct.Struct("<I")
+
+_INT_MIN = -(2**63)
+_INT_MAX = 2**63 - 1
+
+_song_structs: dict[tuple[int, int, int, int, int], struct.Struct] = {}
+
+
+def _get_song_struct(
+    texts: int, paths: int, ints: int, floats: int, pickled: int
+) -> struct.Struct:
+    """Returns a struct for the fields of a song: the key indices of all
+    fields followed by the value indices for texts and paths, the
+    numeric values of ints and floats and the sizes of the pickled values
+    (which follow the struct)
+    """
+
+    sizes = (texts, paths, ints, floats, pickled)
+    try:
+        return _song_structs[sizes]
+    except KeyError:
+        fmt = f"<{sum(sizes)}I{texts + paths}I{ints}q{floats}d{pickled}I"
+        s = _song_structs[sizes] = struct.Struct(fmt)
+        return s
+
+
+def _pack_table(strings: list[str], encode) -> bytes:
+    """A list of lengths followed by the encoded concatenated strings"""
+
+    blob = encode("".join(strings))
+    lengths = struct.pack(f"<{len(strings)}I", *map(len, strings))
+    return lengths + _SIZE.pack(len(blob)) + blob
+
+
+def _unpack_table(buf: bytes, pos: int, count: int, decode) -> tuple[list, int]:
+    lengths = struct.unpack_from(f"<{count}I", buf, pos)
+    pos += 4 * count
+    (size,) = _SIZE.unpack_from(buf, pos)
+    pos += _SIZE.size
+    text = decode(buf[pos : pos + size])
+    if len(text) != sum(lengths):
+        raise SerializationError("Invalid string table")
+    result = []
+    offset = 0
+    for length in lengths:
+        result.append(text[offset : offset + length])
+        offset += length
+    return result, pos + size
+
+
+def _encode_text(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _decode_text(data: bytes) -> str:
+    return data.decode("utf-8", "surrogatepass")
+
+
+def is_binary_format(data: bytes) -> bool:
+    """If data (or the start of it) is in the binary format"""
+
+    return data[: len(BINARY_MAGIC)] == BINARY_MAGIC
+
+
+def write_audio_files(fileobj, items, chunk_size=2048):
+    """Writes AudioFiles to fileobj in the binary format.
+
+    Tag keys and text values are only written once and referenced by
+    index afterwards. Numeric (~#) values are stored as fixed size
+    integers or doubles, anything else gets pickled.
+
+    Raises:
+        SerializationError
+    """
+
+    for _chunk in iter_write_audio_files(fileobj, items, chunk_size):
+        pass
+
+
+def iter_write_audio_files(fileobj, items, chunk_size=2048):
+    """Like `write_audio_files`, but a generator yielding after each
+    chunk of songs was written.
+
+    Raises:
+        SerializationError
+    """
+
+    classes: dict[type, int] = {}
+    keys: dict[str, int] = {}
+    texts: dict[str, int] = {}
+    paths: dict[str, int] = {}
+
+    fileobj.write(BINARY_MAGIC + _VERSION.pack(BINARY_VERSION))
+
+    def write_chunk(songs, new_classes, new_keys, new_texts, new_paths):
+        head = _CHUNK.pack(
+            len(songs), len(new_classes), len(new_keys), len(new_texts), len(new_paths)
+        )
+        parts = [
+            head,
+            _pack_table(new_classes, _encode_text),
+            _pack_table(new_keys, _encode_text),
+            _pack_table(new_texts, _encode_text),
+            # paths don't have to be valid unicode, so the lengths are in bytes
+            struct.pack(f"<{len(new_paths)}I", *map(len, new_paths)),
+            _SIZE.pack(sum(map(len, new_paths))),
+        ]
+        parts.extend(new_paths)
+        parts.extend(songs)
+        payload = b"".join(parts)
+        fileobj.write(_RECORD.pack(_REC_CHUNK, len(payload)) + payload)
+
+    try:
+        songs: list[bytes] = []
+        new_classes: list[str] = []
+        new_keys: list[str] = []
+        new_texts: list[str] = []
+        new_paths: list[bytes] = []
+
+        for item in items:
+            cls = type(item)
+            class_id = classes.get(cls)
+            if class_id is None:
+                class_id = classes[cls] = len(classes)
+                new_classes.append(f"{cls.__module__}:{cls.__qualname__}")
+
+            text_keys = []
+            text_refs = []
+            path_keys = []
+            path_refs = []
+            int_keys = []
+            ints = []
+            float_keys = []
+            floats = []
+            pickled_keys = []
+            pickled = []
+            for key, value in item.items():
+                key_id = keys.get(key)
+                if key_id is None:
+                    if not isinstance(key, str):
+                        raise TypeError(f"Invalid key {key!r}")
+                    key_id = keys[key] = len(keys)
+                    new_keys.append(key)
+
+                if isinstance(value, str):
+                    if key in FILESYSTEM_TAGS:
+                        value_id = paths.get(value)
+                        if value_id is None:
+                            value_id = paths[value] = len(paths)
+                            new_paths.append(fsn2bytes(value, "utf-8"))
+                        path_keys.append(key_id)
+                        path_refs.append(value_id)
+                    else:
+                        value_id = texts.get(value)
+                        if value_id is None:
+                            value_id = texts[value] = len(texts)
+                            new_texts.append(value)
+                        text_keys.append(key_id)
+                        text_refs.append(value_id)
+                elif isinstance(value, float):
+                    float_keys.append(key_id)
+                    floats.append(value)
+                elif isinstance(value, int) and _INT_MIN <= value <= _INT_MAX:
+                    int_keys.append(key_id)
+                    ints.append(value)
+                else:
+                    pickled_keys.append(key_id)
+                    pickled.append(pickle_dumps(value, 2))
+
+            sizes = (
+                len(text_refs),
+                len(path_refs),
+                len(ints),
+                len(floats),
+                len(pickled),
+            )
+            fields = _get_song_struct(*sizes)
+            songs.append(
+                _SONG.pack(class_id, *sizes)
+                + fields.pack(
+                    *text_keys,
+                    *path_keys,
+                    *int_keys,
+                    *float_keys,
+                    *pickled_keys,
+                    *text_refs,
+                    *path_refs,
+                    *ints,
+                    *floats,
+                    *map(len, pickled),
+                )
+                + b"".join(pickled)
+            )
+
+            if len(songs) >= chunk_size:
+                write_chunk(songs, new_classes, new_keys, new_texts, new_paths)
+                for l in [songs, new_classes, new_keys, new_texts, new_paths]:
+                    del l[:]
+                yield
+
+        if songs:
+            write_chunk(songs, new_classes, new_keys, new_texts, new_paths)
+    except (
+        struct.error,
+        UnicodeError,
+        TypeError,
+        ValueError,
+        RuntimeError,
+        pickle.PicklingError,
+    ) as e:
+        # RuntimeError in case the library changes while saving
+        raise SerializationError(e) from e
+
+    fileobj.write(_RECORD.pack(_REC_END, 0))
+
+
+def _lookup_class(name: str) -> type | None:
+    module, _, qualname = name.partition(":")
+    try:
+        obj = importlib.import_module(module)
+        for attr in qualname.split("."):
+            obj = getattr(obj, attr)
+    except (ImportError, AttributeError):
+        return None
+    if not isinstance(obj, type) or not issubclass(obj, AudioFile):
+        return None
+    return obj
+
+
+def _read_chunk(buf, classes, keys, texts, paths, items):
+    """Appends the songs contained in the chunk payload buf to items
+    and returns the number of skipped songs.
+    """
+
+    num_songs, num_classes, num_keys, num_texts, num_paths = _CHUNK.unpack_from(buf)
+    pos = _CHUNK.size
+
+    new_classes, pos = _unpack_table(buf, pos, num_classes, _decode_text)
+    classes.extend(map(_lookup_class, new_classes))
+    new_keys, pos = _unpack_table(buf, pos, num_keys, _decode_text)
+    keys.extend(map(sys.intern, new_keys))
+    new_texts, pos = _unpack_table(buf, pos, num_texts, _decode_text)
+    texts.extend(new_texts)
+
+    lengths = struct.unpack_from(f"<{num_paths}I", buf, pos)
+    pos += 4 * num_paths + _SIZE.size
+    for length in lengths:
+        paths.append(bytes2fsn(buf[pos : pos + length], "utf-8"))
+        pos += length
+
+    skipped = 0
+    unpack_song = _SONG.unpack_from
+    song_size = _SONG.size
+    key = keys.__getitem__
+    text = texts.__getitem__
+    path = paths.__getitem__
+    new = dict.__new__
+    update = dict.update
+
+    for _i in range(num_songs):
+        class_id, num_texts, num_paths, num_ints, num_floats, num_pickled = unpack_song(
+            buf, pos
+        )
+        fields = _get_song_struct(
+            num_texts, num_paths, num_ints, num_floats, num_pickled
+        )
+        data = fields.unpack_from(buf, pos + song_size)
+        pos += song_size + fields.size
+        pickled_start = pos
+        if num_pickled:
+            pos += sum(data[-num_pickled:])
+
+        cls = classes[class_id]
+        if cls is None:
+            skipped += 1
+            continue
+
+        item = new(cls)
+        num_keys = num_texts + num_paths + num_ints + num_floats + num_pickled
+        values = list(map(text, data[num_keys : num_keys + num_texts]))
+        if num_paths:
+            start = num_keys + num_texts
+            values.extend(map(path, data[start : start + num_paths]))
+        if num_pickled:
+            values.extend(data[num_keys + num_texts + num_paths : -num_pickled])
+            for size in data[-num_pickled:]:
+                blob = buf[pickled_start : pickled_start + size]
+                values.append(pickle_loads(blob))
+                pickled_start += size
+        else:
+            values.extend(data[num_keys + num_texts + num_paths :])
+        update(item, zip(map(key, data[:num_keys]), values, strict=True))
+        items.append(item)
+
+    return skipped
+
+
+def read_audio_files(fileobj):
+    """Reads AudioFiles written by `write_audio_files` from fileobj.
+
+    The file gets read chunk by chunk, songs of classes which can't be
+    found are skipped.
+
+    Returns:
+        List[AudioFile]
+    Raises:
+        SerializationError
+    """
+
+    header = fileobj.read(len(BINARY_MAGIC) + _VERSION.size)
+    if len(header) < len(BINARY_MAGIC) + _VERSION.size or not is_binary_format(header):
+        raise SerializationError("Not a binary library file")
+    (version,) = _VERSION.unpack_from(header, len(BINARY_MAGIC))
+    if version > BINARY_VERSION:
+        raise SerializationError(f"Unsupported library file version {version}")
+
+    classes: list[type | None] = []
+    keys: list[str] = []
+    texts: list[str] = []
+    paths: list[str] = []
+    items: list[AudioFile] = []
+    skipped = 0
+
+    try:
+        while True:
+            head = fileobj.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                raise SerializationError("Library file is truncated")
+            kind, size = _RECORD.unpack(head)
+            if kind == _REC_END:
+                break
+            payload = fileobj.read(size)
+            if len(payload) < size:
+                raise SerializationError("Library file is truncated")
+            if kind == _REC_CHUNK:
+                skipped += _read_chunk(payload, classes, keys, texts, paths, items)
+            # unknown record types are from newer minor versions, skip them
+    except (
+        struct.error,
+        IndexError,
+        UnicodeError,
+        ValueError,
+        pickle.UnpicklingError,
+    ) as e:
+        raise SerializationError(e) from e
+
+    if skipped and not items:
+        raise SerializationError("all class lookups failed. something is wrong")
+
+    return items
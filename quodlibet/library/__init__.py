@@ -31,10 +31,21 @@ def init(cache_fn=None):
     """
 
     SongFileLibrary.librarian = SongLibrary.librarian = SongLibrarian()
+    coalesce = config.getint("library", "coalesce_signals")
+    if coalesce >= 0:
+        SongLibrary.librarian.enable_coalescing(coalesce)
     watch = config.getboolean("library", "watch")
     library = SongFileLibrary("main", watch_dirs=get_scan_dirs() if watch else [])
     if cache_fn:
         library.load(cache_fn)
+        if config.getboolean("library", "journal"):
+            library.enable_journal()
+    if config.getboolean("library", "skip_unchanged_dirs"):
+        library.enable_manifest()
+    if config.getboolean("library", "tag_index"):
+        library.enable_tag_index()
+    library.lazy_playlists = config.getboolean("library", "lazy_playlists")
+    library.columnar_queries = config.getboolean("library", "columnar_queries")
     return library
 
 
@@ -53,6 +64,8 @@ def save(save_period=None):
         if not filename or not lib.dirty:
             continue
 
+        if lib.journal is not None:
+            filename = lib.journal.filename
         if not save_period or abs(time.time() - mtime(filename)) > save_period:
             lib.save()
 
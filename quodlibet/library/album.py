@@ -24,6 +24,15 @@ class AlbumLibrary(Library[AlbumKey, Album]):
         super().__init__(f"AlbumLibrary for {library._name}")
 
         self._library = library
+        # the album key of every song (by id) at the time it was sorted in,
+        # so we know where to find it once its key changed
+        self._keys: dict[int, AlbumKey] = {}
+        # Albums aggregate from the numeric columns, which have to be
+        # connected first to be up to date in our handlers
+        numeric_columns = getattr(library, "numeric_columns", None)
+        self._numeric_columns = numeric_columns and numeric_columns()
+        sort_keys = getattr(library, "sort_keys", None)
+        self._sort_keys = sort_keys and sort_keys()
         self._asig = library.connect("added", self.__added)
         self._rsig = library.connect("removed", self.__removed)
         self._csig = library.connect("changed", self.__changed)
@@ -36,6 +45,7 @@ class AlbumLibrary(Library[AlbumKey, Album]):
     def destroy(self):
         for sig in [self._asig, self._rsig, self._csig]:
             self._library.disconnect(sig)
+        self._keys.clear()
 
     def _get(self, item):
         return self._contents.get(item)
@@ -43,15 +53,20 @@ class AlbumLibrary(Library[AlbumKey, Album]):
     def __add(self, items):
         changed = set()
         new = set()
+        keys = self._keys
         for song in items:
             key = song.album_key
-            if key in self._contents:
-                changed.add(self._contents[key])
+            album = self._contents.get(key)
+            if album is not None:
+                changed.add(album)
             else:
                 album = Album(song)
+                album.numeric_columns = self._numeric_columns
+                album.sort_keys = self._sort_keys
                 self._contents[key] = album
                 new.add(album)
-            self._contents[key].songs.add(song)
+            album.songs.add(song)
+            keys[id(song)] = key
 
         changed -= new
         return changed, new
@@ -68,18 +83,30 @@ class AlbumLibrary(Library[AlbumKey, Album]):
             if changed:
                 self.emit("changed", changed)
 
+    def __discard(self, song, key, changed, removed):
+        """Removes song from the album with key, which gets added to
+        either changed or removed (if it's empty now)
+        """
+
+        album = self._contents[key]
+        album.songs.discard(song)
+        if album.songs:
+            changed.add(album)
+        else:
+            removed.add(album)
+
     def __removed(self, library, items):
         changed = set()
         removed = set()
+        keys = self._keys
         for song in items:
-            key = song.album_key
-            album = self._contents[key]
-            album.songs.remove(song)
-            changed.add(album)
-            if not album.songs:
-                removed.add(album)
-                del self._contents[key]
+            key = keys.pop(id(song), None)
+            if key is None:
+                key = song.album_key
+            self.__discard(song, key, changed, removed)
 
+        for album in removed:
+            del self._contents[album.key]
         changed -= removed
 
         for album in changed:
@@ -91,36 +118,37 @@ class AlbumLibrary(Library[AlbumKey, Album]):
             self.emit("changed", changed)
 
     def __changed(self, library, items):
-        """Album keys could change between already existing ones... so we
-        have to do it the hard way and search by id."""
+        """Moves songs whose album key changed to their new album. Only
+        the albums of the changed songs are touched."""
         print_d("Updating affected albums for %d items" % len(items))
         changed = set()
         removed = set()
         to_add = []
+        keys = self._keys
+        contents = self._contents
         for song in items:
-            # in case the key hasn't changed
+            old_key = keys.get(id(song))
+            if old_key is None:
+                to_add.append(song)
+                continue
             key = song.album_key
-            if key in self._contents and song in self._contents[key].songs:
-                changed.add(self._contents[key])
-            else:  # key changed... look for it in each album
+            if key == old_key:
+                changed.add(contents[key])
+            else:
                 to_add.append(song)
-                for album in self._contents.values():
-                    if song in album.songs:
-                        album.songs.remove(song)
-                        if not album.songs:
-                            removed.add(album)
-                        else:
-                            changed.add(album)
-                        break
+                self.__discard(song, old_key, changed, removed)
+        changed -= removed
 
         # get new albums and changed ones because keys could have changed
         add_changed, new = self.__add(to_add)
         changed |= add_changed
 
         # check if albums that were empty at some point are still empty
-        for album in removed:
-            if not album.songs:
-                del self._contents[album.key]
+        for album in list(removed):
+            if album.songs:
+                removed.discard(album)
+            else:
+                del contents[album.key]
                 changed.discard(album)
 
         for album in changed:
@@ -12,6 +12,7 @@ import os
 import shutil
 from typing import TypeVar, Optional, Generic
 from collections.abc import (
+    Callable,
     Collection,
     Sequence,
     Iterable,
@@ -24,8 +25,18 @@ from gi.repository import GObject
 
 import quodlibet
 from quodlibet import util
-from quodlibet.formats import load_audio_files, dump_audio_files, SerializationError
+from quodlibet.formats import (
+    load_audio_files,
+    read_audio_files,
+    write_audio_files,
+    iter_write_audio_files,
+    is_binary_format,
+    SerializationError,
+)
 from quodlibet.formats._audio import HasKey
+from quodlibet.library.journal import LibraryJournal, JOURNAL_SUFFIX, replay_journal
+from quodlibet.library.manifest import DirectoryManifest
+from quodlibet.util import copool
 from quodlibet.util.atomic import atomic_save
 from quodlibet.util.collections import DictMixin
 from quodlibet.util.dprint import print_d, print_w
@@ -214,21 +225,58 @@ class Library(GObject.GObject, DictMixin, Generic[K, V]):
         return removals
 
 
+PICKLE_BACKUP_SUFFIX = ".pickle"
+"""Suffix of the copy of a pickled library file made before migrating it"""
+
+
+def _backup_pickled(filename) -> None:
+    """Keeps a copy of a pickled library file before it gets replaced,
+    for downgrades and as a fallback.
+
+    Raises:
+        OSError
+    """
+
+    backup = filename + PICKLE_BACKUP_SUFFIX
+    try:
+        with open(filename, "rb") as fp:
+            start = fp.read(16)
+    except FileNotFoundError:
+        return
+    if not start or is_binary_format(start) or os.path.exists(backup):
+        return
+    print_d(f"Keeping pickled library as {backup!r}")
+    shutil.copy(filename, backup)
+
+
+def _load_file(filename) -> Iterable[V]:
+    """Load items from a library file in either the binary or the
+    (old) pickle format.
+
+    Raises:
+        OSError, SerializationError
+    """
+
+    with open(filename, "rb") as fp:
+        if is_binary_format(fp.read(16)):
+            fp.seek(0)
+            return read_audio_files(fp)
+        fp.seek(0)
+        data = fp.read()
+    return load_audio_files(data)
+
+
 def _load_items(filename) -> Iterable[V]:
     """Load items from disk.
 
-    In case of an error returns default or an empty list.
+    In case of an error returns items from the backup of the pickled
+    library, if there is one, or an empty list.
     """
 
     try:
-        with open(filename, "rb") as fp:
-            data = fp.read()
+        return _load_file(filename)
     except OSError:
         print_w(f"Couldn't load library file from: {filename!r}")
-        return []
-
-    try:
-        items = load_audio_files(data)
     except SerializationError:
         # there are too many ways this could fail
         util.print_exc()
@@ -239,18 +287,40 @@ def _load_items(filename) -> Iterable[V]:
         except OSError:
             util.print_exc()
 
+    backup = filename + PICKLE_BACKUP_SUFFIX
+    if not os.path.exists(backup):
         return []
 
-    return items
+    print_w(f"Falling back to library backup {backup!r}")
+    try:
+        return _load_file(backup)
+    except (OSError, SerializationError):
+        util.print_exc()
+        return []
 
 
 class PicklingMixin:
-    """A mixin to provide persistence of a library by pickling to disk"""
+    """A mixin to provide persistence of a library by saving it to disk.
+
+    Libraries get saved in the binary format (see `write_audio_files`),
+    pickled files from older versions are read as well and migrated on
+    the next save.
+
+    With a journal enabled (see `enable_journal`) saving only appends the
+    changes since the last save to a journal file, which gets folded into
+    the library file in the background once it has grown large.
+    """
 
     filename = None
 
+    journal: LibraryJournal | None = None
+
+    # provided by the library
+    _name: str | None
+    get_content: Callable[[], Sequence]
+
     def load(self, filename):
-        """Load a library from a file, containing a picked list.
+        """Load a library from a file, containing a binary or a pickled list.
 
         Loading does not cause added, changed, or removed signals.
         """
@@ -259,6 +329,7 @@ class PicklingMixin:
         print_d(f"Loading contents of {filename!r}.", self)
 
         items = _load_items(filename)
+        items = replay_journal(filename + JOURNAL_SUFFIX, filename, items)
 
         # this loads all items without checking their validity, but makes
         # sure that non-mounted items are masked
@@ -266,21 +337,94 @@ class PicklingMixin:
 
         print_d(f"Done loading contents of {filename!r}", self._name)
 
+    def enable_journal(self) -> LibraryJournal:
+        """Save changes to a journal next to the library file instead of
+        rewriting the whole file each time. Needs a loaded library.
+        """
+
+        assert self.filename
+        if self.journal is None:
+            filename = self.filename + JOURNAL_SUFFIX
+            self.journal = LibraryJournal(self, filename, self.filename)
+        return self.journal
+
+    def disable_journal(self) -> None:
+        """Stop journaling, the next save writes the whole library again"""
+
+        if self.journal is None:
+            return
+        try:
+            copool.remove(self._compact_id)
+        except ValueError:
+            pass
+        self.journal.destroy()
+        self.journal = None
+        self.dirty = True
+
+    @property
+    def _compact_id(self):
+        return ("compact-library", id(self))
+
+    def compact(self) -> None:
+        """Fold the journal into a new library file, in the background"""
+
+        copool.add(self.iter_compact, funcid=self._compact_id)
+
+    def iter_compact(self) -> Generator[None, None, None]:
+        """Write a new library file containing all journaled changes and
+        start a new journal. Yields between chunks of songs.
+        """
+
+        journal = self.journal
+        if journal is None:
+            return
+        filename = self.filename
+        print_d(f"Compacting library journal {journal.filename!r}", self._name)
+
+        try:
+            journal.flush()
+            _backup_pickled(filename)
+            journal.begin_compaction()
+            with atomic_save(filename, "wb") as fileobj:
+                try:
+                    yield from iter_write_audio_files(fileobj, self.get_content())
+                except GeneratorExit:
+                    # stopped (e.g. on exit), don't leave the temp file behind
+                    fileobj.close()
+                    os.unlink(fileobj.name)
+                    raise
+        except SerializationError:
+            # Songs got modified while writing, we'll try again next time
+            util.print_exc()
+            journal.abort_compaction()
+        except OSError:
+            print_w(f"Couldn't save library to path {filename!r}")
+            journal.abort_compaction()
+        else:
+            journal.reset()
+
     def save(self, filename=None):
         """Save the library to the given filename, or the default if `None`"""
 
         if filename is None:
             filename = self.filename
 
+        journal = self.journal
+        if journal is not None and filename == self.filename:
+            if os.path.exists(filename):
+                self._save_journal(journal)
+                return
+
         print_d(f"Saving contents to {filename!r}", self._name)
 
         try:
             dirname = os.path.dirname(filename)
             mkdir(dirname)
+            _backup_pickled(filename)
             with atomic_save(filename, "wb") as fileobj:
-                fileobj.write(dump_audio_files(self.get_content()))
+                write_audio_files(fileobj, self.get_content())
         except SerializationError:
-            # Can happen when we try to pickle while the library is being
+            # Can happen when we try to save while the library is being
             # modified, like in the periodic 15min save.
             # Ignore, as it should try again later or on program exit.
             util.print_exc()
@@ -288,10 +432,29 @@ class PicklingMixin:
             print_w(f"Couldn't save library to path {filename!r}")
         else:
             self.dirty = False
+            if journal is not None and filename == self.filename:
+                journal.reset()
+
+    def _save_journal(self, journal):
+        print_d(f"Saving changes to {journal.filename!r}", self._name)
+
+        try:
+            journal.flush()
+        except SerializationError:
+            util.print_exc()
+        except OSError:
+            print_w(f"Couldn't save library journal {journal.filename!r}")
+        else:
+            self.dirty = False
+            if journal.needs_compaction():
+                self.compact()
 
 
 def iter_paths(
-    root: fsnative, exclude: Iterable[fsnative] | None = None, skip_hidden: bool = True
+    root: fsnative,
+    exclude: Iterable[fsnative] | None = None,
+    skip_hidden: bool = True,
+    manifest: DirectoryManifest | None = None,
 ) -> Generator[fsnative, None, None]:
     """Yields paths contained in root (symlinks dereferenced)
 
@@ -305,6 +468,8 @@ def iter_paths(
         exclude: ignore any of these
         skip_hidden: Ignore files which are hidden or where any
             of the parent directories are hidden.
+        manifest: Skip the files of directories unchanged since they were
+            recorded in it, and record all others (as pending)
     Yields:
         fsnative: absolute dereferenced paths
     """
@@ -314,25 +479,69 @@ def iter_paths(
     assert all(isinstance(p, fsnative) for p in exclude)
     assert os.path.abspath(root)
 
+    def excluded(path):
+        # FIXME: normalize paths..
+        return any(path.startswith(p) for p in exclude)
+
     def skip(path):
         if skip_hidden and is_hidden(path):
             return True
-        # FIXME: normalize paths..
-        return any(path.startswith(p) for p in exclude)
+        return excluded(path)
 
-    if skip_hidden and is_hidden(root):
-        return
+    def walk(path, real_path):
+        if manifest is not None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return
+            if manifest.unchanged(path, stat):
+                for name in manifest.subdirs(path):
+                    sub = os.path.join(path, name)
+                    yield from walk(sub, os.path.join(real_path, name))
+                return
 
-    for path, dnames, fnames in os.walk(root):
-        if skip_hidden:
-            dnames[:] = [
-                d for d in dnames if not is_hidden(path2fsn(os.path.join(path, d)))
-            ]
-        for filename in fnames:
-            full_filename = path2fsn(os.path.join(path, filename))
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            return
+
+        files = []
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                files.append(entry)
+            elif not (skip_hidden and is_hidden(entry.path) or entry.is_symlink()):
+                subdirs.append(entry.name)
+
+        complete = True
+        for entry in files:
+            full_filename = path2fsn(entry.path)
             if skip(full_filename):
+                complete = complete and not excluded(full_filename)
                 continue
-            full_filename = path2fsn(os.path.realpath(full_filename))
+            if entry.is_symlink():
+                full_filename = path2fsn(os.path.realpath(full_filename))
+            else:
+                full_filename = path2fsn(os.path.join(real_path, entry.name))
             if skip(full_filename):
+                complete = complete and not excluded(full_filename)
                 continue
-            yield full_filename  # type: ignore
+            yield full_filename
+
+        # directories with excluded files have to be scanned again, in case
+        # the exclusions change
+        if manifest is not None and complete:
+            manifest.record(path, stat, len(files), subdirs)
+
+        for name in subdirs:
+            yield from walk(os.path.join(path, name), os.path.join(real_path, name))
+
+    if skip_hidden and is_hidden(root):
+        return
+
+    yield from walk(root, path2fsn(os.path.realpath(root)))
@@ -0,0 +1,199 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from array import array
+from collections.abc import Iterable
+from typing import Any
+
+from quodlibet import config, print_d
+from quodlibet.formats import AudioFile
+
+MISSING = float("nan")
+"""Column value of songs without a value"""
+
+
+def _default(key: str) -> float | None:
+    """The value `AudioFile.__call__` returns for songs without a stored
+    value of `key`, which depends on the configuration
+    """
+
+    if key == "~#rating":
+        return config.RATINGS.default
+    return None
+
+
+def _value(song: AudioFile, key: str, float_keys: set[str]) -> float:
+    if key == "~#rating":
+        # the default is applied when the column is used, it can change
+        value = song.get(key)
+    else:
+        value = song(key, None)
+    if value is None:
+        return MISSING
+    if isinstance(value, float):
+        float_keys.add(key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return MISSING
+
+
+class NumericColumns:
+    """The values of numeric tags of all songs in a SongLibrary, stored in
+    one array per tag (a column) so that they can be compared, sorted and
+    aggregated without going through each `AudioFile`.
+
+    Every song gets a stable index into `songs` and all columns for as long
+    as it is in the library, indices of removed songs get reused. Columns
+    are built on first use and kept up to date through the
+    added/changed/removed signals of the library, so changes which aren't
+    announced through `SongLibrary.changed` aren't picked up.
+    """
+
+    def __init__(self, library):
+        print_d(f"Initializing numeric columns for {library._name!r}")
+
+        self._library = library
+        self.songs: list[AudioFile | None] = []
+        """All songs by index, None for unused indices"""
+
+        self._index: dict[int, int] = {}
+        self._free: list[int] = []
+        self._live: list[int] | None = None
+        self._columns: dict[str, array] = {}
+        # keys which had float values, others only had integers
+        self._float_keys: set[str] = set()
+
+        self._sigs = [
+            library.connect("added", self.__added),
+            library.connect("changed", self.__changed),
+            library.connect("removed", self.__removed),
+        ]
+        self.__added(library, library.values())
+
+    def destroy(self):
+        for sig in self._sigs:
+            self._library.disconnect(sig)
+        self.songs.clear()
+        self._index.clear()
+        self._free.clear()
+        self._live = None
+        self._columns.clear()
+        self._float_keys.clear()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __added(self, library, songs):
+        index = self._index
+        all_songs = self.songs
+        columns = self._columns.items()
+        float_keys = self._float_keys
+        for song in songs:
+            if id(song) in index:
+                continue
+            if self._free:
+                i = self._free.pop()
+                all_songs[i] = song
+            else:
+                i = len(all_songs)
+                all_songs.append(song)
+                for column in self._columns.values():
+                    column.append(MISSING)
+            index[id(song)] = i
+            for key, column in columns:
+                column[i] = _value(song, key, float_keys)
+        self._live = None
+
+    def __changed(self, library, songs):
+        index = self._index
+        columns = self._columns.items()
+        float_keys = self._float_keys
+        for song in songs:
+            i = index.get(id(song))
+            if i is not None:
+                for key, column in columns:
+                    column[i] = _value(song, key, float_keys)
+
+    def __removed(self, library, songs):
+        index = self._index
+        columns = self._columns.values()
+        for song in songs:
+            i = index.pop(id(song), None)
+            if i is not None:
+                self.songs[i] = None
+                for column in columns:
+                    column[i] = MISSING
+                self._free.append(i)
+        self._live = None
+
+    def index(self, song: AudioFile) -> int | None:
+        """Returns the index of song, or None if it's not in the library"""
+
+        return self._index.get(id(song))
+
+    def indices(self) -> list[int]:
+        """Returns the indices of all songs (don't modify the result)"""
+
+        if self._live is None:
+            self._live = [i for i, song in enumerate(self.songs) if song is not None]
+        return self._live
+
+    def songs_at(self, indices: Iterable[int]) -> list[AudioFile]:
+        songs = self.songs
+        return [song for song in map(songs.__getitem__, indices) if song is not None]
+
+    def column(self, key: str) -> array:
+        """Returns the values of the numeric tag `key` (like "~#playcount")
+        by song index, as returned by `AudioFile.__call__`. `MISSING` for
+        songs without a value and unused indices.
+        """
+
+        values = self._stored(key)
+        default = _default(key)
+        if default is not None:
+            values = array("d", [default if v != v else v for v in values])
+        return values
+
+    def _stored(self, key: str) -> array:
+        """Returns the cached column of `key`, without defaults applied"""
+
+        values = self._columns.get(key)
+        if values is None:
+            print_d(f"Building column for {key!r}")
+            values = array("d")
+            append = values.append
+            float_keys = self._float_keys
+            for song in self.songs:
+                append(MISSING if song is None else _value(song, key, float_keys))
+            self._columns[key] = values
+        return values
+
+    def get(self, songs: Iterable[AudioFile], key: str, default: Any = None) -> list:
+        """Returns the value of the numeric tag `key` for each song, or
+        `default` for songs without one (like `song(key, default)`).
+
+        Songs which aren't in the library work too, but are slower.
+        """
+
+        column = self._stored(key)
+        as_int = key not in self._float_keys
+        stored_default = _default(key)
+        missing = default if stored_default is None else stored_default
+        index = self._index
+        result: list = []
+        append = result.append
+        for song in songs:
+            i = index.get(id(song))
+            if i is None:
+                value = song(key, None)
+                append(default if value is None else value)
+            else:
+                value = column[i]
+                if value != value:
+                    append(missing)
+                else:
+                    append(int(value) if as_int else value)
+        return result
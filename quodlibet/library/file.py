@@ -5,14 +5,17 @@
 
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from pathlib import Path
 from collections.abc import Generator, Iterable
 
 from gi.repository import Gio, GLib, GObject
 
-from quodlibet import print_d, print_w, _, formats
+from quodlibet import print_d, print_w, _, formats, config
 from quodlibet.formats import AudioFileError, AudioFile
 from quodlibet.library.base import iter_paths, Library, PicklingMixin
+from quodlibet.library.manifest import DirectoryManifest, MANIFEST_SUFFIX
 from quodlibet.qltk.notif import Task
 from quodlibet.util import copool, print_exc
 from quodlibet.util.library import get_exclude_dirs
@@ -27,9 +30,46 @@ class FileLibrary(Library[fsnative, AudioFile], PicklingMixin):
     and have a mountpoint attribute.
     """
 
+    manifest: DirectoryManifest | None = None
+    """If set, directories unchanged since the last scan get skipped"""
+
     def __init__(self, name=None):
         super().__init__(name)
         self._masked = {}
+        self._manifest_items = None
+
+    def _count_content(self) -> int:
+        return len(self) + sum(len(items) for items in self._masked.values())
+
+    def enable_manifest(self) -> DirectoryManifest:
+        """Remember the state of scanned directories, so `scan` can skip
+        looking for new files in directories which haven't changed since.
+        Loads the manifest saved next to the library file, if any.
+        """
+
+        if self.manifest is None:
+            self.manifest = DirectoryManifest()
+            if self.filename:
+                count = self._count_content()
+                self.manifest.load(self.filename + MANIFEST_SUFFIX, count)
+                self._manifest_items = count
+        return self.manifest
+
+    def save(self, filename=None):
+        super().save(filename)
+
+        manifest = self.manifest
+        if manifest is None or filename not in (None, self.filename) or self.dirty:
+            return
+        count = self._count_content()
+        if manifest.dirty or count != self._manifest_items:
+            manifest_filename = self.filename + MANIFEST_SUFFIX
+            try:
+                manifest.save(manifest_filename, count)
+            except OSError:
+                print_w(f"Couldn't save directory manifest {manifest_filename!r}")
+            else:
+                self._manifest_items = count
 
     def _load_init(self, items):
         """Add many items to the library, check if the
@@ -197,6 +237,15 @@ class FileLibrary(Library[fsnative, AudioFile], PicklingMixin):
         """
         pass
 
+    def load_filename(self, filename: str | Path) -> AudioFile | None:
+        """Load a file without adding it to the library.
+        Unlike `add_filename` this gets called from worker threads.
+        Subclasses must override this to open the file correctly.
+
+        :return: the audio file (or None)
+        """
+        pass
+
     def contains_filename(self, filename) -> bool:
         """Returns if a song for the passed filename is in the library."""
         key = normalize_path(filename, True)
@@ -222,6 +271,12 @@ class FileLibrary(Library[fsnative, AudioFile], PicklingMixin):
                 return True
             return False
 
+        manifest = self.manifest
+        if manifest is not None:
+            # left over from an unfinished scan
+            manifest.discard()
+            manifest.reset_stats()
+
         # first scan each path for new files
         paths_to_load = []
         for scan_path in paths:
@@ -231,7 +286,7 @@ class FileLibrary(Library[fsnative, AudioFile], PicklingMixin):
                 if cofuncid:
                     task.copool(cofuncid)
 
-                for real_path in iter_paths(scan_path, exclude=exclude):
+                for real_path in iter_paths(scan_path, exclude, manifest=manifest):
                     if need_yield():
                         task.pulse()
                         yield
@@ -250,21 +305,90 @@ class FileLibrary(Library[fsnative, AudioFile], PicklingMixin):
             if cofuncid:
                 task.copool(cofuncid)
 
-            added = []
-            for real_path in task.gen(paths_to_load):
-                item = self.add_filename(real_path, False)
-                if item is not None:
-                    added.append(item)
-                    if len(added) > 100 or need_added():
+            workers = config.getint("library", "scan_workers")
+            if workers > 1 and len(paths_to_load) > 1:
+                yield from self._load_parallel(paths_to_load, workers, task)
+            else:
+                added = []
+                for real_path in task.gen(paths_to_load):
+                    item = self.add_filename(real_path, False)
+                    if item is not None:
+                        added.append(item)
+                        if len(added) > 100 or need_added():
+                            self.add(added)
+                            added = []
+                            yield
+                    if added and need_yield():
+                        yield
+                if added:
+                    self.add(added)
+                    added = []
+                    yield True
+
+        if manifest is not None:
+            if manifest.commit():
+                self.dirty = True
+            print_d(
+                f"Skipped {manifest.skipped_dirs} unchanged directories "
+                f"({manifest.skipped_files} files)",
+                self._name,
+            )
+
+    def _load_parallel(self, paths, workers, task):
+        """Load files in a pool of `workers` threads and add them in
+        batches. Yields regularly to keep the main loop responsive.
+        """
+
+        print_d(f"Loading {len(paths)} files using {workers} threads", self._name)
+
+        todo = iter(paths)
+        running = set()
+        added = []
+        done_count = 0
+        last_added = time.time()
+        pool = ThreadPoolExecutor(workers, thread_name_prefix="library-scan")
+        try:
+            while True:
+                deadline = time.time() + 0.015
+                while running or done_count < len(paths):
+                    # Only queue a few files ahead, so workers don't keep
+                    # going while the scan is paused
+                    for path in islice(todo, workers * 2 - len(running)):
+                        running.add(pool.submit(self.load_filename, path))
+                    timeout = max(deadline - time.time(), 0)
+                    done, running = wait(
+                        running, timeout=timeout, return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        try:
+                            item = future.result()
+                        except Exception:
+                            print_exc()
+                            continue
+                        # could have been added meanwhile, e.g. by the monitor
+                        if item is not None and not self.contains_filename(
+                            item("~filename")
+                        ):
+                            added.append(item)
+                    done_count += len(done)
+                    if time.time() >= deadline:
+                        break
+                task.update(done_count / len(paths))
+
+                if len(added) > 100 or time.time() - last_added > 1.0:
+                    if added:
                         self.add(added)
                         added = []
-                        yield
-                if added and need_yield():
-                    yield
-            if added:
-                self.add(added)
-                added = []
-                yield True
+                    last_added = time.time()
+                if done_count >= len(paths):
+                    break
+                yield
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        if added:
+            self.add(added)
+        yield True
 
     def get_content(self):
         """Return visible and masked items"""
@@ -323,7 +447,9 @@ class FileLibrary(Library[fsnative, AudioFile], PicklingMixin):
     def remove_masked(self, mount_point):
         """Remove all songs for a masked point"""
 
-        self._masked.pop(mount_point, {})
+        items = self._masked.pop(mount_point, {})
+        if items and self.journal is not None:
+            self.journal.discard(items.values())
 
     def move_root(
         self, old_root: str, new_root: fsnative, write_files: bool = True
@@ -0,0 +1,181 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import re
+import unicodedata
+from collections.abc import Iterable
+
+from quodlibet import print_d
+from quodlibet.formats import AudioFile, FILESYSTEM_TAGS
+from quodlibet.unisearch import fold
+
+_TOKEN = re.compile(r"\w+")
+
+NGRAM_SIZE = 3
+"""Length of the word parts indexed for substring lookups, shorter
+tokens can't be looked up"""
+
+
+def tokenize(text: str) -> set[str]:
+    """Returns the set of folded words contained in text"""
+
+    return set(_TOKEN.findall(fold(text)))
+
+
+def ngrams(word: str) -> set[str]:
+    """Returns all parts of word which are `NGRAM_SIZE` long"""
+
+    return {word[i : i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1)}
+
+
+class TagIndex:
+    """An inverted index of the text tags of all songs in a SongLibrary.
+
+    For every tag it keeps a map of (NFC normalized) values to the songs
+    having that value, a map of folded words (see `unisearch.fold`) to
+    the songs containing them and a map of word parts (see `ngrams`) to
+    the words containing them. The index is updated through the
+    added/changed/removed signals of the library, songs changed without
+    notifying the library will be out of date.
+
+    Lookups return candidate sets which are guaranteed to be a superset of
+    the matching songs, see `Node.candidates`.
+    """
+
+    def __init__(self, library):
+        print_d(f"Initializing tag index for {library._name!r}")
+
+        self._library = library
+        self._values: dict[str, dict[str, set[AudioFile]]] = {}
+        self._tokens: dict[str, dict[str, set[AudioFile]]] = {}
+        self._ngrams: dict[str, dict[str, set[str]]] = {}
+        self._entries: dict[AudioFile, list[tuple[str, list[str], set[str]]]] = {}
+        # songs mapped to increasing numbers, following the library order
+        self._positions: dict[AudioFile, int] = {}
+        self._next_position = 0
+
+        self._asig = library.connect("added", self.__added)
+        self._rsig = library.connect("removed", self.__removed)
+        self._csig = library.connect("changed", self.__changed)
+        self._add(library.values())
+
+    def destroy(self):
+        for sig in [self._asig, self._rsig, self._csig]:
+            self._library.disconnect(sig)
+        self._values.clear()
+        self._tokens.clear()
+        self._ngrams.clear()
+        self._entries.clear()
+        self._positions.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, songs: Iterable[AudioFile]) -> None:
+        all_values = self._values
+        all_tokens = self._tokens
+        all_ngrams = self._ngrams
+        positions = self._positions
+        normalize = unicodedata.normalize
+
+        for song in songs:
+            if song not in positions:
+                positions[song] = self._next_position
+                self._next_position += 1
+            entries = []
+            for tag, value in song.items():
+                if tag[:2] == "~#" or tag in FILESYSTEM_TAGS:
+                    continue
+                value = normalize("NFC", value)
+                lines = [l for l in value.split("\n") if l]
+                tokens = tokenize(value)
+                values = all_values.setdefault(tag, {})
+                for line in lines:
+                    values.setdefault(line, set()).add(song)
+                token_map = all_tokens.setdefault(tag, {})
+                ngram_map = all_ngrams.setdefault(tag, {})
+                for token in tokens:
+                    matching = token_map.get(token)
+                    if matching is None:
+                        token_map[token] = {song}
+                        for ngram in ngrams(token):
+                            ngram_map.setdefault(ngram, set()).add(token)
+                    else:
+                        matching.add(song)
+                entries.append((tag, lines, tokens))
+            self._entries[song] = entries
+
+    def _remove(self, songs: Iterable[AudioFile]) -> None:
+        all_values = self._values
+        all_tokens = self._tokens
+        all_ngrams = self._ngrams
+
+        for song in songs:
+            for tag, lines, tokens in self._entries.pop(song, []):
+                values = all_values[tag]
+                for line in lines:
+                    matching = values[line]
+                    matching.discard(song)
+                    if not matching:
+                        del values[line]
+                token_map = all_tokens[tag]
+                ngram_map = all_ngrams[tag]
+                for token in tokens:
+                    matching = token_map[token]
+                    matching.discard(song)
+                    if not matching:
+                        del token_map[token]
+                        for ngram in ngrams(token):
+                            words = ngram_map[ngram]
+                            words.discard(token)
+                            if not words:
+                                del ngram_map[ngram]
+
+    def __added(self, library, songs):
+        self._add(songs)
+
+    def __removed(self, library, songs):
+        self._remove(songs)
+        for song in songs:
+            self._positions.pop(song, None)
+
+    def __changed(self, library, songs):
+        self._remove(songs)
+        self._add(songs)
+
+    def exact(self, tag: str, value: str) -> set[AudioFile]:
+        """Returns all songs which have `value` as one of the values of `tag`
+        (case sensitive)
+        """
+
+        return set(self._values.get(tag, {}).get(value, ()))
+
+    def containing(self, tag: str, token: str) -> set[AudioFile] | None:
+        """Returns all songs having a word containing the folded `token`
+        in one of the values of `tag`, or None if `token` is too short to
+        be looked up
+        """
+
+        if len(token) < NGRAM_SIZE:
+            return None
+        ngram_map = self._ngrams.get(tag, {})
+        found = []
+        for ngram in ngrams(token):
+            words = ngram_map.get(ngram)
+            if not words:
+                return set()
+            found.append(words)
+        found.sort(key=len)
+        token_map = self._tokens[tag]
+        result: set[AudioFile] = set()
+        for word in found[0].intersection(*found[1:]):
+            if token in word:
+                result.update(token_map[word])
+        return result
+
+    def ordered(self, songs: Iterable[AudioFile]) -> list[AudioFile]:
+        """Returns the indexed songs in the order of the library"""
+
+        return sorted(songs, key=self._positions.__getitem__)
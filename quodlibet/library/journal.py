@@ -0,0 +1,290 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""An append-only journal of library changes.
+
+The journal lives next to a library file (the snapshot) and consists of
+a header identifying the snapshot it belongs to, followed by entries::
+
+    kind (u8) | payload size (u32) | payload crc32 (u32) | payload
+
+Entries either contain songs which were added or changed (serialized
+with `write_audio_files`) or the keys of songs which were removed. A
+journal not matching its snapshot is discarded, a partially written
+entry at the end (e.g. after a crash) is cut off.
+"""
+
+import io
+import os
+import struct
+import zlib
+from collections.abc import Iterable
+
+from quodlibet import util
+from quodlibet.formats import read_audio_files, write_audio_files, SerializationError
+from quodlibet.util.dprint import print_d, print_w
+
+JOURNAL_SUFFIX = ".journal"
+"""Suffix of the journal file, appended to the library file name"""
+
+MAGIC = b"QLJOURN\x00"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHQQ")
+_ENTRY = struct.Struct("<BII")
+
+_UPSERT = 1
+_REMOVE = 2
+
+
+def snapshot_id(filename) -> tuple[int, int]:
+    """Identifies the current version of a library file by its size
+    and modification time
+    """
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return (0, 0)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _pack_keys(keys: Iterable[str]) -> bytes:
+    return "\0".join(keys).encode("utf-8", "surrogatepass")
+
+
+def _unpack_keys(data: bytes) -> list[str]:
+    if not data:
+        return []
+    return data.decode("utf-8", "surrogatepass").split("\0")
+
+
+def _discard(filename) -> None:
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        util.print_exc()
+
+
+def replay_journal(filename, snapshot, items: Iterable) -> list:
+    """Returns `items`, loaded from the library file `snapshot`, with all
+    changes recorded in the journal `filename` applied.
+    """
+
+    try:
+        with open(filename, "rb") as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return list(items)
+    except OSError:
+        print_w(f"Couldn't read library journal {filename!r}")
+        return list(items)
+
+    if len(data) < _HEADER.size:
+        magic = None
+    else:
+        magic, version, size, mtime = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or (size, mtime) != snapshot_id(snapshot):
+        print_w(f"Discarding library journal {filename!r} of another library file")
+        _discard(filename)
+        return list(items)
+
+    contents = {item.key: item for item in items}
+    offset = _HEADER.size
+    count = 0
+    while offset + _ENTRY.size <= len(data):
+        kind, size, crc = _ENTRY.unpack_from(data, offset)
+        start = offset + _ENTRY.size
+        payload = data[start : start + size]
+        if len(payload) != size or zlib.crc32(payload) != crc:
+            break
+        if kind == _UPSERT:
+            try:
+                songs = read_audio_files(io.BytesIO(payload))
+            except SerializationError:
+                util.print_exc()
+                break
+            for song in songs:
+                contents[song.key] = song
+        elif kind == _REMOVE:
+            for key in _unpack_keys(payload):
+                contents.pop(key, None)
+        offset = start + size
+        count += 1
+
+    if offset != len(data):
+        print_w(f"Cutting off {len(data) - offset} bytes of incomplete journal")
+        try:
+            os.truncate(filename, offset)
+        except OSError:
+            util.print_exc()
+
+    print_d(f"Replayed {count} journal entries from {filename!r}")
+    return list(contents.values())
+
+
+class LibraryJournal:
+    """Collects changes of a library so that saving only has to append
+    them to the journal instead of rewriting the whole library file.
+
+    Changes are tracked through the added/changed/removed signals of the
+    library and written by `flush()`. Once the journal has grown too large
+    (see `needs_compaction()`) a new library file should be written, after
+    which `reset()` starts a new journal for it.
+    """
+
+    COMPACT_RATIO = 0.25
+    """Size of the journal relative to the library file needing compaction"""
+
+    COMPACT_MIN_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, library, filename, snapshot):
+        self._library = library
+        self.filename = filename
+        self.snapshot = snapshot
+
+        # The keys songs were written with, to record removals of old keys
+        # for renamed songs
+        self._keys = {item: item.key for item in library.get_content()}
+        self._pending: set = set()
+        self._removed: set = set()
+        self._redo: tuple[set, dict] | None = None
+
+        self._sigs = [
+            library.connect("added", self.__changed),
+            library.connect("changed", self.__changed),
+            library.connect("removed", self.__removed),
+        ]
+
+    def destroy(self):
+        for sig in self._sigs:
+            self._library.disconnect(sig)
+        self._keys.clear()
+        self._pending.clear()
+        self._removed.clear()
+
+    def __changed(self, library, items):
+        self._pending.update(items)
+        self._removed.difference_update(items)
+
+    def __removed(self, library, items):
+        self.discard(items)
+
+    def discard(self, items: Iterable) -> None:
+        """Record removal of items, if they aren't masked"""
+
+        items = set(items)
+        self._removed.update(items)
+        self._pending.difference_update(items)
+        if self._redo is not None:
+            self._redo[0].difference_update(items)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending or self._removed)
+
+    def flush(self) -> None:
+        """Appends all collected changes to the journal file.
+
+        Raises:
+            OSError, SerializationError
+        """
+
+        if not self.dirty:
+            return
+
+        library = self._library
+        masked = getattr(library, "masked", lambda item: False)
+        keys = self._keys
+
+        removed = {}
+        for item in self._removed:
+            if item not in library and not masked(item) and item in keys:
+                removed[item] = keys[item]
+        # renamed songs leave their old key behind
+        renamed = {}
+        for item in self._pending:
+            old = keys.get(item)
+            if old is not None and old != item.key:
+                renamed[item] = old
+
+        entries = []
+        if removed or renamed:
+            payload = _pack_keys(list(removed.values()) + list(renamed.values()))
+            entries.append((_REMOVE, payload))
+        if self._pending:
+            fileobj = io.BytesIO()
+            write_audio_files(fileobj, self._pending)
+            entries.append((_UPSERT, fileobj.getvalue()))
+
+        with open(self.filename, "ab") as fp:
+            start = fp.tell()
+            try:
+                if not start:
+                    header = _HEADER.pack(MAGIC, VERSION, *snapshot_id(self.snapshot))
+                    fp.write(header)
+                for kind, payload in entries:
+                    fp.write(_ENTRY.pack(kind, len(payload), zlib.crc32(payload)))
+                    fp.write(payload)
+                fp.flush()
+                os.fsync(fp.fileno())
+            except OSError:
+                # don't leave a partial entry behind for the next flush
+                fp.truncate(start)
+                raise
+
+        print_d(
+            f"Journaled {len(self._pending)} changed and {len(removed)} "
+            f"removed item(s) to {self.filename!r}"
+        )
+
+        for item in removed:
+            del keys[item]
+        for item in self._pending:
+            keys[item] = item.key
+        if self._redo is not None:
+            self._redo[0].update(self._pending)
+            self._redo[1].update(removed)
+        self._pending.clear()
+        self._removed.clear()
+
+    def needs_compaction(self) -> bool:
+        """Whether the journal has grown large enough that it should be
+        folded into a new library file
+        """
+
+        try:
+            size = os.path.getsize(self.filename)
+        except OSError:
+            return False
+        snapshot_size = snapshot_id(self.snapshot)[0]
+        return size > max(self.COMPACT_MIN_SIZE, snapshot_size * self.COMPACT_RATIO)
+
+    def begin_compaction(self) -> None:
+        """Marks the start of writing a new library file.
+
+        Changes flushed from now on get journaled again after `reset()`
+        as they might not be contained in the new library file.
+        """
+
+        self._redo = (set(), {})
+
+    def abort_compaction(self) -> None:
+        self._redo = None
+
+    def reset(self) -> None:
+        """Starts a new journal, to be called after the library file
+        was written
+        """
+
+        _discard(self.filename)
+        if self._redo is not None:
+            pending, removed = self._redo
+            self._redo = None
+            self._keys.update(removed)
+            self._removed.update(removed)
+            self._pending.update(pending)
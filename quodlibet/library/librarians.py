@@ -13,8 +13,9 @@ Librarians for libraries.
 
 import itertools
 from collections.abc import Iterable, Iterator, Generator
+from typing import Any
 
-from gi.repository import GObject
+from gi.repository import GObject, GLib
 
 from quodlibet.library.base import Library
 from quodlibet.library.playlist import PlaylistLibrary
@@ -46,8 +47,24 @@ class Librarian(GObject.GObject):
         self.libraries: dict[str, Library] = {}
         self.__signals = {}
 
+        self.__interval: int | None = None
+        self.__source_id: int | None = None
+        # item -> [known before, present after, removed and added again]
+        self.__pending: dict[Any, list[bool]] = {}
+        self.__received = 0
+
+        self.emissions_received = 0
+        """Number of library signals received while coalescing"""
+
+        self.emissions_saved = 0
+        """Number of signals which didn't get emitted thanks to coalescing"""
+
     def destroy(self) -> None:
-        pass
+        if self.__source_id is not None:
+            GLib.source_remove(self.__source_id)
+            self.__source_id = None
+        self.__pending.clear()
+        self.__interval = None
 
     def register(self, library: Library, name: str) -> None:
         """Register a library with this librarian."""
@@ -69,19 +86,101 @@ class Librarian(GObject.GObject):
             library.disconnect(signal_id)
         del self.__signals[library]
 
-    # FIXME: We can be smarter about this -- queue a list of items
-    # and fire the signal after a short wait, to take advantage of
-    # a case where many libraries fire a signal at the same time (or
-    # one fires a signal often).
+    def enable_coalescing(self, interval: int = 0) -> None:
+        """Merge the signals of all libraries into one added, removed and
+        changed signal (each with every item only once) which gets emitted
+        `interval` milliseconds after the first one, or once the main loop
+        is idle for 0.
+
+        Only affects the signals emitted by the librarian, the ones of the
+        libraries themselves are still emitted right away.
+        """
+
+        self.flush()
+        self.__interval = interval
+
+    def disable_coalescing(self) -> None:
+        """Emit pending and all future signals right away"""
+
+        self.flush()
+        self.__interval = None
+
+    def flush(self) -> None:
+        """Emit all pending signals now"""
+
+        if self.__source_id is not None:
+            GLib.source_remove(self.__source_id)
+            self.__source_id = None
+        if not self.__pending:
+            return
+
+        pending, self.__pending = self.__pending, {}
+        received, self.__received = self.__received, 0
+
+        removed, added, changed = [], [], []
+        for item, (known, present, re_added) in pending.items():
+            if known and not present:
+                removed.append(item)
+            elif present and not known:
+                added.append(item)
+            elif present and re_added:
+                removed.append(item)
+                added.append(item)
+            elif present:
+                changed.append(item)
+
+        emitted = 0
+        for signal, items in [
+            ("removed", removed),
+            ("added", added),
+            ("changed", changed),
+        ]:
+            if items:
+                self.emit(signal, items)
+                emitted += 1
+        self.emissions_saved += received - emitted
+        print_d(f"Emitted {emitted} signal(s) for {received} coalesced ones")
+
+    def __flush_cb(self) -> bool:
+        self.__source_id = None
+        self.flush()
+        return False
+
+    def __queue(self, signal: str, items: Iterable) -> None:
+        pending = self.__pending
+        for item in items:
+            state = pending.get(item)
+            if state is None:
+                pending[item] = [signal != "added", signal != "removed", False]
+            else:
+                state[2] = state[2] or (signal == "added" and state[0])
+                state[1] = signal != "removed"
+
+        self.__received += 1
+        self.emissions_received += 1
+        if self.__source_id is None:
+            if self.__interval:
+                self.__source_id = GLib.timeout_add(self.__interval, self.__flush_cb)
+            else:
+                self.__source_id = GLib.idle_add(self.__flush_cb)
 
     def __changed(self, _library: Library, items: Iterable) -> None:
-        self.emit("changed", items)
+        if self.__interval is None:
+            self.emit("changed", items)
+        else:
+            self.__queue("changed", items)
 
     def __added(self, _library: Library, items: Iterable) -> None:
-        self.emit("added", items)
+        if self.__interval is None:
+            self.emit("added", items)
+        else:
+            self.__queue("added", items)
 
     def __removed(self, _library: Library, items: Iterable) -> None:
-        self.emit("removed", items)
+        if self.__interval is None:
+            self.emit("removed", items)
+        else:
+            self.__queue("removed", items)
 
     def changed(self, items: Iterable) -> None:
         """Triage the items and inform their real libraries."""
@@ -165,6 +264,23 @@ class SongLibrarian(Librarian):
             value for lib in self.libraries.values() for value in lib.tag_values(tag)
         }
 
+    def tag_values_starting_with(self, tag, prefix, limit=None):
+        """Return the values for the given tag starting with prefix
+        (ignoring case) of all libraries, sorted. At most `limit` if given."""
+        values = set()
+        for library in self.libraries.values():
+            if hasattr(library, "tag_values_starting_with"):
+                values.update(library.tag_values_starting_with(tag, prefix, limit))
+        return sorted(values, key=lambda v: (v.casefold(), v))[:limit]
+
+    def tag_names(self):
+        """Return a set of the names of all tags of all songs."""
+        names = set()
+        for library in self.libraries.values():
+            if hasattr(library, "tag_names"):
+                names.update(library.tag_names())
+        return names
+
     def rename(self, song, newname, changed=None):
         """Rename the song in all libraries it belongs to.
 
@@ -0,0 +1,151 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import json
+import os
+import time
+from typing import NamedTuple
+
+from quodlibet import util
+from quodlibet.util.atomic import atomic_save
+from quodlibet.util.dprint import print_d, print_w
+
+MANIFEST_SUFFIX = ".dirs"
+"""Suffix of the manifest file, appended to the library file name"""
+
+MANIFEST_VERSION = 1
+
+
+class DirState(NamedTuple):
+    mtime_ns: int
+    """Modification time of the directory"""
+
+    files: int
+    """Number of (non-directory) entries"""
+
+    scanned: float
+    """Time of the scan"""
+
+    subdirs: list[str]
+    """Names of the sub directories which were visited"""
+
+
+class DirectoryManifest:
+    """Remembers the state of scanned directories, so that directories which
+    haven't changed since (no entries added, removed or renamed) can be
+    skipped when scanning again.
+
+    Note that changing the content of a file doesn't change the modification
+    time of its directory.
+
+    New states get recorded as pending and only take effect once the scan
+    using them has finished and calls `commit()`.
+    """
+
+    MTIME_SLACK = 2.0
+    """Directories modified this close to the scan aren't trusted to be
+    unchanged, due to coarse file system time stamps"""
+
+    def __init__(self):
+        self._dirs: dict[str, DirState] = {}
+        self._pending: dict[str, DirState] = {}
+        self.dirty = False
+        self.skipped_dirs = 0
+        self.skipped_files = 0
+
+    def __len__(self):
+        return len(self._dirs)
+
+    def reset_stats(self) -> None:
+        self.skipped_dirs = self.skipped_files = 0
+
+    def unchanged(self, path: str, stat: os.stat_result) -> bool:
+        """Whether the directory at `path` with the current `stat` is
+        unchanged since it was last recorded. Counts it as skipped if so.
+        """
+
+        state = self._dirs.get(path)
+        if state is None or state.mtime_ns != stat.st_mtime_ns:
+            return False
+        if state.scanned - stat.st_mtime_ns / 1e9 < self.MTIME_SLACK:
+            return False
+        self.skipped_dirs += 1
+        self.skipped_files += state.files
+        return True
+
+    def subdirs(self, path: str) -> list[str]:
+        return self._dirs[path].subdirs
+
+    def record(self, path: str, stat: os.stat_result, files: int, subdirs) -> None:
+        """Records the state of a scanned directory (pending)"""
+
+        self._pending[path] = DirState(
+            stat.st_mtime_ns, files, time.time(), list(subdirs)
+        )
+
+    def commit(self) -> bool:
+        """Applies all pending states. Returns True if there were any."""
+
+        if not self._pending:
+            return False
+        self._dirs.update(self._pending)
+        self._pending.clear()
+        self.dirty = True
+        return True
+
+    def discard(self) -> None:
+        """Drops all pending states"""
+
+        self._pending.clear()
+
+    def clear(self) -> None:
+        self._dirs.clear()
+        self._pending.clear()
+        self.dirty = False
+
+    def load(self, filename: str, items: int) -> None:
+        """Loads the manifest of a library containing `items` items.
+
+        Manifests written for a different number of library items get
+        ignored, as they can't be trusted to describe the library.
+        """
+
+        self.clear()
+        try:
+            with open(filename, encoding="utf-8") as h:
+                data = json.load(h)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            print_w(f"Couldn't load directory manifest {filename!r}")
+            util.print_exc()
+            return
+
+        if data.get("version") != MANIFEST_VERSION or data.get("items") != items:
+            print_d(f"Ignoring outdated directory manifest {filename!r}")
+            return
+        try:
+            for path, (mtime_ns, files, scanned, subdirs) in data["dirs"].items():
+                self._dirs[path] = DirState(mtime_ns, files, scanned, subdirs)
+        except (KeyError, TypeError, ValueError):
+            util.print_exc()
+            self.clear()
+
+    def save(self, filename: str, items: int) -> None:
+        """Saves the manifest of a library containing `items` items
+
+        Raises:
+            OSError
+        """
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "items": items,
+            "dirs": {path: list(state) for path, state in self._dirs.items()},
+        }
+        # json escapes (lone surrogates of) undecodable paths
+        with atomic_save(filename, "w") as h:
+            json.dump(data, h, separators=(",", ":"))
+        self.dirty = False
@@ -30,16 +30,32 @@ class PlaylistLibrary(Library[str, Playlist]):
 
     The library behaves like a dictionary: the keys are playlist names,
     the values are Playlist objects.
+
+    If `lazy` is True, only the locations of the tracks get read on startup,
+    they get looked up in the song library once a playlist gets used.
     """
 
-    def __init__(self, library: Library, pl_dir: _fsnative = _DEFAULT_PLAYLIST_DIR):
+    def __init__(
+        self,
+        library: Library,
+        pl_dir: _fsnative = _DEFAULT_PLAYLIST_DIR,
+        lazy: bool = False,
+    ):
         self.librarian = None
         super().__init__(f"{type(self).__name__} for {library._name}")
         print_d(f"Initializing Playlist Library {self} to watch {library._name!r}")
         self.pl_dir = pl_dir
+        self._lazy = lazy
         if library is None:
             raise ValueError("Need a library to listen to")
         self._library = library
+        # songs mapped to the playlists featuring them,
+        # kept up to date by the playlists themselves
+        self._featuring: dict[AudioFile, set[Playlist]] = {}
+        # lazily read playlists, as long as their songs weren't read
+        self._unread: set[Playlist] = set()
+        self.connect("added", self.__playlists_added)
+        self.connect("removed", self.__playlists_removed)
         self._read_playlists(library)
 
         self._rsig = library.connect("removed", self.__songs_removed)
@@ -65,7 +81,9 @@ class PlaylistLibrary(Library[str, Playlist]):
                 print_d(f"Ignoring hidden file {fn!r}")
                 continue
             try:
-                XSPFBackedPlaylist(self.pl_dir, fn, songs_lib=library, pl_lib=self)
+                XSPFBackedPlaylist(
+                    self.pl_dir, fn, songs_lib=library, pl_lib=self, lazy=self._lazy
+                )
             except TypeError as e:
                 # Don't add to library - it's temporary
                 legacy = FileBackedPlaylist(
@@ -126,17 +144,80 @@ class PlaylistLibrary(Library[str, Playlist]):
     def destroy(self):
         for sig in [self._rsig, self._csig]:
             self._library.disconnect(sig)
+        self._featuring.clear()
+        self._unread.clear()
 
     def playlists_featuring(self, song: AudioFile) -> Generator[Playlist, None, None]:
         """Returns a generator yielding playlists in which this song appears"""
-        return (pl for pl in self if song in pl._list)
+        self.__load_unread()
+        yield from sorted(self._featuring.get(song, ()))
+
+    def _featuring_added(self, playlist: Playlist, song: AudioFile) -> None:
+        """Called by playlists once song got added to them"""
+        playlists = self._featuring.get(song)
+        if playlists is None:
+            self._featuring[song] = {playlist}
+        else:
+            playlists.add(playlist)
+
+    def _featuring_removed(self, playlist: Playlist, song: AudioFile) -> None:
+        """Called by playlists once the last occurrence of song got removed"""
+        playlists = self._featuring.get(song)
+        if playlists is not None:
+            playlists.discard(playlist)
+            if not playlists:
+                del self._featuring[song]
+
+    def __featuring_any(self, songs: Iterable[AudioFile]) -> set[Playlist]:
+        featuring = self._featuring
+        result: set[Playlist] = set()
+        for song in songs:
+            playlists = featuring.get(song)
+            if playlists:
+                result.update(playlists)
+        return result
+
+    def _unread_added(self, playlist: Playlist) -> None:
+        """Called by lazily read playlists once their tracks got counted"""
+        self._unread.add(playlist)
+
+    def _unread_removed(self, playlist: Playlist) -> None:
+        """Called by lazily read playlists before reading their songs"""
+        self._unread.discard(playlist)
+
+    def __load_unread(self) -> None:
+        """Reads the songs of all lazily read playlists, so they are in
+        the index"""
+        if self._unread:
+            print_d(f"Reading {len(self._unread)} playlist(s) for a lookup")
+            for playlist in list(self._unread):
+                playlist.load()
+
+    def __playlists_added(self, library, playlists):
+        for playlist in playlists:
+            # unread playlists get indexed once read
+            if playlist.loaded:
+                for song in playlist.songs:
+                    self._featuring_added(playlist, song)
+
+    def __playlists_removed(self, library, playlists):
+        for playlist in playlists:
+            if playlist.loaded:
+                for song in playlist.songs:
+                    self._featuring_removed(playlist, song)
+            else:
+                self._unread_removed(playlist)
+            # Later edits to a removed playlist mustn't touch our index
+            playlist.pl_lib = None
 
     def __songs_removed(self, library, songs):
+        self.__load_unread()
+        playlists = self.__featuring_any(songs)
         print_d(
             f"Removing {len(songs)} song(s) "
-            f"across {len(self)} playlist(s) in {self}"
+            f"across {len(playlists)} playlist(s) in {self}"
         )
-        changed = {pl for pl in self if pl.remove_songs(songs)}
+        changed = {pl for pl in playlists if pl.remove_songs(songs)}
         if changed:
             for pl in changed:
                 pl.write()
@@ -154,13 +235,8 @@ class PlaylistLibrary(Library[str, Playlist]):
     def __songs_changed(self, library, songs) -> None:
         # Q: what if the changes are entirely due to changes *from* this library?
         # A: seems safest to still emit 'changed' as collections can cache metadata etc
-        changed = set()
-        for playlist in self:
-            for song in songs:
-                if song in playlist.songs:
-                    changed.add(playlist)
-                    # It's definitely changed now, nothing else is interesting
-                    break
+        # Playlists which weren't read yet can't have cached anything
+        changed = self.__featuring_any(songs)
         if changed:
             # TODO: only write if anything *persisted* changes (#3622)
             #  i.e. not internal stuff (notably: ~playlists itself)
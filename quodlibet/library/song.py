@@ -10,8 +10,12 @@ from quodlibet import util, print_d
 from quodlibet.formats import MusicFile, AudioFile
 from quodlibet.library.album import AlbumLibrary
 from quodlibet.library.base import Library, PicklingMixin, K
+from quodlibet.library.columns import NumericColumns
 from quodlibet.library.file import WatchedFileLibraryMixin
+from quodlibet.library.index import TagIndex
 from quodlibet.library.playlist import PlaylistLibrary
+from quodlibet.library.sortkeys import SortKeys
+from quodlibet.library.values import ValueCounts
 from quodlibet.query import Query
 from quodlibet.util.path import normalize_path
 from senf import fsnative
@@ -26,8 +30,63 @@ class SongLibrary(Library[K, V], PicklingMixin):
     interface.
     """
 
+    tag_index: TagIndex | None = None
+    """An optional inverted index used for speeding up queries"""
+
+    lazy_playlists: bool = False
+    """If the songs of playlists should only be read once they get used"""
+
+    columnar_queries: bool = False
+    """If `Query.filter` should compare numeric tags using `numeric_columns`.
+    Only changes announced through `changed` are seen by those."""
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._numeric_columns: NumericColumns | None = None
+        self._sort_keys: SortKeys | None = None
+        self._value_counts: ValueCounts | None = None
+
+    def enable_tag_index(self) -> TagIndex:
+        """Builds an index of all tag values which gets used by `query` and
+        `Query.filter` from now on. Returns the index.
+        """
+        if self.tag_index is None:
+            self.tag_index = TagIndex(self)
+        return self.tag_index
+
+    def disable_tag_index(self) -> None:
+        if self.tag_index is not None:
+            self.tag_index.destroy()
+            self.tag_index = None
+
+    def numeric_columns(self) -> NumericColumns:
+        """Returns the numeric tag values of all songs in columns, used by
+        `Query.filter` for comparing numeric tags (see `columnar_queries`)
+        """
+        if self._numeric_columns is None:
+            self._numeric_columns = NumericColumns(self)
+        return self._numeric_columns
+
+    def sort_keys(self) -> SortKeys:
+        """Returns the cached sort keys of all songs, used by song lists and
+        browsers for sorting
+        """
+        if self._sort_keys is None:
+            self._sort_keys = SortKeys(self)
+        return self._sort_keys
+
+    def value_counts(self) -> ValueCounts:
+        """Returns the values of tags and the tag names of all songs, used
+        for `tag_values` and completion
+        """
+        if self._value_counts is None:
+            self._value_counts = ValueCounts(self)
+        return self._value_counts
+
+    def _changed(self, items):
+        if self._sort_keys is not None:
+            self._sort_keys.changed(items)
+        super()._changed(items)
 
     @util.cached_property
     def albums(self):
@@ -35,12 +94,23 @@ class SongLibrary(Library[K, V], PicklingMixin):
 
     @util.cached_property
     def playlists(self):
-        pl_lib = PlaylistLibrary(self)
+        pl_lib = PlaylistLibrary(self, lazy=self.lazy_playlists)
         print_d(f"Created playlist library {pl_lib}")
         return pl_lib
 
     def destroy(self):
         super().destroy()
+        self.disable_tag_index()
+        if self._numeric_columns is not None:
+            self._numeric_columns.destroy()
+            self._numeric_columns = None
+        if self._sort_keys is not None:
+            self._sort_keys.destroy()
+            self._sort_keys = None
+        if self._value_counts is not None:
+            self._value_counts.destroy()
+            self._value_counts = None
+        self.disable_journal()
         if "albums" in self.__dict__:
             self.albums.destroy()
         if "playlists" in self.__dict__:
@@ -48,7 +118,16 @@ class SongLibrary(Library[K, V], PicklingMixin):
 
     def tag_values(self, tag):
         """Return a set of all values for the given tag."""
-        return {value for song in self.values() for value in song.list(tag)}
+        return set(self.value_counts().counts(tag))
+
+    def tag_values_starting_with(self, tag, prefix, limit=None):
+        """Return the values for the given tag starting with prefix
+        (ignoring case), sorted. At most `limit` if given."""
+        return self.value_counts().starting_with(tag, prefix, limit)
+
+    def tag_names(self):
+        """Return a set of the names of all tags of all songs."""
+        return set(self.value_counts().tags())
 
     def rename(self, song, new_name, changed: set | None = None):
         """Rename a song.
@@ -81,8 +160,7 @@ class SongLibrary(Library[K, V], PicklingMixin):
 
         songs = self.values()
         if text != "":
-            search = Query(text, star).search
-            songs = [s for s in songs if search(s)]
+            songs = Query(text, star).filter(self)
         return songs
 
 
@@ -100,6 +178,9 @@ class SongFileLibrary(SongLibrary, WatchedFileLibraryMixin):
         key = normalize_path(filename, True)
         return self._contents.get(key)
 
+    def load_filename(self, filename: str | Path) -> AudioFile | None:
+        return MusicFile(filename)
+
     def add_filename(self, filename: str | Path, add: bool = True) -> AudioFile | None:
         """Add a song to the library based on filename.
 
@@ -116,7 +197,7 @@ class SongFileLibrary(SongLibrary, WatchedFileLibraryMixin):
         key = normalize_path(filename, True)
         song = None
         if key not in self._contents:
-            song = MusicFile(filename)
+            song = self.load_filename(filename)
             if song and add:
                 self.add([song])
         else:
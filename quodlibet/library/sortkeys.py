@@ -0,0 +1,161 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from senf import fsn2text
+
+from quodlibet import print_d
+from quodlibet.formats import AudioFile
+from quodlibet.formats._audio import FILESYSTEM_TAGS
+from quodlibet.util import human_sort_key
+
+Tag = str | Callable[[AudioFile], str]
+
+
+class SortKeys:
+    """The sort keys of the songs in a SongLibrary by tag, as returned by
+    `AudioFile.sort_by_func`.
+
+    Keys get computed on first use and are kept until the song changes or
+    gets removed from the library. `human` keys are shared between all songs
+    (and albums) with the same value, so e.g. an artist only gets split and
+    normalized once.
+
+    Without a library nothing but the `human` keys gets cached.
+    """
+
+    MAX_VALUES = 200000
+    """Number of memoized `human` keys after which they get dropped"""
+
+    def __init__(self, library=None):
+        self._library = library
+        self._songs: set[int] = set()
+        self._keys: dict[str, dict[int, Any]] = {}
+        self._values: dict[str, tuple] = {}
+        self._sigs = []
+
+        if library is not None:
+            print_d(f"Initializing sort keys for {library._name!r}")
+            self._songs.update(map(id, library.values()))
+            self._sigs = [
+                library.connect("added", self.__added),
+                library.connect("changed", self.__changed),
+                library.connect("removed", self.__removed),
+            ]
+
+    def destroy(self):
+        for sig in self._sigs:
+            self._library.disconnect(sig)
+        self._songs.clear()
+        self._keys.clear()
+        self._values.clear()
+
+    def __added(self, library, songs):
+        self._songs.update(map(id, songs))
+
+    def __changed(self, library, songs):
+        self.changed(songs)
+
+    def __removed(self, library, songs):
+        self._songs.difference_update(map(id, songs))
+        self.changed(songs)
+
+    def changed(self, songs: Iterable[AudioFile]):
+        """Forgets the keys of songs. The library calls this before emitting
+        "changed", so handlers connected before us can't sort with stale keys.
+        """
+
+        ids = set(map(id, songs))
+        for keys in self._keys.values():
+            for i in ids:
+                keys.pop(i, None)
+
+    def human(self, value: str) -> tuple:
+        """Memoized `util.human_sort_key`"""
+
+        key = self._values.get(value)
+        if key is None:
+            if len(self._values) >= self.MAX_VALUES:
+                self._values.clear()
+            key = self._values[value] = human_sort_key(value)
+        return key
+
+    def __compute_func(self, tag: Tag) -> Callable[[AudioFile], Any]:
+        human = self.human
+
+        if callable(tag):
+            return lambda song: human(tag(song))
+        elif tag == "":
+            return lambda song: song.sort_key
+        elif tag == "artistsort":
+            return lambda song: song.sort_key[1][2]
+        elif tag in FILESYSTEM_TAGS:
+            return lambda song: fsn2text(song(tag))
+        return lambda song: human(song(tag))
+
+    def key_func(self, tag: Tag) -> Callable[[AudioFile], Any]:
+        """Returns a function giving the sort key of a song for `tag`, which
+        can be a tag, a tied tag, a function returning a string or "" for the
+        default sort key.
+        """
+
+        if isinstance(tag, str) and tag.startswith("~#") and "~" not in tag[2:]:
+            return lambda song: song(tag, 0)
+
+        compute = self.__compute_func(tag)
+        if not isinstance(tag, str) or tag == "":
+            # the default key is already cached by the songs themselves
+            return compute
+
+        keys = self._keys.setdefault(tag, {})
+        songs = self._songs
+
+        def get(song):
+            i = id(song)
+            try:
+                return keys[i]
+            except KeyError:
+                key = compute(song)
+                # songs outside of the library would never get invalidated
+                if i in songs:
+                    keys[i] = key
+                return key
+
+        return get
+
+    def get(self, songs: Iterable[AudioFile], tag: Tag) -> list:
+        """Returns the sort keys of all songs for `tag`"""
+
+        if isinstance(tag, str) and tag.startswith("~#") and "~" not in tag[2:]:
+            numeric_columns = getattr(self._library, "numeric_columns", None)
+            if numeric_columns is not None:
+                return numeric_columns().get(songs, tag, 0)
+        return list(map(self.key_func(tag), songs))
+
+    def order(
+        self, songs: list[AudioFile], tags: Iterable[tuple[Tag, bool]]
+    ) -> list[int]:
+        """Returns the indices of songs in sorted order.
+
+        `tags` are (tag, reverse) pairs, least significant first like when
+        sorting with multiple stable passes. Neighbouring tags sorting in the
+        same direction get combined into one key, so songs get sorted only
+        once unless the direction changes.
+        """
+
+        groups: list[tuple[bool, list]] = []
+        for tag, reverse in tags:
+            if not groups or groups[-1][0] != reverse:
+                groups.append((reverse, []))
+            groups[-1][1].append(tag)
+
+        song_order = list(range(len(songs)))
+        for reverse, group in groups:
+            columns = [self.get(songs, tag) for tag in reversed(group)]
+            keys = columns[0] if len(columns) == 1 else list(zip(*columns, strict=True))
+            song_order.sort(key=keys.__getitem__, reverse=reverse)
+        return song_order
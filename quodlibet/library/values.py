@@ -0,0 +1,199 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from bisect import bisect_left
+from collections.abc import Iterable, KeysView
+from typing import Any
+
+from quodlibet import print_d
+from quodlibet.formats import AudioFile
+
+KEPT_SYNTHETIC = {"~people"}
+"""Synthetic tags whose values only depend on other tags of the song,
+values of other synthetic tags (like "~playlists" or "~rating") can change
+without the song changing, so these get collected on every use"""
+
+
+def _kept(tag: str) -> bool:
+    return not str(tag).startswith("~") or tag in KEPT_SYNTHETIC
+
+
+class ValueCounts:
+    """The values of tags of all songs in a SongLibrary, with the number of
+    songs having each of them, and the names of all tags the songs have.
+
+    Values of a tag get collected on first use (through `AudioFile.list`, so
+    tied and synthetic tags like "~people" work too) and are kept up to date
+    through the added/changed/removed signals of the library from then on,
+    except for synthetic tags not in `KEPT_SYNTHETIC`.
+    """
+
+    def __init__(self, library):
+        print_d(f"Initializing value counts for {library._name!r}")
+
+        self._library = library
+        self._counts: dict[str, dict[Any, int]] = {}
+        # values of each song by tag, to know what to forget once it changes
+        self._song_values: dict[str, dict[int, list]] = {}
+        # (casefolded value, value) pairs, sorted for prefix lookups
+        self._sorted: dict[str, list[tuple[str, str]]] = {}
+
+        # tag names are counted per distinct set of them, most songs share
+        # the set of tags they have with many others
+        self._key_sets: dict[int, frozenset[str]] | None = None
+        self._key_set_counts: dict[frozenset[str], int] = {}
+        self._interned: dict[frozenset[str], frozenset[str]] = {}
+        self._names: dict[str, int] = {}
+
+        self._sigs = [
+            library.connect("added", self.__added),
+            library.connect("changed", self.__changed),
+            library.connect("removed", self.__removed),
+        ]
+
+    def destroy(self):
+        for sig in self._sigs:
+            self._library.disconnect(sig)
+        self._counts.clear()
+        self._song_values.clear()
+        self._sorted.clear()
+        self._key_sets = None
+        self._key_set_counts.clear()
+        self._interned.clear()
+        self._names.clear()
+
+    def __added(self, library, songs):
+        self._add(songs)
+
+    def __changed(self, library, songs):
+        self._remove(songs)
+        self._add(songs)
+
+    def __removed(self, library, songs):
+        self._remove(songs)
+
+    def _add(self, songs: Iterable[AudioFile]) -> None:
+        for tag, song_values in self._song_values.items():
+            self.__add_values(tag, song_values, songs)
+        if self._key_sets is not None:
+            self.__add_keys(songs)
+
+    def _remove(self, songs: Iterable[AudioFile]) -> None:
+        for tag, song_values in self._song_values.items():
+            counts = self._counts[tag]
+            for song in songs:
+                for value in song_values.pop(id(song), ()):
+                    count = counts[value] - 1
+                    if count:
+                        counts[value] = count
+                    else:
+                        del counts[value]
+                        self._sorted.pop(tag, None)
+
+        key_sets = self._key_sets
+        if key_sets is not None:
+            set_counts = self._key_set_counts
+            names = self._names
+            for song in songs:
+                keys = key_sets.pop(id(song), None)
+                if keys is None:
+                    continue
+                count = set_counts[keys] - 1
+                if count:
+                    set_counts[keys] = count
+                    continue
+                del set_counts[keys]
+                del self._interned[keys]
+                for name in keys:
+                    count = names[name] - 1
+                    if count:
+                        names[name] = count
+                    else:
+                        del names[name]
+
+    def __add_values(self, tag, song_values, songs):
+        counts = self._counts[tag]
+        for song in songs:
+            if id(song) in song_values:
+                continue
+            values = song_values[id(song)] = song.list(tag)
+            for value in values:
+                if value in counts:
+                    counts[value] += 1
+                else:
+                    counts[value] = 1
+                    self._sorted.pop(tag, None)
+
+    def __add_keys(self, songs):
+        key_sets = self._key_sets
+        set_counts = self._key_set_counts
+        interned = self._interned
+        names = self._names
+        for song in songs:
+            if id(song) in key_sets:
+                continue
+            keys = frozenset(song.keys())
+            shared = interned.get(keys)
+            if shared is not None:
+                set_counts[shared] += 1
+                keys = shared
+            else:
+                interned[keys] = keys
+                set_counts[keys] = 1
+                for name in keys:
+                    names[name] = names.get(name, 0) + 1
+            key_sets[id(song)] = keys
+
+    def counts(self, tag: str) -> dict[Any, int]:
+        """Returns the number of songs by value of `tag`
+        (don't modify the result)"""
+
+        counts = self._counts.get(tag)
+        if counts is None and not _kept(tag):
+            counts = {}
+            for song in self._library.values():
+                for value in song.list(tag):
+                    counts[value] = counts.get(value, 0) + 1
+        elif counts is None:
+            print_d(f"Counting values of {tag!r}")
+            counts = self._counts[tag] = {}
+            song_values = self._song_values[tag] = {}
+            self.__add_values(tag, song_values, self._library.values())
+        return counts
+
+    def starting_with(
+        self, tag: str, prefix: str, limit: int | None = None
+    ) -> list[str]:
+        """Returns the values of `tag` starting with `prefix` (ignoring
+        case), sorted case insensitively. At most `limit` if given.
+        """
+
+        pairs = self._sorted.get(tag)
+        if pairs is None:
+            pairs = sorted(
+                (value.casefold(), value)
+                for value in self.counts(tag)
+                if isinstance(value, str)
+            )
+            if tag in self._counts:
+                self._sorted[tag] = pairs
+
+        prefix = prefix.casefold()
+        result: list[str] = []
+        for i in range(bisect_left(pairs, (prefix,)), len(pairs)):
+            key, value = pairs[i]
+            if not key.startswith(prefix) or len(result) == limit:
+                break
+            result.append(value)
+        return result
+
+    def tags(self) -> KeysView[str]:
+        """Returns the names of all tags any song has"""
+
+        if self._key_sets is None:
+            print_d("Collecting tag names")
+            self._key_sets = {}
+            self.__add_keys(self._library.values())
+        return self._names.keys()
@@ -6,11 +6,14 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import random
+import weakref
 from typing import Any
 
 from gi.repository import Gtk
 
 from quodlibet import _, print_d
+from quodlibet.util.collections import FenwickTree
 
 
 class Order:
@@ -101,32 +104,194 @@ class Order:
         return f"<{self.display_name}>"
 
 
+class _Picker:
+    """The weights of all rows of a playlist which weren't played yet, for
+    picking one at random in O(log n).
+
+    Every row gets a slot which stays the same while other rows get added
+    or removed, the weights are stored by slot. Only the mapping of row
+    positions to slots is a plain list, so following an inserted or deleted
+    row is O(n), albeit a single memmove. The picker follows the changes of
+    the playlist until it's destroyed, after the rows got reordered it is
+    `stale` and has to be replaced.
+    """
+
+    def __init__(self, order: "OrderRemembered", playlist, played):
+        self.playlist = playlist
+        self.stale = False
+        self._order = order
+
+        rows = list(playlist.iterrows())
+        self._iters: list[Gtk.TreeIter | None] = [iter for iter, _song in rows]
+        self._rows = list(range(len(rows)))
+        self._weights = FenwickTree(order.weights([song for _iter, song in rows]))
+        self._unplayed = FenwickTree([1] * len(rows))
+        self._free: list[int] = []
+        for iter in played:
+            self.set_played(iter, True)
+
+        self._sigs: list[int] = []
+        self.__connect("row-inserted", self.__inserted)
+        self.__connect("row-deleted", self.__deleted)
+        self.__connect("row-changed", self.__changed)
+        self.__connect("rows-reordered", self.__reordered)
+
+    def __connect(self, signal, method):
+        # Don't keep us alive once the order is gone
+        ref = weakref.WeakMethod(method)
+
+        def handler(playlist, *args):
+            method = ref()
+            if method is None:
+                playlist.disconnect_by_func(handler)
+            else:
+                method(playlist, *args)
+
+        self._sigs.append(self.playlist.connect(signal, handler))
+
+    def destroy(self):
+        for sig in self._sigs:
+            self.playlist.disconnect(sig)
+        del self._sigs[:]
+
+    def __len__(self):
+        """The number of rows not played yet"""
+
+        return self._unplayed.sum()
+
+    def set_played(self, iter, played: bool) -> None:
+        if self.stale:
+            return
+        slot = self._rows[self.playlist.get_path(iter).get_indices()[0]]
+        if played:
+            self._weights[slot] = 0
+            self._unplayed[slot] = 0
+        elif not self._unplayed[slot]:
+            song = self.playlist.get_value(iter)
+            self._weights[slot] = self._order.weight(song)
+            self._unplayed[slot] = 1
+
+    def pick(self) -> Gtk.TreeIter | None:
+        weights = self._weights
+        total = weights.sum()
+        if total > 0:
+            # rounding errors could lead to unplayed ones, so try again
+            for _i in range(3):
+                slot = weights.find(random.random() * total)
+                if slot < len(weights) and weights[slot] > 0:
+                    return self._iters[slot]
+
+        # all remaining ones have no weight
+        count = len(self)
+        if not count:
+            return None
+        return self._iters[self._unplayed.find(random.randrange(count))]
+
+    def __inserted(self, playlist, path, iter):
+        song = playlist.get_value(iter)
+        weight = 0 if song is None else self._order.weight(song)
+        if self._free:
+            slot = self._free.pop()
+            self._iters[slot] = iter
+            self._weights[slot] = weight
+            self._unplayed[slot] = 1
+        else:
+            slot = len(self._iters)
+            self._iters.append(iter)
+            self._weights.append(weight)
+            self._unplayed.append(1)
+        self._rows.insert(path.get_indices()[0], slot)
+
+    def __deleted(self, playlist, path):
+        slot = self._rows.pop(path.get_indices()[0])
+        self._iters[slot] = None
+        self._weights[slot] = 0
+        self._unplayed[slot] = 0
+        self._free.append(slot)
+
+    def __changed(self, playlist, path, iter):
+        slot = self._rows[path.get_indices()[0]]
+        if self._unplayed[slot]:
+            song = playlist.get_value(iter)
+            self._weights[slot] = 0 if song is None else self._order.weight(song)
+
+    def __reordered(self, playlist, *args):
+        self.stale = True
+
+
 class OrderRemembered(Order):
     """Shared class for all the shuffle modes that keep a memory
-    of their previously played songs."""
+    of their previously played songs.
+
+    `pick` chooses a random song which wasn't played yet, weighted by
+    `weight`. It follows the changes of the playlist instead of going
+    through it on every call.
+    """
 
     _played: list[Gtk.TreeIter]
 
     def __init__(self):
         super().__init__()
         self._played = []
+        self._picker: _Picker | None = None
 
     def next(self, playlist, iter):
         if iter is not None:
             self._played.append(iter)
+            if self._picker is not None:
+                self._picker.set_played(iter, True)
 
     def previous(self, playlist, iter):
         if self._played:
-            return self._played.pop()
+            iter = self._played.pop()
+            if self._picker is not None:
+                self._picker.set_played(iter, False)
+            return iter
         return None
 
     def set(self, playlist, iter):
         if iter is not None:
             self._played.append(iter)
+            if self._picker is not None:
+                self._picker.set_played(iter, True)
         return iter
 
     def reset(self, playlist):
         del self._played[:]
+        if self._picker is not None:
+            self._picker.destroy()
+            self._picker = None
+
+    def invalidate_weights(self) -> None:
+        """Makes `pick` collect the weights of all songs again, for when
+        they changed without the playlist changing"""
+
+        if self._picker is not None:
+            self._picker.stale = True
+
+    def weight(self, song) -> float:
+        """The relative chance of `song` to get picked by `pick`.
+        If all remaining songs have no weight they are equally likely."""
+
+        return 1
+
+    def weights(self, songs: list[Any]) -> list[float]:
+        """The weights of all songs in a playlist, in case they depend on
+        each other"""
+
+        return [self.weight(song) for song in songs]
+
+    def pick(self, playlist) -> Gtk.TreeIter | None:
+        """Returns a random song of `playlist` which wasn't played yet,
+        or None if all were played"""
+
+        picker = self._picker
+        if picker is None or picker.playlist is not playlist or picker.stale:
+            if picker is not None:
+                picker.destroy()
+            print_d(f"Collecting weights for {len(playlist)} song(s)")
+            picker = self._picker = _Picker(self, playlist, self._played)
+        return picker.pick()
 
     def remaining(self, playlist) -> dict[int, Any]:
         """Gets a map of all song indices to their song from the `playlist`
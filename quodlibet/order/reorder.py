@@ -5,8 +5,6 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
-import random
-
 from quodlibet import _
 from quodlibet.order import Order, OrderRemembered
 
@@ -25,14 +23,10 @@ class OrderShuffle(Reorder, OrderRemembered):
 
     def next(self, playlist, iter):
         super().next(playlist, iter)
-        remaining = self.remaining(playlist)
-
-        if not remaining:
+        next_iter = self.pick(playlist)
+        if next_iter is None:
             self.reset(playlist)
-            return None
-
-        index = random.choice(list(remaining))
-        return playlist.get_iter((index,))
+        return next_iter
 
 
 class OrderWeighted(Reorder, OrderRemembered):
@@ -40,23 +34,13 @@ class OrderWeighted(Reorder, OrderRemembered):
     display_name = _("Prefer higher rated")
     accelerated_name = _("Prefer _higher rated")
 
+    def weight(self, song):
+        return song("~#rating")
+
     def next(self, playlist, iter):
         super().next(playlist, iter)
-        remaining = self.remaining(playlist)
-
+        next_iter = self.pick(playlist)
         # Don't try to search through an empty / played playlist.
-        if not remaining:
+        if next_iter is None:
             self.reset(playlist)
-            return None
-
-        total_score = sum([song("~#rating") for song in remaining.values()])
-        if total_score == 0:
-            # When all songs are rated zero, fall back to unweighted shuffle
-            return playlist.get_iter((random.choice(list(remaining)),))
-        choice = random.random() * total_score
-        current = 0.0
-        for i, song in remaining.items():
-            current += song("~#rating")
-            if current >= choice:
-                return playlist.get_iter([i])
-        raise ValueError
+        return next_iter
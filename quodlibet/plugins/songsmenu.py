@@ -44,6 +44,11 @@ class SongsMenuPlugin(MenuItemPlugin):
     the sensitivity of the menu entry:
         self.plugin_handles(songs)
 
+    As instances only live as long as their menu, state shared between
+    them has to be kept in the class. It can be cleaned up once the plugin
+    gets disabled in:
+        cls.plugin_disabled()
+
     All of this is managed by the constructor for SongsMenuPlugin, so
     make sure it gets called if you override it (you shouldn't have to).
     """
@@ -65,6 +70,10 @@ class SongsMenuPlugin(MenuItemPlugin):
     def plugin_handles(self, songs):
         return True
 
+    @classmethod
+    def plugin_disabled(cls):
+        pass
+
     @property
     def handles_albums(self):
         return any(
@@ -6,6 +6,7 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import weakref
 
 from gi.repository import Gtk
 
@@ -108,7 +109,16 @@ class LibraryTagCompletion(EntryWordCompletion):
         model.clear()
 
         tags = set()
-        songs = list(library)
+        tag_names = getattr(library, "tag_names", None)
+        if tag_names is not None:
+            # the library keeps track of them already
+            songs = []
+            for tag in tag_names() - all_tags:
+                if not (tag.startswith("~#") or tag in MACHINE_TAGS):
+                    model.append([tag])
+                    all_tags.add(tag)
+        else:
+            songs = list(library)
         for count, song in enumerate(songs):
             for tag in song.keys():
                 if not (tag.startswith("~#") or tag in MACHINE_TAGS):
@@ -149,15 +159,40 @@ class LibraryTagCompletion(EntryWordCompletion):
 
 class LibraryValueCompletion(Gtk.EntryCompletion):
     """Entry completion for a library value, for a specific tag.
-    Will add valid values from the tag massager where available"""
+    Will add valid values from the tag massager where available.
+
+    For libraries which can look up values by prefix only the values
+    starting with the entered text get put into the model, which needs
+    the completion to be set through `attach`."""
+
+    MAX_VALUES = 1000
+    """Number of values looked up by prefix at most"""
 
     def __init__(self, tag, library):
         super().__init__()
         self.set_model(Gtk.ListStore(str))
         self.set_text_column(0)
+        self.__tag = None
+        self.__library = None
+        # casefolded text the model has all (or MAX_VALUES) values for
+        self.__prefix = None
+        self.__truncated = False
+        self.__entry = None
+        self.__entry_id = None
         self.set_tag(tag, library)
 
+    def attach(self, entry):
+        """Sets this as the completion of `entry`"""
+
+        entry.set_completion(self)
+        self.__follow_entry()
+
     def set_tag(self, tag, library):
+        self.__tag = None
+        self.__set_tag(tag, library)
+        self.__follow_entry()
+
+    def __set_tag(self, tag, library):
         if not config.getboolean("settings", "eager_search"):
             return
         elif tag is None:
@@ -173,7 +208,57 @@ class LibraryValueCompletion(Gtk.EntryCompletion):
             return
         elif tag in formats.PEOPLE:
             tag = "~people"
-        copool.add(self.__fill_tag, tag, library)
+
+        if hasattr(library, "tag_values_starting_with"):
+            self.__tag = tag
+            self.__library = library
+            self.__prefix = None
+            self.get_model().clear()
+            self.set_minimum_key_length(1)
+        else:
+            copool.add(self.__fill_tag, tag, library)
+
+    def __follow_entry(self):
+        """Looks up the values for the text of the entry using this as long
+        as values get looked up by prefix"""
+
+        entry = self.get_entry() if self.__tag else None
+        old = self.__entry and self.__entry()
+        if old is not None and old is not entry:
+            old.disconnect(self.__entry_id)
+            old = None
+        if entry is not None:
+            if old is None:
+                self.__entry = weakref.ref(entry)
+                self.__entry_id = entry.connect("changed", self.__update)
+            self.__update(entry)
+        else:
+            self.__entry = self.__entry_id = None
+
+    def __update(self, entry):
+        text = entry.get_text().casefold()
+        if self.__tag is None or not text:
+            return
+        prefix = self.__prefix
+        if prefix is not None and text.startswith(prefix) and not self.__truncated:
+            # all values starting with the text are there already
+            return
+
+        tag = self.__tag
+        limit = self.MAX_VALUES
+        values = self.__library.tag_values_starting_with(tag, text, limit + 1)
+        self.__truncated = len(values) > limit
+        values = set(values[:limit])
+        for value in massagers.get_options(tag):
+            if value.casefold().startswith(text):
+                values.add(value)
+
+        model = self.get_model()
+        model.clear()
+        for value in sorted(values, key=lambda v: (v.casefold(), v)):
+            model.append(row=[value])
+        self.__prefix = text
+        self.complete()
 
     def __fill_tag(self, tag, library):
         model = self.get_model()
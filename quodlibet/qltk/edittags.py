@@ -357,7 +357,7 @@ class AddTagDialog(Dialog):
         table.attach(self.__tag, 1, 2, 0, 1)
 
         self.__val = Gtk.Entry()
-        self.__val.set_completion(LibraryValueCompletion("", library))
+        LibraryValueCompletion("", library).attach(self.__val)
         label = Gtk.Label()
         label.set_text(_("_Value:"))
         label.set_alignment(0.0, 0.5)
@@ -1145,8 +1145,7 @@ class EditTags(Gtk.VBox):
     def __value_editing_started(self, render, editable, path, model, library):
         if not editable.get_completion():
             tag = model[path][0].tag
-            completion = LibraryValueCompletion(tag, library)
-            editable.set_completion(completion)
+            LibraryValueCompletion(tag, library).attach(editable)
 
         if isinstance(editable, Gtk.Entry):
             comment = model[path][0].value
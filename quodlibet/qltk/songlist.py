@@ -383,6 +383,10 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll, util.InstanceTracker):
 
     star = list(Query.STAR)
 
+    _DETACH_ADDED = 500
+    """Number of songs added at once from which on the model gets removed
+    from the view while inserting them"""
+
     def menu(self, header: str, browser, library):
         songs = self.get_selected_songs()
         if not songs:
@@ -432,6 +436,12 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll, util.InstanceTracker):
         # might contain column header names not present...
         self._sort_sequence: list[str] = []
         self.set_column_headers(self.headers)
+        sort_keys = getattr(library, "sort_keys", None)
+        if sort_keys is None:
+            from quodlibet.library.sortkeys import SortKeys
+
+            sort_keys = SortKeys
+        self.__sort_keys = sort_keys()
         librarian = library.librarian or library
 
         connect_destroy(librarian, "changed", self.__song_updated)
@@ -806,25 +816,25 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll, util.InstanceTracker):
 
         orders = self.get_sort_orders()
         if orders:
-            song_order = list(range(len(songs)))
-            for key, reverse in self.__get_song_sort_key_func(orders):
-                song_order.sort(key=lambda i: key(songs[i]), reverse=reverse)
-            return song_order
+            return self.__sort_keys.order(songs, self.__get_sort_tags(orders))
         else:
             return None
 
-    def __get_song_sort_key_func(self, order):
+    def __get_sort_key_func(self, tag):
+        return self.__sort_keys.key_func(tag)
+
+    def __get_sort_tags(self, order):
         last_tag = None
         last_order = None
         first = True
-        key_func = []
+        tags = []
         for tag, reverse in order:
             tag = get_sort_tag(tag)
 
             # always sort using the default sort key first
             if first:
                 first = False
-                key_func.append((lambda s: s.sort_key, reverse))
+                tags.append(("", reverse))
                 last_order = reverse
                 last_tag = ""
 
@@ -833,13 +843,14 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll, util.InstanceTracker):
                 continue
             last_order = reverse
             last_tag = tag
+            tags.append((tag, reverse))
+        return tags
 
-            if tag == "":
-                key_func.append((lambda s: s.sort_key, reverse))
-            else:
-                sort_func = AudioFile.sort_by_func(tag)
-                key_func.append((sort_func, reverse))
-        return key_func
+    def __get_song_sort_key_func(self, order):
+        return [
+            (self.__get_sort_key_func(tag), reverse)
+            for tag, reverse in self.__get_sort_tags(order)
+        ]
 
     def add_songs(self, songs):
         """Add songs to the list in the right order and position"""
@@ -856,9 +867,41 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll, util.InstanceTracker):
             model.append_many(songs)
             return
 
+        # Sort the new songs first, so they can be merged into the list
+        # starting where the previous one went and inserted in runs
+        songs = list(songs)
+        song_order = self._get_song_order(songs)
+        if song_order is not None:
+            songs = [songs[i] for i in song_order]
+
+        def get_song(index):
+            return model.get_value(model.iter_nth_child(None, index))
+
+        key_funcs = self.__get_merge_key_funcs()
+        runs: list[tuple[int, list]] = []
+        position = 0
         for song in songs:
-            insert_iter = self.__find_song_position(song)
-            model.insert_before(insert_iter, row=[song])
+            position = self.__bisect(song, get_song, key_funcs, position)
+            if runs and runs[-1][0] == position:
+                runs[-1][1].append(song)
+            else:
+                runs.append((position, [song]))
+
+        if len(songs) < self._DETACH_ADDED:
+            self.__insert_runs(model, runs)
+            return
+
+        # the view would handle every inserted row, so detach it meanwhile
+        selected = set(self.get_selected_songs())
+        with self.without_model() as model:
+            self.__insert_runs(model, runs)
+        if selected:
+            self.select_by_func(lambda row: row[0] in selected, scroll=False)
+
+    def __insert_runs(self, model, runs):
+        # insert from the back, so the positions of the others stay valid
+        for position, run in reversed(runs):
+            model.insert_many(position, run)
 
     def set_songs(
         self,
@@ -970,39 +1013,55 @@ class SongList(AllTreeView, SongListDnDMixin, DragScroll, util.InstanceTracker):
         selection.selected_foreach(func, None)
         return songs
 
-    def __find_song_position(self, song):
-        """Finds the appropriate position of a song in a sorted song list.
+    def __get_merge_key_funcs(self):
+        """Key functions and orders of the current sort, most significant
+        first"""
 
-        Returns iter of the song after the given song according to the current
-        sort order.
+        order = self.get_sort_orders()
+        return list(reversed(self.__get_song_sort_key_func(order)))
 
-        Returns None if the correct position is at the end of the song list.
+    def __bisect(self, song, get_song, key_funcs, lo=0, hi=None):
+        """Returns the position in the sorted song list (with songs given by
+        `get_song`) after all songs sorting before or equal to `song`
         """
 
-        model = self.get_model()
-        order = self.get_sort_orders()
-        sort_key_func = list(enumerate(reversed(self.__get_song_sort_key_func(order))))
-        song_sort_keys = [key(song) for i, (key, r) in sort_key_func]
-        i = 0
-        j = len(model)
-        while i < j:
-            mid = (i + j) // 2
-            other_song_iter = model.iter_nth_child(None, mid)
-            other_song = model.get_value(other_song_iter)
+        if hi is None:
+            hi = len(self.get_model())
+        song_sort_keys = [key(song) for key, reverse in key_funcs]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other_song = get_song(mid)
             song_is_lower = False
-            for i, (key, reverse) in sort_key_func:
+            for song_key, (key, reverse) in zip(song_sort_keys, key_funcs, strict=True):
                 other_key = key(other_song)
-                is_lower = song_sort_keys[i] < other_key
-                is_greater = song_sort_keys[i] > other_key
+                is_lower = song_key < other_key
+                is_greater = song_key > other_key
                 if not reverse and is_lower or reverse and is_greater:
                     song_is_lower = True
                     break
                 if not reverse and is_greater or reverse and is_lower:
                     break
             if song_is_lower:
-                j = mid
+                hi = mid
             else:
-                i = mid + 1
+                lo = mid + 1
+        return lo
+
+    def __find_song_position(self, song):
+        """Finds the appropriate position of a song in a sorted song list.
+
+        Returns iter of the song after the given song according to the current
+        sort order.
+
+        Returns None if the correct position is at the end of the song list.
+        """
+
+        model = self.get_model()
+
+        def get_song(i):
+            return model.get_value(model.iter_nth_child(None, i))
+
+        i = self.__bisect(song, get_song, self.__get_merge_key_funcs())
         if i < len(model):
             return model.iter_nth_child(None, i)
         return None
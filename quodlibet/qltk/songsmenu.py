@@ -260,6 +260,10 @@ class SongsMenuPluginHandler(PluginHandler):
 
     def plugin_disable(self, plugin):
         self.__plugins.remove(plugin.cls)
+        try:
+            plugin.cls.plugin_disabled()
+        except Exception:
+            util.print_exc()
 
 
 class SongsMenu(Gtk.Menu):
@@ -0,0 +1,96 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from __future__ import annotations
+
+import time
+from typing import Any, NamedTuple
+from collections.abc import Callable, Iterable, Sequence
+
+from senf import fsn2text, fsnative
+
+
+class CompiledQuery(NamedTuple):
+    search: Callable[[Any], bool]
+    """Tests a single song"""
+
+    filter: Callable[[Iterable], list]
+    """Returns the list of matching songs of a sequence"""
+
+    filter_indices: Callable[[Iterable[int], Sequence], list[int]]
+    """Returns the indices (in the passed list of songs) of the matching
+    songs for the passed indices"""
+
+
+class QueryCompiler:
+    """Turns a tree of query nodes into generated Python functions, like
+    `PatternCompiler` does for patterns.
+
+    Every node returns an expression testing the song `s` (see
+    `Node._compile`). Objects used by the expressions are stored in the
+    scope of the generated code, values which only need to be computed once
+    per search or filter pass (like anything depending on the current time)
+    are evaluated at the start of it.
+    """
+
+    def __init__(self):
+        self._scope: dict[str, Any] = {
+            "_time": time.time,
+            "_fs_default": fsnative(),
+            "fsn2text": fsn2text,
+        }
+        self._per_pass: list[str] = []
+        self._uses_now = False
+
+    def constant(self, value: Any, prefix: str = "c") -> str:
+        """Returns a name referring to value in the generated code"""
+
+        name = f"_{prefix}{len(self._scope)}"
+        self._scope[name] = value
+        return name
+
+    def now(self) -> str:
+        """Returns a name for the current time, fixed for each pass"""
+
+        self._uses_now = True
+        return "now"
+
+    def per_pass(self, code: str) -> str:
+        """Returns a name for the result of `code`, evaluated once at the
+        start of each pass
+        """
+
+        name = f"_p{len(self._per_pass)}"
+        self._per_pass.append(f"{name} = {code}")
+        return name
+
+    def compile(self, node) -> CompiledQuery:
+        """Returns the functions matching songs against node"""
+
+        expr, cost = node._compile(self)
+
+        prologue = []
+        if self._uses_now:
+            prologue.append("now = _time()")
+        prologue.extend(self._per_pass)
+        prologue = ["    " + line for line in prologue]
+
+        lines = ["def search(s):"]
+        lines.extend(prologue)
+        lines.append(f"    return bool({expr})")
+        lines.append("def filter(sequence):")
+        lines.extend(prologue)
+        lines.append(f"    return [s for s in sequence if {expr}]")
+        lines.append("def filter_indices(indices, songs):")
+        lines.extend(prologue)
+        lines.append(
+            "    return [i for i, s in zip(indices, map(songs.__getitem__, indices))"
+            f" if {expr}]"
+        )
+        code = "\n".join(lines)
+
+        scope = dict(self._scope)
+        exec(compile(code, "<query>", "exec"), scope)
+        return CompiledQuery(scope["search"], scope["filter"], scope["filter_indices"])
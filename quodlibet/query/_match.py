@@ -14,15 +14,18 @@ from __future__ import annotations
 import operator
 import time
 from enum import auto, Enum
+from itertools import compress, repeat
 from numbers import Real
-from typing import TypeVar
+from re import compile as compile_re
+from typing import Any, TypeVar
 from collections.abc import Iterable
 
 from quodlibet.formats import FILESYSTEM_TAGS, TIME_TAGS
 from quodlibet.formats._audio import SIZE_TAGS, DURATION_TAGS
-from quodlibet.unisearch import compile
-from quodlibet.util import parse_date
+from quodlibet.unisearch import compile, fold, literal
+from quodlibet.util import cached_property, parse_date
 from senf import fsn2text, fsnative
+from ._compiler import CompiledQuery, QueryCompiler
 
 T = TypeVar("T")
 
@@ -35,6 +38,50 @@ class ParseError(Error):
     pass
 
 
+_TOKEN = compile_re(r"\w+")
+
+_SYNTHESIZED = {
+    "~#track",
+    "~#disc",
+    "~#tracks",
+    "~#discs",
+    "~#date",
+    "~#year",
+    "~#originalyear",
+}
+"""Numeric keys for which AudioFile doesn't return the stored value"""
+
+
+def _union(sets: Iterable[set | None]) -> set | None:
+    result: set = set()
+    for found in sets:
+        if found is None:
+            return None
+        result |= found
+    return result
+
+
+def _intersection(sets: Iterable[set | None]) -> set | None:
+    result: set | None = None
+    for found in sets:
+        if found is not None:
+            result = found if result is None else result & found
+    return result
+
+
+def _cost(node: Node) -> int:
+    return node._cost
+
+
+def _compile_all(compiler, nodes, joiner: str, empty: str) -> tuple[str, int]:
+    # cheap tests first, so the expensive ones run for fewer songs
+    compiled = sorted((node._compile(compiler) for node in nodes), key=lambda c: c[1])
+    if not compiled:
+        return empty, 0
+    expr = f" {joiner} ".join(f"({expr})" for expr, cost in compiled)
+    return expr, sum(cost for expr, cost in compiled)
+
+
 class Node:
     def search(self, data: T) -> bool:
         raise NotImplementedError
@@ -42,6 +89,53 @@ class Node:
     def filter(self, sequence: Iterable[T]) -> list[T]:
         return [s for s in sequence if self.search(s)]
 
+    def candidates(self, index) -> set | None:
+        """Returns a superset of all songs in the `TagIndex` matching this
+        node, or None in case the index can't be used to narrow them down.
+        """
+        return None
+
+    def value_candidates(self, index, tags: Iterable[str]) -> set | None:
+        """Like `candidates`, but for songs having a value matching this
+        node in any of the passed tags
+        """
+        return None
+
+    def filter_many(self, columns, indices: list[int]) -> list[int]:
+        """Returns the indices of matching songs out of `indices`, which
+        refer to songs in the `NumericColumns` `columns`.
+
+        Evaluates the query for all songs at once, which allows numeric
+        comparisons to work on whole columns of values.
+        """
+        return self._compiled.filter_indices(indices, columns.songs)
+
+    @property
+    def columnar(self) -> bool:
+        """Whether `filter_many` compares any columns, making it faster
+        than searching song by song
+        """
+        return False
+
+    @cached_property
+    def _compiled(self) -> CompiledQuery:
+        return QueryCompiler().compile(self)
+
+    @cached_property
+    def _cost(self) -> int:
+        return self._compile(QueryCompiler())[1]
+
+    def _compile(self, compiler) -> tuple[str, int]:
+        """Returns a Python expression testing the song `s` for the
+        `QueryCompiler` and a rough estimate of how expensive it is to
+        evaluate, used for ordering.
+        """
+        return f"{compiler.constant(self.search)}(s)", 50
+
+    def _value_cost(self) -> int:
+        """Estimated cost of matching a single text value"""
+        return 10
+
     def _unpack(self) -> Node:
         return self
 
@@ -67,6 +161,7 @@ class Regex(Node):
         ignore_case = "c" not in self.mod_string or "i" in self.mod_string
         dot_all = "s" in self.mod_string
         asym = "d" in self.mod_string
+        self._exact = not ignore_case and not asym
         try:
             re = compile(self.pattern, ignore_case, dot_all, asym)
             self.search = re  # type: ignore
@@ -75,6 +170,39 @@ class Regex(Node):
                 f"The regular expression /{self.pattern}/ is invalid."
             ) from e
 
+    def value_candidates(self, index, tags):
+        parts = literal(self.pattern)
+        if parts is None:
+            return None
+        text, start, end = parts
+        if not text:
+            # matches empty and missing values, which aren't indexed
+            return None
+        if self._exact and start and end and "\n" not in text:
+            return set().union(*(index.exact(tag, text) for tag in tags))
+        tokens = _TOKEN.findall(fold(text))
+        if not tokens:
+            return None
+        result = None
+        for token in tokens:
+            found: set | None = set()
+            for tag in tags:
+                songs = index.containing(tag, token)
+                if songs is None:
+                    # too short, the other tokens have to narrow it down
+                    found = None
+                    break
+                found |= songs
+            if found is not None:
+                result = found if result is None else result & found
+        return result
+
+    def _value_cost(self):
+        parts = literal(self.pattern)
+        if parts is not None and self._exact and parts[1] and parts[2]:
+            return 2
+        return 10
+
     def __repr__(self):
         return f"<Regex pattern={self.pattern} mod={self.mod_string}>"
 
@@ -88,6 +216,15 @@ class True_(Node):
     def filter(self, sequence):
         return list(sequence)
 
+    def filter_many(self, columns, indices):
+        return list(indices)
+
+    def _compile(self, compiler):
+        return "True", 0
+
+    def _value_cost(self):
+        return 0
+
     def __repr__(self):
         return "<True>"
 
@@ -108,6 +245,21 @@ class False_(Node):
     def filter(self, sequence):
         return []
 
+    def filter_many(self, columns, indices):
+        return []
+
+    def candidates(self, index):
+        return set()
+
+    def value_candidates(self, index, tags):
+        return set()
+
+    def _compile(self, compiler):
+        return "False", 0
+
+    def _value_cost(self):
+        return 0
+
     def __repr__(self):
         return "<False>"
 
@@ -131,6 +283,32 @@ class Union(Node):
                 return True
         return False
 
+    def candidates(self, index):
+        return _union(re.candidates(index) for re in self.res)
+
+    def value_candidates(self, index, tags):
+        return _union(re.value_candidates(index, tags) for re in self.res)
+
+    def filter_many(self, columns, indices):
+        matched: set[int] = set()
+        remaining = indices
+        for re in sorted(self.res, key=_cost):
+            found = re.filter_many(columns, remaining)
+            if found:
+                matched.update(found)
+                remaining = [i for i in remaining if i not in matched]
+        return [i for i in indices if i in matched]
+
+    @property
+    def columnar(self):
+        return any(re.columnar for re in self.res)
+
+    def _compile(self, compiler):
+        return _compile_all(compiler, self.res, "or", "False")
+
+    def _value_cost(self):
+        return sum(re._value_cost() for re in self.res)
+
     def __repr__(self):
         return f"<Union {self.res!r}>"
 
@@ -173,6 +351,30 @@ class Inter(Node):
             current = list(current)
         return current
 
+    def candidates(self, index):
+        return _intersection(re.candidates(index) for re in self.res)
+
+    def value_candidates(self, index, tags):
+        return _intersection(re.value_candidates(index, tags) for re in self.res)
+
+    def filter_many(self, columns, indices):
+        # each one only has to look at what the previous ones matched
+        for re in sorted(self.res, key=_cost):
+            if not indices:
+                break
+            indices = re.filter_many(columns, indices)
+        return list(indices)
+
+    @property
+    def columnar(self):
+        return any(re.columnar for re in self.res)
+
+    def _compile(self, compiler):
+        return _compile_all(compiler, self.res, "and", "True")
+
+    def _value_cost(self):
+        return sum(re._value_cost() for re in self.res)
+
     def __repr__(self):
         return f"<Inter {self.res!r}>"
 
@@ -203,6 +405,21 @@ class Neg(Node):
     def search(self, data):
         return not self.res.search(data)
 
+    def filter_many(self, columns, indices):
+        found = set(self.res.filter_many(columns, indices))
+        return [i for i in indices if i not in found]
+
+    @property
+    def columnar(self):
+        return self.res.columnar
+
+    def _compile(self, compiler):
+        expr, cost = self.res._compile(compiler)
+        return f"not ({expr})", cost
+
+    def _value_cost(self):
+        return self.res._value_cost()
+
     def __repr__(self):
         return f"<Neg {self.res!r}>"
 
@@ -235,24 +452,101 @@ class Numcmp(Node):
         "!=": operator.ne,
     }
 
+    _sources = {
+        operator.lt: "<",
+        operator.le: "<=",
+        operator.gt: ">",
+        operator.ge: ">=",
+        operator.eq: "==",
+        operator.ne: "!=",
+    }
+
+    # the operators with swapped operands
+    _mirrored = {
+        operator.lt: operator.gt,
+        operator.le: operator.ge,
+        operator.gt: operator.lt,
+        operator.ge: operator.le,
+        operator.eq: operator.eq,
+        operator.ne: operator.ne,
+    }
+
     def __init__(self, expr: Numexpr, op: str, expr2: Numexpr):
         self._expr = expr
         self._op = self.operators[op]
         self._expr2 = expr2
+        self._use_date = expr.use_date() or expr2.use_date()
         units = expr2.units()
 
         if units and not expr.valid_for_units(units):
             raise ParseError(f"Wrong units for {expr}")
 
     def search(self, data):
-        time_ = time.time()
-        use_date = self._expr.use_date() or self._expr2.use_date()
-        val = self._expr.evaluate(data, time_, use_date)
-        val2 = self._expr2.evaluate(data, time_, use_date)
+        return self._search_at(data, time.time())
+
+    def _search_at(self, data, time_):
+        val = self._expr.evaluate(data, time_, self._use_date)
+        val2 = self._expr2.evaluate(data, time_, self._use_date)
         if val is not None and val2 is not None:
             return self._op(val, val2)
         return False
 
+    @cached_property
+    def _tag_comparison(self) -> tuple[NumexprTag, Any, Numexpr] | None:
+        """The numeric tag, operator and constant expression in case this
+        compares a tag with a constant (like `#(playcount > 2 * 5)`)
+        """
+
+        tag, op, value = self._expr, self._op, self._expr2
+        if tag.is_constant():
+            tag, op, value = value, self._mirrored[op], tag
+        if not isinstance(tag, NumexprTag) or tag.use_date() or not value.is_constant():
+            return None
+        return tag, op, value
+
+    @property
+    def columnar(self):
+        return self._tag_comparison is not None
+
+    def filter_many(self, columns, indices):
+        if self._tag_comparison is None:
+            return super().filter_many(columns, indices)
+
+        tag, op, value = self._tag_comparison
+        now = time.time()
+        value = value.evaluate(None, now, self._use_date)
+        values = map(columns.column(tag._ftag).__getitem__, indices)
+        if tag._base_ftag in TIME_TAGS:
+            values = map(operator.sub, repeat(now), values)
+        values = list(map(round, values, repeat(2)))
+        matches = map(op, values, repeat(value))
+        if op is operator.ne:
+            # missing values (NaN) are unequal to everything, even themselves
+            matches = map(operator.and_, matches, map(operator.eq, values, values))
+        return list(compress(indices, matches))
+
+    def _compile(self, compiler):
+        now = compiler.now()
+        if self._tag_comparison is None:
+            return f"{compiler.constant(self._search_at)}(s, {now})", 20
+
+        tag, op, value = self._tag_comparison
+        source = self._sources[op]
+        value = compiler.per_pass(
+            f"{compiler.constant(value)}.evaluate(None, {now}, {self._use_date!r})"
+        )
+        key = tag._ftag
+        if key in _SYNTHESIZED or key.startswith("~#replaygain_"):
+            get = f"(v := s({key!r}, None)) is not None"
+        else:
+            # stored values are what AudioFile.__call__ would return
+            get = (
+                f"((v := s.get({key!r}, None)) is not None "
+                f"or (v := s({key!r}, None)) is not None)"
+            )
+        num = f"{now} - v" if tag._base_ftag in TIME_TAGS else "v"
+        return f"{get} and round({num}, 2) {source} {value}", 1
+
     def __repr__(self):
         return (
             f"<Numcmp expr={self._expr!r}, "
@@ -299,6 +593,11 @@ class Numexpr:
         """Returns true if the given unit is valid for this expression"""
         return True
 
+    def is_constant(self) -> bool:
+        """Returns whether the value doesn't depend on the evaluated data
+        (but might depend on the time)"""
+        return False
+
 
 class NumexprTag(Numexpr):
     """Numeric tag"""
@@ -357,6 +656,9 @@ class NumexprUnary(Numexpr):
     def use_date(self):
         return self.__expr.use_date()
 
+    def is_constant(self):
+        return self.__expr.is_constant()
+
 
 class NumexprBinary(Numexpr):
     """Binary numeric operation (like + or *)"""
@@ -412,6 +714,9 @@ class NumexprBinary(Numexpr):
     def use_date(self):
         return self.__expr.use_date() or self.__expr2.use_date()
 
+    def is_constant(self):
+        return self.__expr.is_constant() and self.__expr2.is_constant()
+
 
 class NumexprGroup(Numexpr):
     """Parenthesized group in numeric expression"""
@@ -428,6 +733,9 @@ class NumexprGroup(Numexpr):
     def use_date(self):
         return self.__expr.use_date()
 
+    def is_constant(self):
+        return self.__expr.is_constant()
+
 
 class NumexprNumber(Numexpr):
     """Number in numeric expression"""
@@ -442,6 +750,9 @@ class NumexprNumber(Numexpr):
     def units(self) -> Units | None:
         return self._units
 
+    def is_constant(self):
+        return True
+
     def __repr__(self):
         return f"<NumexprNumber value={self._value:.2f}>"
 
@@ -455,6 +766,9 @@ class NumexprNow(Numexpr):
     def evaluate(self, data, time, use_date):
         return time - self.__offset
 
+    def is_constant(self):
+        return True
+
     def __repr__(self):
         return f"<NumexprNow offset={self.__offset!r}>"
 
@@ -478,6 +792,9 @@ class NumexprNumberOrDate(Numexpr):
         else:
             return self.number
 
+    def is_constant(self):
+        return True
+
     def __repr__(self):
         return f"<NumexprNumberOrDate number={self.number!r} date={self.date!r}>"
 
@@ -594,6 +911,34 @@ class Tag(Node):
 
         return False
 
+    def _compile(self, compiler):
+        search = compiler.constant(self.res.search)
+        tests = []
+        for name in self._names:
+            if name in ("filename", "mountpoint"):
+                default = f"fsn2text(s.get({'~' + name!r}, _fs_default))"
+            else:
+                default = f"s.get({'~' + name!r}, '')"
+            value = f"v if (v := s.get({name!r})) is not None else {default}"
+            tests.append(f"{search}({value})")
+        for name in self.__intern:
+            tests.append(f"{search}(s({name!r}))")
+        for name in self.__fs:
+            tests.append(f"{search}(fsn2text(s({name!r}, _fs_default)))")
+        if not tests:
+            return "False", 0
+        # synthesized values are expensive to build
+        cost = self.res._value_cost() * len(tests) + 20 * len(self.__intern)
+        return " or ".join(tests), cost
+
+    def candidates(self, index):
+        if self.__intern or self.__fs:
+            return None
+        if "filename" in self._names or "mountpoint" in self._names:
+            return None
+        tags = self._names + ["~" + name for name in self._names]
+        return self.res.value_candidates(index, tags)
+
     def __repr__(self):
         names = self._names + self.__intern
         return f"<Tag names={names!r}, res={self.res!r}>"
@@ -49,6 +49,10 @@ class Query(Node):
     string: str | None = None
     """The original string which was used to create this query"""
 
+    words: list[str] | None = None
+    """For TEXT queries the words which each have to be found in one of
+    the star tags (case insensitive, ignoring diacritics)"""
+
     def __init__(self, string: str, star: Iterable[str] | None = None):
         """Parses the query string and returns a match object.
 
@@ -87,13 +91,15 @@ class Query(Node):
         if not set("#=").intersection(string):
             for c in config.get("browsers", "ignored_characters"):
                 string = string.replace(c, "")
-            parts = [f"/{re_escape(s)}/d" for s in string.split()]
+            words = string.split()
+            parts = [f"/{re_escape(s)}/d" for s in words]
             string = "&(" + ",".join(parts) + ")"
             self.string = string
 
             try:
                 self.type = QueryType.TEXT
                 self._match = QueryParser(string, star=star).StartQuery()
+                self.words = words
                 return
             except self.Error:
                 pass
@@ -117,11 +123,41 @@ class Query(Node):
 
     @cached_property
     def search(self):
-        return self._match.search
+        return self._compiled.search
 
-    @cached_property
-    def filter(self):
-        return self._match.filter
+    def filter(self, sequence: Iterable[T]) -> list[T]:
+        """Returns all items in sequence matching the query.
+
+        If the sequence is a library with a tag index the index is used
+        to narrow down the items which need to be searched. For libraries
+        with `columnar_queries` enabled, queries comparing numeric tags get
+        evaluated for all songs at once (see `filter_many`).
+        """
+        index = getattr(sequence, "tag_index", None)
+        if index is not None:
+            candidates = self._match.candidates(index)
+            if candidates is not None:
+                # keep the order of the library, not that of the set
+                return index.ordered(self._compiled.filter(candidates))
+        numeric_columns = getattr(sequence, "numeric_columns", None)
+        columnar = getattr(sequence, "columnar_queries", False)
+        if numeric_columns is not None and columnar and self.columnar:
+            columns = numeric_columns()
+            return columns.songs_at(self.filter_many(columns, columns.indices()))
+        return self._compiled.filter(sequence)
+
+    def filter_many(self, columns, indices: list[int]) -> list[int]:
+        return self._match.filter_many(columns, indices)
+
+    @property
+    def columnar(self) -> bool:
+        return self._match.columnar
+
+    def _compile(self, compiler):
+        return self._match._compile(compiler)
+
+    def candidates(self, index) -> set | None:
+        return self._match.candidates(index)
 
     @property
     def valid(self) -> bool:
@@ -19,7 +19,7 @@ The goal is to make searching easy using an English keyboard without any
 knowledge of other languages.
 """
 
-from .parser import compile
+from .parser import compile, fold, literal
 
 
-compile  # noqa
+compile, fold, literal  # noqa
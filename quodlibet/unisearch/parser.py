@@ -12,7 +12,7 @@ import sre_constants
 import unicodedata
 
 from quodlibet import print_d
-from quodlibet.util import re_escape
+from quodlibet.util import re_escape, cached_func
 
 from .db import get_replacement_mapping
 
@@ -316,3 +316,60 @@ def compile(
         return bool(reg.search(normalize("NFC", text)))
 
     return search
+
+
+@cached_func
+def _get_fold_table() -> dict[int, str]:
+    table: dict[int, str] = {}
+    for key, variants in get_replacement_mapping().items():
+        for variant in variants:
+            if len(variant) == 1:
+                table.setdefault(ord(variant), key.lower())
+    # case insensitive matching treats the dotless i as an "i"
+    table.setdefault(ord("\u0131"), "i")
+    return table
+
+
+def fold(text: str) -> str:
+    """Returns a lowercased version of text with diacritics and look-alike
+    characters replaced by their ascii counterparts.
+
+    If a literal pattern matches a text using `compile` (case insensitive
+    and/or asymmetric), then fold(pattern) is contained in fold(text).
+    The reverse doesn't hold, so the result can only be used to narrow down
+    the texts which need to be matched.
+    """
+
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.translate(_get_fold_table())
+
+
+def literal(pattern: str) -> tuple[str, bool, bool] | None:
+    """Returns a (text, anchored_start, anchored_end) tuple if the regex
+    pattern only consists of literal characters (optionally enclosed in
+    ^ and $), otherwise None.
+    """
+
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+
+    def is_at(item, where):
+        return str(item[0]).lower() == "at" and str(item[1]).lower() == where
+
+    ops: list = parsed.data[:]
+    start = bool(ops) and is_at(ops[0], "at_beginning")
+    if start:
+        ops = ops[1:]
+    end = bool(ops) and is_at(ops[-1], "at_end")
+    if end:
+        ops = ops[:-1]
+
+    chars = []
+    for op, av in ops:
+        if str(op).lower() != "literal":
+            return None
+        chars.append(chr(av))
+    return "".join(chars), start, end
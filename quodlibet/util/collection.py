@@ -9,9 +9,11 @@
 
 from __future__ import annotations
 
+import operator
 import os
 import random
 from typing import Any
+from collections import OrderedDict
 from urllib.parse import quote
 
 from senf import fsnative, fsn2bytes, bytes2fsn, path2fsn, _fsnative, uri2fsn, fsn2uri
@@ -28,6 +30,7 @@ from quodlibet.formats._audio import (
 from quodlibet.formats._audio import PEOPLE as _PEOPLE
 from quodlibet.pattern import Pattern
 from quodlibet.const import QL_NAMESPACE
+from quodlibet.unisearch import fold
 
 try:
     from collections import abc
@@ -94,22 +97,43 @@ class Collection:
     the songs attribute.
     """
 
-    _cache_size = 6
+    _cache_size = 24
+    """Number of values cached per collection (0 for all), unless set
+    in the config. Numeric values and people are always cached."""
+
+    _configured_cache_size: int | None = None
+    """The cache size set in the config, read once for all collections"""
+
     songs = ()
 
+    numeric_columns = None
+    """Optional `NumericColumns` of a library containing the songs, used
+    for numeric values"""
+
+    sort_keys = None
+    """Optional `SortKeys` of a library containing the songs, so sort keys
+    of the same values get shared between collections and songs"""
+
     def __init__(self):
-        """Cache in _cache, LRU key order in _used, keys that return default
-        are in _default"""
-        self.__cache = {}
+        """Cache in _cache in LRU order, numeric values and people (which
+        are cheap to keep) in _values, keys that return default are in
+        _default"""
+        self.__cache = OrderedDict()
+        self.__values = {}
         self.__default = set()
-        self.__used = []
+        size = Collection._configured_cache_size
+        if size is None:
+            size = Collection._configured_cache_size = config.getint(
+                "browsers", "collection_cache_size", self._cache_size
+            )
+        self.__cache_size = size
 
     def finalize(self):
         """Finalize the collection.
         Call this after songs get added or removed"""
         self.__cache.clear()
+        self.__values.clear()
         self.__default.clear()
-        self.__used = []
 
     def get(self, key, default="", connector=" - "):
         if not self.songs:
@@ -150,10 +174,26 @@ class Collection:
         return [] if v == "" else str(v).split("\n")
 
     def __get_cached_value(self, key):
-        if key in self.__cache:
-            self.__used.remove(key)
-            self.__used.insert(0, key)
-            return self.__cache[key]
+        values = self.__values
+        if key in values:
+            return values[key]
+        elif key[:2] == "~#":
+            if "~#tracks" not in values and self.numeric_columns is None:
+                # Without columns every song has to be asked for each value,
+                # so get all the common ones while at it
+                values.update(self.__get_numeric_values())
+                if key in values:
+                    return values[key]
+            val = values[key] = self.__get_value(key)
+            return val
+        elif key in ("~people", "~peoplesort"):
+            values["~people"], values["~peoplesort"] = self.__get_people()
+            return values[key]
+
+        cache = self.__cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
         elif key in self.__default:
             return None
         else:
@@ -161,13 +201,63 @@ class Collection:
             if val is None:
                 self.__default.add(key)
             else:
-                self.__used.insert(0, key)
-                self.__cache[key] = val
-            # Remove the oldest if the cache is full
-            if len(self.__used) > self._cache_size:
-                self.__cache.pop(self.__used.pop(-1))
+                cache[key] = val
+                # Remove the oldest if the cache is full
+                if 0 < self.__cache_size < len(cache):
+                    cache.popitem(last=False)
         return val
 
+    def __get_numeric_values(self):
+        """Returns the values of "~#tracks", "~#discs", "~#bitrate" and all
+        keys in `NUM_DEFAULT_FUNCS` (with and without their function),
+        going through the songs only once.
+        """
+
+        song_values = {"~#" + key: [] for key in NUM_DEFAULT_FUNCS}
+        items = song_values.items()
+        discs = set()
+        weighted_bitrate = 0
+        for song in self.songs:
+            for key, key_values in items:
+                value = song(key)
+                if value != "":
+                    key_values.append(value)
+            discs.add(song("~#disc", 1))
+            weighted_bitrate += song("~#bitrate", 0) * song("~#length", 0)
+
+        result = {"~#tracks": len(self.songs), "~#discs": len(discs)}
+        for key, func in NUM_DEFAULT_FUNCS.items():
+            nums = song_values["~#" + key]
+            value = NUM_FUNCS[func](nums) if nums else None
+            result["~#" + key] = result[f"~#{key}:{func}"] = value
+        length = result["~#length"]
+        result["~#bitrate"] = weighted_bitrate / length if length else 0
+        return result
+
+    def __get_people(self):
+        """Returns the people and peoplesort values, it's cheaper to get
+        both in one go"""
+
+        people = {}
+        peoplesort = {}
+        for song in self.songs:
+            # Rank people by "relevance" -- artists before composers
+            # before performers, then by number of appearances.
+            for w, k in enumerate(ELPOEP):
+                persons = song.list(k)
+                for person in persons:
+                    people[person] = people.get(person, 0) - PEOPLE_SCORE[w]
+                if k in TAG_TO_SORT:
+                    persons = song.list(TAG_TO_SORT[k]) or persons
+                for person in persons:
+                    peoplesort[person] = peoplesort.get(person, 0) - PEOPLE_SCORE[w]
+
+        result = []
+        for values in [people, peoplesort]:
+            ranked = sorted(values.keys(), key=values.__getitem__)[:100]
+            result.append("\n".join(ranked) or None)
+        return result
+
     def __get_value(self, key):
         """This is similar to __call__ in the AudioFile class.
         All internal tags are changed to represent a collection of songs.
@@ -187,10 +277,16 @@ class Collection:
             elif key == "discs":
                 return len({song("~#disc", 1) for song in self.songs})
             elif key == "bitrate":
-                length = self.__get_value("~#length")
+                length = self.__get_cached_value("~#length")
                 if not length:
                     return 0
 
+                if self.numeric_columns is not None:
+                    get = self.numeric_columns.get
+                    bitrates = get(self.songs, "~#bitrate", 0)
+                    lengths = get(self.songs, "~#length", 0)
+                    return sum(map(operator.mul, bitrates, lengths)) / length
+
                 def w(s):
                     return s("~#bitrate", 0) * s("~#length", 0)
 
@@ -206,8 +302,12 @@ class Collection:
             if func:
                 # If none of the songs can return a numeric key,
                 # the album returns default
-                values = (song(key) for song in self.songs)
-                values = [v for v in values if v != ""]
+                if self.numeric_columns is not None:
+                    values = self.numeric_columns.get(self.songs, key)
+                    values = [v for v in values if v is not None]
+                else:
+                    values = (song(key) for song in self.songs)
+                    values = [v for v in values if v != ""]
                 return func(values) if values else None
             elif key in NUMERIC_ZERO_DEFAULT:
                 return 0
@@ -215,69 +315,33 @@ class Collection:
         elif key[:1] == "~":
             key = key[1:]
             numkey = key.split(":")[0]
-            keys = {"people": {}, "peoplesort": {}}
-            if key in keys:
-                people = keys["people"]
-                peoplesort = keys["peoplesort"]
-                for song in self.songs:
-                    # Rank people by "relevance" -- artists before composers
-                    # before performers, then by number of appearances.
-                    for w, k in enumerate(ELPOEP):
-                        persons = song.list(k)
-                        for person in persons:
-                            people[person] = people.get(person, 0) - PEOPLE_SCORE[w]
-                        if k in TAG_TO_SORT:
-                            persons = song.list(TAG_TO_SORT[k]) or persons
-                        for person in persons:
-                            peoplesort[person] = (
-                                peoplesort.get(person, 0) - PEOPLE_SCORE[w]
-                            )
-                # It's cheaper to get people and peoplesort in one go
-                keys["people"] = sorted(people.keys(), key=people.__getitem__)[:100]
-                keys["peoplesort"] = sorted(
-                    peoplesort.keys(), key=peoplesort.__getitem__
-                )[:100]
-
-                ret = keys.pop(key)
-                ret = (ret and "\n".join(ret)) or None
-
-                other, values = keys.popitem()
-                other = "~" + other
-                if not values:
-                    self.__default.add(other)
-                else:
-                    if other in self.__used:
-                        self.__used.remove(other)
-                    self.__used.append(other)
-                    self.__cache[other] = "\n".join(values)
-                return ret
-            elif numkey == "length":
-                length = self.__get_value("~#" + key)
+            if numkey == "length":
+                length = self.__get_cached_value("~#" + key)
                 return None if length is None else util.format_time(length)
             elif numkey == "long-length":
-                length = self.__get_value("~#" + key[5:])
+                length = self.__get_cached_value("~#" + key[5:])
                 return None if length is None else util.format_time_long(length)
             elif numkey == "tracks":
-                tracks = self.__get_value("~#" + key)
+                tracks = self.__get_cached_value("~#" + key)
                 return (
                     None
                     if tracks is None
                     else ngettext("%d track", "%d tracks", tracks) % tracks
                 )
             elif numkey == "discs":
-                discs = self.__get_value("~#" + key)
+                discs = self.__get_cached_value("~#" + key)
                 if discs > 1:
                     return ngettext("%d disc", "%d discs", discs) % discs
                 else:
                     # TODO: check this is correct for discs == 1
                     return None
             elif numkey == "rating":
-                rating = self.__get_value("~#" + key)
+                rating = self.__get_cached_value("~#" + key)
                 if rating is None:
                     return None
                 return util.format_rating(rating)
             elif numkey == "filesize":
-                size = self.__get_value("~#" + key)
+                size = self.__get_cached_value("~#" + key)
                 return None if size is None else util.format_size(size)
             key = "~" + key
 
@@ -298,11 +362,23 @@ class Album(Collection, HasKey):
 
     @util.cached_property
     def peoplesort(self):
-        return util.human_sort_key(self.get("~peoplesort").split("\n")[0])
+        return self.__human(self.get("~peoplesort").split("\n")[0])
 
     @util.cached_property
     def genre(self):
-        return util.human_sort_key(self.get("genre").split("\n")[0])
+        return self.__human(self.get("genre").split("\n")[0])
+
+    @util.cached_property
+    def search_text(self):
+        """The people and title of the album folded (see `unisearch.fold`),
+        which contain every word of a free text search matching it"""
+
+        return fold(self.get("~people") + "\n" + self.get("album"))
+
+    def __human(self, value):
+        if self.sort_keys is not None:
+            return self.sort_keys.human(value)
+        return util.human_sort_key(value)
 
     @property
     def date(self):
@@ -316,8 +392,8 @@ class Album(Collection, HasKey):
         super().__init__()
         self.songs = set()
         # albumsort is part of the album_key, so every song has the same
-        self.sort = util.human_sort_key(song("albumsort"))
         self.key = song.album_key
+        self.sort = self.key[1]
 
     @property
     def str_key(self):
@@ -328,11 +404,32 @@ class Album(Collection, HasKey):
         super().finalize()
         self.__dict__.pop("peoplesort", None)
         self.__dict__.pop("genre", None)
+        self.__dict__.pop("search_text", None)
 
     def __repr__(self):
         return f"Album({repr(self.key)})"
 
 
+class _PlaylistSongs(HashedList):
+    """The songs of a playlist. Keeps the index of its playlist library
+    (which playlists feature a song) up to date.
+    """
+
+    def __init__(self, playlist):
+        super().__init__()
+        self._playlist = playlist
+
+    def _added(self, item):
+        pl_lib = self._playlist.pl_lib
+        if pl_lib is not None and not isinstance(item, str):
+            pl_lib._featuring_added(self._playlist, item)
+
+    def _removed(self, item):
+        pl_lib = self._playlist.pl_lib
+        if pl_lib is not None and not isinstance(item, str):
+            pl_lib._featuring_removed(self._playlist, item)
+
+
 @hashable
 @total_ordering
 class Playlist(Collection, abc.Iterable, HasKey):
@@ -355,7 +452,8 @@ class Playlist(Collection, abc.Iterable, HasKey):
 
     def __init__(self, name: str, songs_lib=None, pl_lib=None):
         super().__init__()
-        self._list: HashedList = HashedList()
+        self.pl_lib = None
+        self._list: HashedList = _PlaylistSongs(self)
         # we require a file library here with masking
         assert songs_lib is None or hasattr(songs_lib, "masked")
         self.songs_lib = songs_lib
@@ -426,6 +524,14 @@ class Playlist(Collection, abc.Iterable, HasKey):
     def songs(self):
         return [s for s in self._list if not isinstance(s, str)]
 
+    @property
+    def loaded(self) -> bool:
+        """False as long as the songs of a lazily read playlist weren't read"""
+        return True
+
+    def load(self) -> None:
+        """Reads the songs of a lazily read playlist, if not done already"""
+
     def rename(self, new_name):
         """Changes this playlist's name and re-saves, or raises an `ValueError`
         if the name is not allowed"""
@@ -717,56 +823,152 @@ class XSPFBackedPlaylist(FileBackedPlaylist):
         old_pl.delete()
         return new
 
+    def __init__(
+        self,
+        dir_: _fsnative,
+        filename: _fsnative,
+        songs_lib=None,
+        pl_lib=None,
+        validate: bool = False,
+        lazy: bool = False,
+    ):
+        self._lazy = lazy
+        # the number of tracks of a playlist whose songs weren't read yet
+        self._track_count: int | None = None
+        self._songs: HashedList | None = None
+        super().__init__(
+            dir_, filename, songs_lib=songs_lib, pl_lib=pl_lib, validate=validate
+        )
+
+    @property
+    def _list(self) -> HashedList:
+        """The songs of a lazily read playlist, read on first use"""
+        if self._songs is None:
+            return self._read_songs()
+        return self._songs
+
+    @_list.setter
+    def _list(self, songs: HashedList) -> None:
+        self._songs = songs
+
+    @property
+    def loaded(self) -> bool:
+        return self._songs is not None
+
+    def load(self) -> None:
+        if not self.loaded:
+            self._read_songs()
+
+    def __len__(self):
+        if not self.loaded:
+            return self._track_count or 0
+        return super().__len__()
+
     def _populate_from_file(self):
-        library = self.songs_lib
+        if self._lazy:
+            # Only count the tracks for now, reading their locations and
+            # looking them up in the library can wait until they get used
+            count = 0
+            try:
+                for location, _track in self._iter_tracks():
+                    if location is not None:
+                        count += 1
+            except (ET.ParseError, ValueError) as e:
+                print_w(f"Couldn't load {self.path!r} ({e})")
+            self._track_count = count
+            self._songs = None
+            if self.pl_lib is not None:
+                self.pl_lib._unread_added(self)
+            return
+
         try:
-            tree = ET.parse(self.path)
-            # TODO: validate some top-level tag data
-
-            root = tree.getroot()
-            if root.tag == "playlist":
-                ns_mapping = None
-                print_w(f"Using legacy namespace for import of {self.path}")
-            elif root.tag == "{" + XSPF_NS + "}playlist":
-                # Try correct format first
-                ns_mapping = {"": XSPF_NS}
+            self._add_tracks()
+        except (ET.ParseError, ValueError) as e:
+            print_w(f"Couldn't load {self.path!r} ({e})")
+
+    def _read_songs(self) -> HashedList:
+        songs = self._songs = _PlaylistSongs(self)
+        self._track_count = None
+        if self.pl_lib is not None:
+            self.pl_lib._unread_removed(self)
+        try:
+            self._add_tracks()
+        except (OSError, ET.ParseError, ValueError) as e:
+            print_w(f"Couldn't load {self.path!r} ({e})")
+        return songs
+
+    def _iter_tracks(self) -> abc.Iterator[tuple[str | None, Element]]:
+        """Streams through the file, yielding the location (if any) and the
+        element of every track. Elements get cleared once done with.
+
+        Raises OSError, ET.ParseError or ValueError
+        """
+
+        context = ET.iterparse(self.path, events=("start", "end"))
+        _event, root = next(context)
+        if root.tag == "playlist":
+            ns = ""
+            print_w(f"Using legacy namespace for import of {self.path}")
+        elif root.tag == "{" + XSPF_NS + "}playlist":
+            ns = "{" + XSPF_NS + "}"
+        else:
+            raise ValueError(f"Unknown playlist root of {root.tag}")
+        title_tag, track_tag, location_tag = (
+            ns + "title",
+            ns + "track",
+            ns + "location",
+        )
+
+        title = None
+        location = None
+        parents = [root.tag]
+        for event, elem in context:
+            if event == "start":
+                parents.append(elem.tag)
+                continue
+            parents.pop()
+            if elem.tag == location_tag:
+                if location is None and parents[-1] == track_tag:
+                    location = elem.text or ""
+            elif elem.tag == track_tag:
+                yield location, elem
+                location = None
+                elem.clear()
+            elif elem.tag == title_tag and len(parents) == 1:
+                title = elem.text
+
+        if title is None:
+            print_w(f"No <title> found in {self.path}")
+        elif self.name != title:
+            print_w(
+                f"Playlist was named {title!r} in XML "
+                f"instead of {self.name!r} at {self.path!r}"
+            )
+
+    def _add_tracks(self) -> None:
+        library = self.songs_lib
+        for location, track in self._iter_tracks():
+            if location is None:
+                continue
+            path = location.strip().replace("\n", "").replace("\r", "")
+            try:
+                # TODO: process relative URIs too?
+                path = uri2fsn(path)
+            except ValueError:
+                pass
+            if path in library:
+                self._list.append(library[path])
+            elif library and library.masked(path):
+                self._list.append(path)
             else:
-                raise ValueError(f"Unknown playlist root of {root.tag}")
-            node = root.find("title", namespaces=ns_mapping)
-            if node is None:
-                print_w(
-                    f"No <title> found in {self.path} "
-                    f"(Got nodes: {[el.tag for el in root.iter()]})"
-                )
-            elif self.name != node.text:
+                # TODO: handle missing playlist items (#3105, #729, #3131)
+                node_dump = ET.tostring(track, method="xml").decode("utf-8")
                 print_w(
-                    f"Playlist was named {node.text!r} in XML "
-                    f"instead of {self.name!r} at {self.path!r}"
+                    f"Couldn't find {path!r} in playlist at {self.path!r}. "
+                    f"Perhaps its metadata will help: {node_dump!r}"
                 )
-
-            for node in tree.iterfind(".//track", namespaces=ns_mapping):
-                location = node.findtext("location", namespaces=ns_mapping).strip()
-                path = location.replace("\n", "").replace("\r", "")
-                try:
-                    # TODO: process relative URIs too?
-                    path = uri2fsn(path)
-                except ValueError:
-                    pass
-                if path in library:
-                    self._list.append(library[path])
-                elif library and library.masked(path):
-                    self._list.append(path)
-                else:
-                    # TODO: handle missing playlist items (#3105, #729, #3131)
-                    node_dump = ET.tostring(node, method="xml").decode("utf-8")
-                    print_w(
-                        f"Couldn't find {path!r} in playlist at {self.path!r}. "
-                        f"Perhaps its metadata will help: {node_dump!r}"
-                    )
-                    self._list.append(path)
-                    library.mask(path)
-        except (ET.ParseError, ValueError) as e:
-            print_w(f"Couldn't load {self.path!r} ({e})")
+                self._list.append(path)
+                library.mask(path)
 
     @classmethod
     def filename_for(cls, name: str):
@@ -161,27 +161,42 @@ class HashedList(abc.MutableSequence):
             return
 
         self._data = list(arg)
-        for item in arg:
-            self._map[item] += 1
+        for item in self._data:
+            self.__add(item)
+
+    def _added(self, item):
+        """Called when item got added and wasn't contained before"""
+
+    def _removed(self, item):
+        """Called when the last occurrence of item got removed"""
+
+    def __add(self, item):
+        self._map[item] += 1
+        if self._map[item] == 1:
+            self._added(item)
+
+    def __remove(self, item):
+        self._map[item] -= 1
+        if not self._map[item]:
+            del self._map[item]
+            self._removed(item)
 
     def __setitem__(self, index, item):
         old_items = self._data[index]
         if not isinstance(index, slice):
             old_items = [old_items]
 
-        for old in old_items:
-            self._map[old] -= 1
-            if not self._map[old]:
-                del self._map[old]
-
         self._data[index] = item
 
         items = item
         if not isinstance(index, slice):
             items = [items]
 
+        # add first, so replacing items with themselves reports nothing
         for item in items:
-            self._map[item] += 1
+            self.__add(item)
+        for old in old_items:
+            self.__remove(old)
 
     def __getitem__(self, index):
         return self._data[index]
@@ -191,9 +206,7 @@ class HashedList(abc.MutableSequence):
         if not isinstance(index, slice):
             items = [items]
         for item in items:
-            self._map[item] -= 1
-            if not self._map[item]:
-                del self._map[item]
+            self.__remove(item)
         del self._data[index]
 
     def __len__(self):
@@ -201,7 +214,7 @@ class HashedList(abc.MutableSequence):
 
     def insert(self, index, item):
         self._data.insert(index, item)
-        self._map[item] += 1
+        self.__add(item)
 
     def __contains__(self, item):
         return item in self._map
@@ -215,3 +228,77 @@ class HashedList(abc.MutableSequence):
 
     def __repr__(self):
         return repr(self._data)
+
+
+class FenwickTree:
+    """A list of numbers which supports changing values, appending, prefix
+    sums and finding the position of a prefix sum, all in O(log n).
+
+    Values have to be non-negative for `find` to work.
+    """
+
+    def __init__(self, values=()):
+        self._values = list(values)
+        # tree[i - 1] is the sum of values (i - lowbit(i), i]
+        tree = list(self._values)
+        for i in range(1, len(tree) + 1):
+            parent = i + (i & -i)
+            if parent <= len(tree):
+                tree[parent - 1] += tree[i - 1]
+        self._tree = tree
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self._values)
+        delta = value - self._values[index]
+        if not delta:
+            return
+        self._values[index] = value
+        tree = self._tree
+        i = index + 1
+        while i <= len(tree):
+            tree[i - 1] += delta
+            i += i & -i
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def append(self, value):
+        i = len(self._values) + 1
+        self._values.append(value)
+        low = i & -i
+        self._tree.append(value + self.sum(i - 1) - self.sum(i - low))
+
+    def sum(self, end=None):
+        """Returns the sum of the first `end` values (all by default)"""
+
+        tree = self._tree
+        i = len(tree) if end is None else end
+        result = 0
+        while i > 0:
+            result += tree[i - 1]
+            i -= i & -i
+        return result
+
+    def find(self, target):
+        """Returns the smallest index whose prefix sum (including itself) is
+        larger than target, or len(self) if there is none.
+        """
+
+        tree = self._tree
+        size = len(tree)
+        pos = 0
+        step = 1 << size.bit_length()
+        while step:
+            next_pos = pos + step
+            if next_pos <= size and tree[next_pos - 1] <= target:
+                pos = next_pos
+                target -= tree[next_pos - 1]
+            step >>= 1
+        return pos
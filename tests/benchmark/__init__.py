@@ -0,0 +1,73 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+"""Benchmarks on large synthetic libraries.
+
+These are skipped by default, run them with:
+
+    pytest -m benchmark -s tests/benchmark
+"""
+
+import random
+import time
+from contextlib import contextmanager
+
+from senf import fsnative
+
+from quodlibet.formats import AudioFile
+
+SIZES = [100_000, 500_000]
+"""Number of songs of the benchmarked libraries"""
+
+_GENRES = ["Rock", "Pop", "Jazz", "Classical", "Electronic", "Hip-Hop", "Folk"]
+
+
+def synthetic_songs(count: int, seed: int = 0) -> list[AudioFile]:
+    """Returns `count` songs with a realistic spread of tags: about ten songs
+    per album and ten albums per artist.
+    """
+
+    rand = random.Random(seed)
+    songs = []
+    for i in range(count):
+        album = i // 10
+        artist = album // 10
+        song = AudioFile(
+            {
+                "~filename": fsnative(f"/music/Artist {artist}/Album {album}/{i}.flac"),
+                "~mountpoint": fsnative("/music"),
+                "artist": f"Artist {artist}",
+                "albumartist": f"Artist {artist}",
+                "album": f"Album {album}",
+                "title": f"Title {i} {rand.choice(_GENRES)}",
+                "genre": rand.choice(_GENRES),
+                "date": str(1960 + album % 60),
+                "tracknumber": f"{i % 10 + 1}/10",
+                "~#added": 1_500_000_000 + rand.randrange(200_000_000),
+                "~#length": rand.randrange(60, 600),
+                "~#filesize": rand.randrange(2**20, 2**26),
+                "~#bitrate": rand.choice([128, 192, 320, 900]),
+                "~#mtime": 1_500_000_000.5 + i,
+            }
+        )
+        if rand.random() < 0.3:
+            song["~#playcount"] = rand.randrange(1, 100)
+            song["~#lastplayed"] = 1_600_000_000 + rand.randrange(100_000_000)
+        if rand.random() < 0.2:
+            song["~#rating"] = rand.choice([0.2, 0.4, 0.6, 0.8, 1.0])
+        songs.append(song)
+    return songs
+
+
+@contextmanager
+def timed(name: str, results: dict | None = None):
+    """Prints (and optionally stores in results) the time taken"""
+
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if results is not None:
+        results[name] = elapsed
+    print(f"{name}: {elapsed:.3f}s")
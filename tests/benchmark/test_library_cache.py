@@ -0,0 +1,38 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from io import BytesIO
+
+import pytest
+
+from quodlibet.formats import (
+    dump_audio_files,
+    load_audio_files,
+    read_audio_files,
+    write_audio_files,
+)
+from tests.benchmark import SIZES, synthetic_songs, timed
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_library_cache(size):
+    songs = synthetic_songs(size)
+    results: dict[str, float] = {}
+
+    with timed(f"pickle save ({size})", results):
+        pickled = dump_audio_files(songs)
+    with timed(f"pickle load ({size})", results):
+        assert len(load_audio_files(pickled)) == size
+
+    fileobj = BytesIO()
+    with timed(f"binary save ({size})", results):
+        write_audio_files(fileobj, songs)
+    fileobj.seek(0)
+    with timed(f"binary load ({size})", results):
+        assert len(read_audio_files(fileobj)) == size
+
+    print(f"size: pickle {len(pickled)} bytes, binary {fileobj.tell()} bytes")
+    assert results[f"binary load ({size})"] < results[f"pickle load ({size})"]
@@ -0,0 +1,53 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import pytest
+
+from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
+from tests.benchmark import SIZES, synthetic_songs, timed
+
+KEYS = ["~#playcount", "~#rating", "~#added", "~#length", "~#lastplayed"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_numeric_columns(size):
+    library = SongLibrary()
+    library.add(synthetic_songs(size))
+    songs = list(library.values())
+    albums = library.albums.values()
+    columns = library.numeric_columns()
+    results: dict[str, float] = {}
+
+    with timed(f"building columns ({size})"):
+        for key in KEYS:
+            columns.column(key)
+
+    for key in KEYS:
+        func = AudioFile.sort_by_func(key)
+        with timed(f"sort by song {key} ({size})", results):
+            expected = sorted(range(len(songs)), key=lambda i: func(songs[i]))
+        with timed(f"sort by column {key} ({size})", results):
+            keys = columns.get(songs, key, 0)
+            assert sorted(range(len(songs)), key=keys.__getitem__) == expected
+
+    for key in KEYS:
+        for album in albums:
+            album.finalize()
+        with timed(f"aggregate by column {key} ({size})", results):
+            values = [album(key) for album in albums]
+        for album in albums:
+            album.numeric_columns = None
+            album.finalize()
+        with timed(f"aggregate by song {key} ({size})", results):
+            assert [album(key) for album in albums] == values
+        for album in albums:
+            album.numeric_columns = columns
+
+    by_song = sum(v for k, v in results.items() if " by song " in k)
+    by_column = sum(v for k, v in results.items() if " by column " in k)
+    assert by_column < by_song
+    library.destroy()
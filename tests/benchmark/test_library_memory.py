@@ -0,0 +1,53 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import gc
+import tracemalloc
+from io import BytesIO
+
+import pytest
+
+from quodlibet.formats import (
+    dump_audio_files,
+    load_audio_files,
+    read_audio_files,
+    write_audio_files,
+)
+from tests.benchmark import SIZES, synthetic_songs
+
+
+def _bytes_per_song(load, size):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        songs = load()
+        used = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(songs) == size
+    return used / size
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_library_memory(size):
+    songs = synthetic_songs(size)
+    pickled = dump_audio_files(songs, process=False)
+    fileobj = BytesIO()
+    write_audio_files(fileobj, songs)
+    del songs
+
+    def read_binary():
+        fileobj.seek(0)
+        return read_audio_files(fileobj)
+
+    results = {
+        "pickle": _bytes_per_song(lambda: load_audio_files(pickled, False), size),
+        "pickle shared": _bytes_per_song(lambda: load_audio_files(pickled), size),
+        "binary": _bytes_per_song(read_binary, size),
+    }
+    for name, value in results.items():
+        print(f"{name} ({size}): {value:.0f} bytes per song")
+    assert results["pickle shared"] < results["pickle"]
@@ -0,0 +1,70 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import pytest
+
+from quodlibet.library import SongLibrary
+from quodlibet.query import Query
+from tests.benchmark import SIZES, synthetic_songs, timed
+
+QUERIES = [
+    "rock",
+    "artist='Artist 12'",
+    "#(playcount > 10)",
+    "#(lastplayed < 1 week)",
+    "&(title=jazz, genre=Jazz, #(length > 5 minutes))",
+    "&(album=/1$/, |(genre=Rock, genre=Pop), #(added > 2020-01-01))",
+]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_query_filter(size):
+    songs = synthetic_songs(size)
+    results: dict[str, float] = {}
+
+    for text in QUERIES:
+        query = Query(text)
+        with timed(f"interpreted {text!r} ({size})", results):
+            expected = query._match.filter(songs)
+        with timed(f"compiled {text!r} ({size})", results):
+            assert query.filter(songs) == expected
+
+    interpreted = sum(v for k, v in results.items() if k.startswith("interpreted"))
+    compiled = sum(v for k, v in results.items() if k.startswith("compiled"))
+    assert compiled < interpreted
+
+
+NUMERIC_QUERIES = [
+    "#(playcount > 10)",
+    "&(#(playcount > 10), #(added < 30 days))",
+    "|(#(rating >= 0.8), #(length < 2 minutes))",
+    "&(genre=Rock, #(bitrate = 320), !#(lastplayed < 1 year))",
+]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_query_filter_many(size):
+    library = SongLibrary()
+    library.add(synthetic_songs(size))
+    library.columnar_queries = True
+    songs = list(library.values())
+    results: dict[str, float] = {}
+
+    for text in NUMERIC_QUERIES:
+        query = Query(text)
+        # the columns get built once and reused until the library changes
+        with timed(f"building columns {text!r} ({size})"):
+            query.filter(library)
+        with timed(f"song by song {text!r} ({size})", results):
+            expected = query._compiled.filter(songs)
+        with timed(f"columns {text!r} ({size})", results):
+            assert set(query.filter(library)) == set(expected)
+
+    by_song = sum(v for k, v in results.items() if k.startswith("song by song"))
+    columns = sum(v for k, v in results.items() if k.startswith("columns"))
+    assert columns < by_song
+    library.destroy()
@@ -0,0 +1,48 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import pytest
+
+from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
+from tests.benchmark import SIZES, synthetic_songs, timed
+
+ORDERS = [
+    [("", False), ("artist", False)],
+    [("", False), ("date", False), ("artist", False)],
+    [("", True), ("~#added", True), ("genre", False)],
+]
+
+
+def _multi_pass(songs, tags):
+    order = list(range(len(songs)))
+    for tag, reverse in tags:
+        func = AudioFile.sort_by_func(tag) if tag else lambda s: s.sort_key
+        keys = list(map(func, songs))
+        order.sort(key=keys.__getitem__, reverse=reverse)
+    return order
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("size", SIZES)
+def test_songlist_sort(size):
+    library = SongLibrary()
+    library.add(synthetic_songs(size))
+    songs = list(library.values())
+    sort_keys = library.sort_keys()
+    results: dict[str, float] = {}
+
+    for tags in ORDERS:
+        with timed(f"uncached {tags!r} ({size})", results):
+            expected = _multi_pass(songs, tags)
+        with timed(f"first {tags!r} ({size})"):
+            assert sort_keys.order(songs, tags) == expected
+        with timed(f"cached {tags!r} ({size})", results):
+            assert sort_keys.order(songs, tags) == expected
+
+    uncached = sum(v for k, v in results.items() if k.startswith("uncached"))
+    cached = sum(v for k, v in results.items() if k.startswith("cached"))
+    assert cached < uncached
+    library.destroy()
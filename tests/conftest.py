@@ -53,3 +53,14 @@ def pytest_report_teststatus(report: TestReport, config: Config):
     # Each test should clear the logs. This won't work well if parallelised
     _logs.clear()
     return None
+
+
+def pytest_collection_modifyitems(config: Config, items):
+    """Benchmarks take long, so skip them unless selected explicitly"""
+
+    if "benchmark" in (config.getoption("markexpr") or ""):
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with '-m benchmark'")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
@@ -53,8 +53,37 @@ class TDuplicates(PluginTestCase):
     def tearDown(self):
         self.plugin.destroy()
         del self.plugin
+        self.mod.Duplicates.plugin_disabled()
         destroy_fake_app()
 
     def test_starts_up(self):
         sws = [SongWrapper(s) for s in app.library.songs]
         self.plugin.plugin_songs(sws).destroy()
+
+    def test_index(self):
+        songs = [
+            AudioFile({"~filename": f"/dev/{i}", "artist": artist, "title": "no!"})
+            for i, artist in enumerate(["foo BAR", "föo bár", "baz"])
+        ]
+        app.library.add(songs[:2])
+        duplicates = self.mod.Duplicates
+        options = duplicates.get_key_options()
+        index = duplicates.get_index(app.library)
+        assert duplicates.get_index(app.library) is index
+        key = duplicates.get_key(songs[0])
+        assert index.groups(options) == {key: set(songs[:2])}
+
+        app.library.add(songs[2:])
+        songs[2]["artist"] = "Foo bar"
+        app.library.changed(songs[2:])
+        assert index.groups(options)[key] == set(songs)
+
+        app.library.remove(songs[:1])
+        assert index.groups(options)[key] == set(songs[1:])
+
+        options = options[:1] + (False,) * 4
+        assert len(index.groups(options)) == 2
+
+        duplicates.plugin_disabled()
+        assert duplicates._index is None
+        assert duplicates.get_index(app.library) is not index
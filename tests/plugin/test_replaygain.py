@@ -8,7 +8,13 @@
 from gi.repository import Gtk, GLib
 import re
 import time
-from quodlibet.ext.songsmenu.replaygain import UpdateMode, RGDialog, ReplayGainPipeline
+from quodlibet.ext.songsmenu.replaygain import (
+    UpdateMode,
+    RGDialog,
+    ReplayGainPipeline,
+    get_num_pipelines,
+    get_num_threads,
+)
 from quodlibet.formats import MusicFile
 from quodlibet.formats import AudioFile
 
@@ -177,6 +183,16 @@ class TRGDialog(TestCase):
         # And the other processor should get the other half
         self.assertEqual(self.track_nums_from(d.pipes[1].started), [2, 6])
 
+    def test_num_pipelines(self):
+        songs = [[a_song(x)] for x in range(8)]
+        d = RGDialog(songs, None, UpdateMode.ALBUM_MISSING, num_pipelines=3)
+        assert len(d.pipes) == 3
+        d.destroy()
+
+        assert get_num_pipelines(3, 2) == 2
+        assert get_num_pipelines(0, 100) == min(get_num_threads(), 100)
+        assert get_num_pipelines(0, 0) == 1
+
     def run_main_loop(self, timeout=0.25):
         start = time.time()
         while abs(time.time() - start) < timeout:
@@ -6,11 +6,15 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+import os
+import shutil
+
 from gi.repository import Gst
 
 from quodlibet.library.base import Library
+from tests import mkdtemp, get_data_path
 from tests.plugin import PluginTestCase
-from tests.helper import visible
+from tests.helper import visible, get_temp_copy
 
 from quodlibet.player.nullbe import NullPlayer
 from quodlibet.formats import AudioFile
@@ -63,3 +67,28 @@ class TWaveformSeekBar(PluginTestCase):
 
         message = FakeRMSMessage()
         bar._on_bus_message(None, message, 1234)
+
+    def test_cache(self):
+        path = mkdtemp()
+        filename = get_temp_copy(get_data_path("empty.flac"))
+        try:
+            cache = self.mod.WaveformCache(os.path.join(path, "waveforms"))
+            song = AudioFile({"~filename": filename, "~#length": 10})
+            assert cache.get(song, 3) is None
+
+            cache.set(song, 3, [0.5, 0.25, 0.0])
+            values = cache.get(song, 3)
+            assert values[0] == 0.5
+            assert abs(values[1] - 0.25) < 0.5 / 255
+            assert values[2] == 0
+            assert cache.get(song, 4) is None
+
+            os.utime(filename, (0, 0))
+            assert cache.get(song, 3) is None
+            cache.set(song, 3, [1.0])
+            cache.set(song, 4, [1.0])
+            cache.prune(1)
+            assert len(os.listdir(cache.path)) == 1
+        finally:
+            os.unlink(filename)
+            shutil.rmtree(path)
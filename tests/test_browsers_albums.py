@@ -211,6 +211,14 @@ class TAlbumBrowser(TestCase):
             self._wait()
             self.assertEqual(len(self.songs), 3)
 
+    def test_filter_narrowing(self):
+        with realized(self.bar):
+            for text, count in [("o", 3), ("on", 1), ("o", 3), ("bo", 1), ("m", 2)]:
+                self.bar.filter_text(text)
+                self._wait()
+                albums = {s.album_key for s in self.songs}
+                assert len(albums) == count, text
+
     def test_filter_artist(self):
         with realized(self.bar):
             self.bar.filter("artist", ["piman"])
@@ -12,6 +12,7 @@ from collections.abc import Generator
 import pytest
 
 import quodlibet.config
+from quodlibet.browsers import iradio
 from quodlibet.browsers.iradio import (
     InternetRadio,
     IRFile,
@@ -25,6 +26,7 @@ from quodlibet.formats import AudioFile
 from quodlibet.library import SongLibrary
 from quodlibet.util import is_windows, is_osx
 from tests import TestCase, skipIf, run_gtk_loop
+from .helper import capture_output
 
 quodlibet.config.RATINGS = quodlibet.config.HardCodedRatingsPrefs()
 
@@ -205,9 +207,76 @@ def test_download_tags(test_server):
     host, port = test_server.server_address
     url = f"http://{host}:{port:d}"
 
-    ret = list(download_taglist(url, received.extend, None))
+    ret = download_taglist(url, received.extend)
     run_gtk_loop()
-    assert len(ret), "No stations"
+    assert ret, "No stations"
     assert all(ret), "Got some falsey stations"
     assert received, f"No stations received from {url}"
     assert {s("~filename") for s in received} == set(FAKE_URLS)
+
+
+class CachingBzip2GetHandler(Bzip2GetHandler):
+    def do_GET(self) -> None:
+        if self.headers.get("If-Modified-Since"):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.compressor = BZ2Compressor()
+        super().do_GET()
+
+
+@pytest.fixture
+def caching_server() -> Generator[HTTPServer, None, None]:
+    server = HTTPServer(("localhost", 0), CachingBzip2GetHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def test_download_tags_small_steps(caching_server):
+    host, port = caching_server.server_address
+    url = f"http://{host}:{port:d}"
+
+    ret = download_taglist(url, lambda stations: None, step=7)
+    assert {s("~filename") for s in ret} == set(FAKE_URLS)
+
+
+def test_download_tags_broken_cache(caching_server, tmp_path):
+    received = []
+    host, port = caching_server.server_address
+    url = f"http://{host}:{port:d}"
+    cache = tmp_path / "stations"
+    cache.write_bytes(b"garbage")
+
+    ret = download_taglist(url, received.append, cache=str(cache))
+    run_gtk_loop()
+    assert ret is None
+    assert received == [None]
+
+
+def test_download_tags_unexpected_error(test_server, monkeypatch):
+    def fail(lines):
+        raise ValueError
+
+    received = []
+    host, port = test_server.server_address
+    url = f"http://{host}:{port:d}"
+    monkeypatch.setattr(iradio, "iter_taglist", fail)
+
+    with capture_output():
+        ret = download_taglist(url, received.append)
+    run_gtk_loop()
+    assert ret is None
+    assert received == [None]
+
+
+def test_download_tags_cached(caching_server, tmp_path):
+    host, port = caching_server.server_address
+    url = f"http://{host}:{port:d}"
+    cache = str(tmp_path / "stations")
+
+    ret = download_taglist(url, lambda stations: None, cache=cache)
+    assert ret
+    cached = download_taglist(url, lambda stations: None, cache=cache)
+    assert [s("~filename") for s in cached] == [s("~filename") for s in ret]
+    assert all(isinstance(s, IRFile) for s in cached)
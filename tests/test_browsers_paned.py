@@ -4,7 +4,7 @@
 # (at your option) any later version.
 
 from tests import TestCase, run_gtk_loop
-from .helper import realized
+from .helper import realized, capture_output
 
 from gi.repository import Gtk
 from senf import fsnative
@@ -334,6 +334,38 @@ class TPane(TestCase):
     def test_fill(self):
         self.pane.fill(SONGS)
 
+    def test_fill_async(self):
+        self.pane.ASYNC_FILL = 1
+        self.pane.FILL_BATCH = 2
+        self.pane.fill(SONGS[:1])
+        self.pane.fill(SONGS)
+        self.pane.remove(SONGS[:1])
+        while len(self.pane.get_model()) != 4:
+            run_gtk_loop()
+        assert self.pane.list("artist") == {"mu", "piman", ""}
+        assert self.pane.get_selected() == {None}
+
+    def test_fill_async_error(self):
+        self.pane.ASYNC_FILL = 1
+        model = self.pane.get_model()
+        group_songs = model.group_songs
+
+        def fail_in_thread(songs, cancellable=None, caches=None):
+            if caches is not None:
+                raise ValueError
+            return group_songs(songs, cancellable)
+
+        model.group_songs = fail_in_thread
+        with capture_output():
+            self.pane.fill(SONGS)
+            self.pane.remove(SONGS[:1])
+            while len(self.pane.get_model()) != 4:
+                run_gtk_loop()
+        assert self.pane.list("artist") == {"mu", "piman", ""}
+        # not queued anymore
+        self.pane.add(SONGS[:1])
+        assert len(self.pane.get_model()) == 5
+
     def test_fill_selection(self):
         self.pane.fill(SONGS)
 
@@ -543,6 +575,26 @@ class TPaneModel(TestCase):
             m.remove_songs([song], True)
             self._verify_model(m)
 
+    def test_change_songs(self):
+        conf = PaneConfig("artist")
+        m = PaneModel(conf)
+        songs = [AudioFile(song) for song in SONGS]
+        m.add_songs(songs)
+        keys = [e.key for e in m.itervalues()]
+
+        # like the browser handles changed songs
+        song = songs[0]
+        song["artist"] = "zzz"
+        m.remove_songs([song], False)
+        m.add_songs([song])
+        m.remove_songs([], True)
+        self._verify_model(m)
+        assert [e.key for e in m.itervalues()] == (
+            [k for k in keys[:-1] if k != "<boris>"] + ["zzz", keys[-1]]
+        )
+        assert m.get_songs([len(m) - 2]) == {song}
+        assert m.get_songs([0]) == set(songs)
+
     def test_matches(self):
         conf = PaneConfig("artist")
         m = PaneModel(conf)
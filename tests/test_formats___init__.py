@@ -6,6 +6,7 @@
 # (at your option) any later version.
 
 import sys
+from io import BytesIO
 
 from senf import fsnative
 
@@ -17,6 +18,9 @@ from quodlibet.formats import (
     AudioFile,
     load_audio_files,
     dump_audio_files,
+    read_audio_files,
+    write_audio_files,
+    is_binary_format,
     SerializationError,
 )
 from quodlibet.util.picklehelper import pickle_dumps
@@ -126,6 +130,33 @@ class TPickle(TestCase):
         assert i["int"] == 42
         assert i["float"] == 1.25
 
+    def test_load_audio_files_shared(self):
+        songs = []
+        for _ in range(2):
+            song = AudioFile.__new__(list(formats.types)[0])
+            dict.__init__(
+                song,
+                {
+                    "~mountpoint": fsnative("/".join(["", "mnt"])),
+                    "artist": "".join(["Art", "ist"]),
+                    "title": "".join(["Tit", "le"]),
+                    "~#length": 42,
+                },
+            )
+            songs.append(song)
+        data = dump_audio_files(songs, process=False)
+
+        a, b = load_audio_files(data, process=False)
+        assert a["artist"] is not b["artist"]
+
+        a, b = load_audio_files(data, process=True)
+        assert dict(a) == dict(b)
+        assert a["artist"] is b["artist"]
+        assert a["~mountpoint"] is b["~mountpoint"]
+        assert a["title"] is not b["title"]
+        for key_a, key_b in zip(a, b, strict=True):
+            assert key_a is key_b
+
     def test_dump_audio_files(self):
         data = dump_audio_files(self.instances, process=False)
         items = load_audio_files(data, process=False)
@@ -174,3 +205,87 @@ class TPickle(TestCase):
             data = pickle_dumps([42], protocol)
             with self.assertRaises(SerializationError):
                 load_audio_files(data)
+
+
+class TBinary(TestCase):
+    def setUp(self):
+        instances = []
+        for i, t in enumerate(formats.types):
+            inst = AudioFile.__new__(t)
+            dict.__init__(
+                inst,
+                {
+                    "~filename": fsnative(f"/dir/file{i}"),
+                    "~mountpoint": fsnative("/"),
+                    "artist": "Some Artist",
+                    "title": f"Title {i}\nSubtitle",
+                    "~#playcount": i,
+                    "~#rating": 0.25,
+                    "~#added": -(2**40),
+                },
+            )
+            instances.append(inst)
+        self.instances = instances
+
+    def _dump(self, items, **kwargs):
+        fileobj = BytesIO()
+        write_audio_files(fileobj, items, **kwargs)
+        return fileobj.getvalue()
+
+    def test_roundtrip(self):
+        for chunk_size in [1, 2, 1000]:
+            data = self._dump(self.instances, chunk_size=chunk_size)
+            assert is_binary_format(data)
+            items = read_audio_files(BytesIO(data))
+            assert len(items) == len(self.instances)
+            for a, b in zip(items, self.instances, strict=True):
+                assert type(a) is type(b)
+                assert dict(a) == dict(b)
+                assert type(a["~#playcount"]) is int
+                assert isinstance(a["~filename"], fsnative)
+
+    def test_interned_keys(self):
+        items = read_audio_files(BytesIO(self._dump(self.instances, chunk_size=1)))
+        keys = [next(k for k in item if k == "artist") for item in items]
+        assert all(k is keys[0] for k in keys)
+
+    def test_load_audio_files(self):
+        data = self._dump(self.instances)
+        assert len(load_audio_files(data)) == len(self.instances)
+
+    def test_empty(self):
+        assert read_audio_files(BytesIO(self._dump([]))) == []
+
+    def test_missing_class(self):
+        data = self._dump(self.instances)
+        broken = data.replace(b"SPCFile", b"FooFile")
+        items = read_audio_files(BytesIO(broken))
+        self.assertEqual(len(items), len(self.instances) - 1)
+        assert all(isinstance(i, AudioFile) for i in items)
+
+    def test_truncated(self):
+        data = self._dump(self.instances)
+        for size in [0, 5, len(data) // 2, len(data) - 1]:
+            with self.assertRaises(SerializationError):
+                read_audio_files(BytesIO(data[:size]))
+
+    def test_newer_version(self):
+        data = bytearray(self._dump(self.instances))
+        data[len(b"QLSONGS") + 1] = 0xFF
+        with self.assertRaises(SerializationError):
+            read_audio_files(BytesIO(bytes(data)))
+
+    def test_invalid_value(self):
+        inst = AudioFile.__new__(AudioFile)
+        dict.__init__(inst, {"~filename": fsnative("/foo"), "foo": lambda: None})
+        with self.assertRaises(SerializationError):
+            self._dump([inst])
+
+    def test_pickled_values(self):
+        values = {"~#big": 2**70, "~#small": -(2**64), "foo": b"bar", "~#x": (1,)}
+        for inst in self.instances:
+            inst.update(values)
+        data = self._dump(self.instances, chunk_size=2)
+        items = read_audio_files(BytesIO(data))
+        for a, b in zip(items, self.instances, strict=True):
+            assert dict(a) == dict(b)
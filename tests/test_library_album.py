@@ -3,10 +3,12 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+from quodlibet.formats import AudioFile
 from quodlibet.library import SongLibrary
 from quodlibet.library.album import AlbumLibrary
 from quodlibet.library.base import Library
 from quodlibet.util import connect_obj
+from senf import fsnative
 from tests import TestCase
 from tests.test_library_libraries import FakeSong, ASrange, AlbumSong
 
@@ -91,6 +93,31 @@ class TAlbumLibrary(TestCase):
         self.assertEqual(album2.key, key)
         self.assertEqual(len(album2.songs), 4)
 
+    def test_change_album_key(self):
+        songs = self.underlying._contents
+        old_key = songs["file_1.mp3"].album_key
+        moved = [songs["file_%d.mp3" % i] for i in range(1, 12, 3)]
+        for song in moved[:2]:
+            song["album"] = song["labelid"] = "Album 2"
+        self.underlying.changed(moved[:2])
+
+        key = songs["file_2.mp3"].album_key
+        self.assertEqual(len(self.library[key].songs), 6)
+        self.assertEqual(self.library[old_key].songs, set(moved[2:]))
+
+        # moving the rest empties the old album
+        for song in moved[2:]:
+            song["album"] = song["labelid"] = "Album 4"
+        self.underlying.changed(moved)
+        self.assertEqual(self.library.get(old_key), None)
+        self.assertEqual(len(self.library[moved[2].album_key].songs), 2)
+        self.assertEqual(len(self.library), 3)
+
+        # removing works with the new keys
+        self.underlying.remove(moved)
+        self.assertEqual(self.library.get(moved[2].album_key), None)
+        self.assertEqual(len(self.library[key].songs), 4)
+
     def test_misc(self):
         # It shouldn't implement FileLibrary etc
         assert not getattr(self.library, "filename", None)
@@ -142,9 +169,62 @@ class TAlbumLibrarySignals(TestCase):
         self.lib.changed(songs)
         self.assertEqual(self.received, ["added", "a_added", "changed", "a_changed"])
 
+    def test_change_album_key(self):
+        songs = [AlbumSong(1, "a1"), AlbumSong(2, "a1"), AlbumSong(4, "a2")]
+        self.lib.add(songs)
+        for song in songs[:2]:
+            song["album"] = "a3"
+        self.lib.changed(songs[:2])
+        self.assertEqual(
+            self.received,
+            ["added", "a_added", "changed", "a_removed", "a_added"],
+        )
+
     def tearDown(self):
         for s in self._asigs:
             self.albums.disconnect(s)
         for s in self._sigs:
             self.lib.disconnect(s)
         self.lib.destroy()
+
+
+class TAlbumLibraryNumericColumns(TestCase):
+    def setUp(self):
+        self.underlying = SongLibrary()
+        self.library = AlbumLibrary(self.underlying)
+        self.songs = [
+            AudioFile(
+                {
+                    "~filename": fsnative(f"/dir/{i}.mp3"),
+                    "album": "Album",
+                    "~#playcount": i,
+                    "~#length": 10 * i,
+                    "~#bitrate": 100,
+                    "~#rating": 0.2 * i,
+                }
+            )
+            for i in range(1, 4)
+        ]
+        self.underlying.add(self.songs)
+
+    def tearDown(self):
+        self.underlying.destroy()
+        self.library.destroy()
+
+    def test_aggregates(self):
+        (album,) = self.library.values()
+        assert album.numeric_columns is self.underlying.numeric_columns()
+        assert album("~#playcount") == 6
+        assert isinstance(album("~#playcount"), int)
+        assert album("~#length:max") == 30
+        assert album("~#rating:max") == self.songs[2]("~#rating")
+        assert album("~#bitrate") == 100
+
+    def test_changed(self):
+        (album,) = self.library.values()
+        assert album("~#playcount") == 6
+        self.songs[0]["~#playcount"] = 10
+        self.underlying.changed([self.songs[0]])
+        assert album("~#playcount") == 15
+        self.underlying.remove([self.songs[1]])
+        assert album("~#playcount") == 13
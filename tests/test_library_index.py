@@ -0,0 +1,130 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
+from quodlibet.library.index import tokenize
+from quodlibet.query import Query
+from senf import fsnative
+from tests import TestCase
+
+
+def _song(num, **kwargs):
+    song = AudioFile(kwargs)
+    song["~filename"] = fsnative("/dir/file_%d.mp3" % num)
+    return song
+
+
+class TTagIndex(TestCase):
+    def setUp(self):
+        self.library = SongLibrary()
+        self.songs = [
+            _song(0, artist="Beyoncé", title="Halo", genre="Pop"),
+            _song(1, artist="The Beatles", title="Help!", genre="Rock\nPop"),
+            _song(2, artist="Motörhead", title="Ace of Spades", genre="Metal"),
+            _song(3, title="No Artist", genre="rock"),
+        ]
+        self.library.add(self.songs)
+        self.index = self.library.enable_tag_index()
+
+    def tearDown(self):
+        self.library.destroy()
+
+    def test_tokenize(self):
+        assert tokenize("Motörhead - Ace of Spades") == {
+            "motorhead",
+            "ace",
+            "of",
+            "spades",
+        }
+
+    def test_exact(self):
+        assert self.index.exact("genre", "Pop") == {self.songs[0], self.songs[1]}
+        assert self.index.exact("genre", "pop") == set()
+        assert self.index.exact("nope", "Pop") == set()
+
+    def test_containing(self):
+        assert self.index.containing("artist", "beyonce") == {self.songs[0]}
+        assert self.index.containing("artist", "eatle") == {self.songs[1]}
+        assert self.index.containing("genre", "rock") == {
+            self.songs[1],
+            self.songs[3],
+        }
+        assert self.index.containing("artist", "zzz") == set()
+
+    def test_containing_short(self):
+        assert self.index.containing("artist", "be") is None
+
+    def test_ordered(self):
+        songs = list(self.library)
+        assert self.index.ordered(reversed(songs)) == songs
+        self.library.changed([songs[0]])
+        assert self.index.ordered(reversed(songs)) == songs
+
+    def test_signals(self):
+        song = self.songs[0]
+        song["artist"] = "Jay-Z"
+        self.library.changed([song])
+        assert not self.index.containing("artist", "beyonce")
+        assert self.index.containing("artist", "jay") == {song}
+
+        self.library.remove([song])
+        assert not self.index.containing("artist", "jay")
+        assert len(self.index) == 3
+
+        new = _song(10, artist="Beyoncé")
+        self.library.add([new])
+        assert self.index.containing("artist", "beyonce") == {new}
+
+    def test_disable(self):
+        self.library.disable_tag_index()
+        assert self.library.tag_index is None
+        self.library.add([_song(10, artist="foo")])
+        assert len(self.index) == 0
+
+    def test_candidates(self):
+        def candidates(text):
+            return Query(text).candidates(self.index)
+
+        assert candidates("beyonce") == {self.songs[0]}
+        assert candidates("artist=beatles") == {self.songs[1]}
+        assert candidates('genre="Pop"c') == {self.songs[0], self.songs[1]}
+        assert candidates("genre=|(metal, pop)") == {
+            self.songs[0],
+            self.songs[1],
+            self.songs[2],
+        }
+        assert candidates("&(genre=pop, artist=beatles)") == {self.songs[1]}
+        assert candidates("|(genre=metal, #(playcount > 1))") is None
+        assert candidates("&(genre=metal, #(playcount > 1))") == {self.songs[2]}
+        assert candidates("!artist=beatles") is None
+        assert candidates("artist=/b.*/") is None
+        assert candidates("~people=beatles") is None
+        assert candidates("") is None
+        assert candidates("artist=/^$/c") is None
+
+    def test_query_matches_linear(self):
+        queries = [
+            "beyonce",
+            "artist=motorhead",
+            "genre=rock",
+            'genre="rock"c',
+            "|(genre=metal, title=help)",
+            "&(genre=pop, !artist=beatles)",
+            "title=/^h/",
+            "artist=",
+            "artist=/^$/c",
+            "artist=/^$/",
+            "ACE",
+        ]
+        for text in queries:
+            expected = Query(text).filter(self.songs)
+            assert set(self.library.query(text)) == set(expected), text
+
+    def test_query_keeps_order(self):
+        for text in ["pop", "rock", "|(genre=metal, title=help)"]:
+            query = Query(text)
+            expected = [s for s in self.library if query.search(s)]
+            assert query.filter(self.library) == expected, text
@@ -0,0 +1,150 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+
+from quodlibet.formats import AudioFile
+from quodlibet.library import SongLibrary
+from quodlibet.library.journal import JOURNAL_SUFFIX
+from senf import fsnative
+from tests import TestCase, mkdtemp
+
+
+def _song(num, **kwargs):
+    song = AudioFile(kwargs)
+    song["~filename"] = fsnative("/dir/file_%d.mp3" % num)
+    return song
+
+
+class TLibraryJournal(TestCase):
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.filename = os.path.join(self.dir, "songs")
+        self.journal_fn = self.filename + JOURNAL_SUFFIX
+
+        library = SongLibrary()
+        library.add(
+            [_song(i, title="Title %d" % i, **{"~#playcount": i}) for i in range(10)]
+        )
+        library.save(self.filename)
+        library.destroy()
+
+        self.library = SongLibrary()
+        self.library.load(self.filename)
+        self.journal = self.library.enable_journal()
+
+    def tearDown(self):
+        self.library.destroy()
+        shutil.rmtree(self.dir)
+
+    def _reload(self):
+        library = SongLibrary()
+        library.load(self.filename)
+        return library
+
+    def _snapshot(self):
+        with open(self.filename, "rb") as h:
+            return h.read()
+
+    def test_save_appends(self):
+        snapshot = self._snapshot()
+        song = self.library[fsnative("/dir/file_3.mp3")]
+        song["~#playcount"] = 42
+        self.library.changed([song])
+        self.library.remove([self.library[fsnative("/dir/file_5.mp3")]])
+        self.library.add([_song(20, title="New")])
+        assert self.library.dirty
+        self.library.save()
+
+        assert not self.library.dirty
+        assert self._snapshot() == snapshot
+        assert os.path.getsize(self.journal_fn)
+
+        library = self._reload()
+        assert len(library) == 10
+        assert library[fsnative("/dir/file_3.mp3")]("~#playcount") == 42
+        assert fsnative("/dir/file_5.mp3") not in library
+        assert library[fsnative("/dir/file_20.mp3")]("title") == "New"
+        library.destroy()
+
+    def test_renamed(self):
+        song = self.library[fsnative("/dir/file_1.mp3")]
+        del self.library._contents[song.key]
+        song["~filename"] = fsnative("/dir/renamed.mp3")
+        self.library._contents[song.key] = song
+        self.library.changed([song])
+        self.library.save()
+
+        library = self._reload()
+        assert len(library) == 10
+        assert fsnative("/dir/file_1.mp3") not in library
+        assert library[fsnative("/dir/renamed.mp3")]("title") == "Title 1"
+        library.destroy()
+
+    def test_incomplete_entry(self):
+        song = self.library[fsnative("/dir/file_1.mp3")]
+        song["title"] = "First"
+        self.library.changed([song])
+        self.library.save()
+        size = os.path.getsize(self.journal_fn)
+
+        song["title"] = "Second"
+        self.library.changed([song])
+        self.library.save()
+        os.truncate(self.journal_fn, os.path.getsize(self.journal_fn) - 3)
+
+        library = self._reload()
+        assert library[fsnative("/dir/file_1.mp3")]("title") == "First"
+        assert os.path.getsize(self.journal_fn) == size
+        library.destroy()
+
+    def test_other_snapshot(self):
+        song = self.library[fsnative("/dir/file_1.mp3")]
+        song["title"] = "Changed"
+        self.library.changed([song])
+        self.library.save()
+
+        other = SongLibrary()
+        other.add([_song(1, title="Other")])
+        other.save(self.filename)
+        other.destroy()
+
+        library = self._reload()
+        assert library[fsnative("/dir/file_1.mp3")]("title") == "Other"
+        assert not os.path.exists(self.journal_fn)
+        library.destroy()
+
+    def test_compact(self):
+        # enough songs for writing the library file to take a few steps
+        self.library.add([_song(i) for i in range(100, 5100)])
+        song = self.library[fsnative("/dir/file_1.mp3")]
+        song["title"] = "Changed"
+        self.library.changed([song])
+        self.library.save()
+        assert os.path.exists(self.journal_fn)
+
+        for _ in self.library.iter_compact():
+            song["title"] = "Changed Again"
+            self.library.changed([song])
+            self.library.save()
+        assert not os.path.exists(self.journal_fn)
+        assert self.journal.dirty
+
+        self.library.save()
+        library = self._reload()
+        assert library[fsnative("/dir/file_1.mp3")]("title") == "Changed Again"
+        library.destroy()
+
+    def test_disable(self):
+        self.library.disable_journal()
+        song = self.library[fsnative("/dir/file_1.mp3")]
+        song["title"] = "Changed"
+        self.library.changed([song])
+        self.library.save()
+        assert not os.path.exists(self.journal_fn)
+        library = self._reload()
+        assert library[fsnative("/dir/file_1.mp3")]("title") == "Changed"
+        library.destroy()
@@ -3,7 +3,10 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 
+from senf import fsnative
+
 from tests import TestCase, run_gtk_loop
+from quodlibet.formats import AudioFile
 from quodlibet.util import connect_obj
 from quodlibet.library import SongLibrarian, SongFileLibrary
 from quodlibet.library.base import Library
@@ -96,6 +99,42 @@ class TLibrarian(TestCase):
         self.assertEqual(self.changed_1, self.Frange(6, 12))
         self.assertEqual(self.changed_2, self.Frange(12, 18))
 
+    def test_coalescing(self):
+        self.librarian.enable_coalescing(1000)
+        self.lib1.add(self.Frange(12))
+        self.lib1.add(self.Frange(12, 14))
+        self.librarian.changed(self.Frange(10, 13))
+        self.lib1.remove([self.Fake(11)])
+        assert len(self.added_1) == 14
+        assert not self.added and not self.changed and not self.removed
+        self.librarian.flush()
+        assert self.added == self.Frange(11) + self.Frange(12, 14)
+        assert not self.changed and not self.removed
+        assert self.librarian.emissions_saved == 3
+
+        self.librarian.changed(self.Frange(2))
+        self.lib1.remove([self.Fake(0), self.Fake(1)])
+        self.lib1.add([self.Fake(1)])
+        self.librarian.changed([self.Fake(2)])
+        self.librarian.disable_coalescing()
+        assert self.removed == self.Frange(2)
+        assert self.added[-1:] == [self.Fake(1)]
+        assert self.changed == [self.Fake(2)]
+        assert self.librarian.emissions_received == 8
+        assert self.librarian.emissions_saved == 4
+
+        self.librarian.changed([self.Fake(3)])
+        assert self.changed[-1:] == [self.Fake(3)]
+
+    def test_coalescing_idle(self):
+        self.librarian.enable_coalescing()
+        self.lib1.add(self.Frange(3))
+        self.lib2.add(self.Frange(3, 6))
+        assert not self.added
+        run_gtk_loop()
+        assert self.added == self.Frange(6)
+        self.librarian.disable_coalescing()
+
     def test___getitem__(self):
         self.lib1.add(self.Frange(12))
         self.lib2.add(self.Frange(12, 24))
@@ -144,6 +183,20 @@ class TSongLibrarian(TLibrarian):
         self.assertEqual(sorted(self.librarian.tag_values(0)), [])
         assert not self.changed or self.added or self.removed
 
+    def test_tag_values_starting_with(self):
+        lib3 = self.Library("Three")
+        lib4 = self.Library("Four")
+        try:
+            lib3.add([AudioFile({"~filename": fsnative("/a"), "artist": "Ab\nb"})])
+            lib4.add([AudioFile({"~filename": fsnative("/b"), "artist": "ab\nAb"})])
+            starting_with = self.librarian.tag_values_starting_with
+            self.assertEqual(starting_with("artist", "a"), ["Ab", "ab"])
+            self.assertEqual(starting_with("artist", "", 2), ["Ab", "ab"])
+            self.assertEqual(self.librarian.tag_names(), {"~filename", "artist"})
+        finally:
+            lib3.destroy()
+            lib4.destroy()
+
     def test_rename(self):
         new = self.Fake(10)
         new.key = 30
@@ -5,8 +5,14 @@
 import os
 import shutil
 
-from quodlibet.formats import AudioFile
-from quodlibet.library.base import Library, iter_paths, PicklingMixin
+from quodlibet.formats import AudioFile, dump_audio_files, is_binary_format
+from quodlibet.library.base import (
+    Library,
+    iter_paths,
+    PicklingMixin,
+    PICKLE_BACKUP_SUFFIX,
+)
+from quodlibet.library.manifest import DirectoryManifest
 from quodlibet.util import connect_obj, is_windows
 from senf import fsnative
 from tests import TestCase, mkstemp, mkdtemp, skipIf, run_gtk_loop
@@ -305,6 +311,53 @@ class TPicklingMixin(TestCase):
         finally:
             os.unlink(filename)
 
+    def test_save_binary(self):
+        fd, filename = mkstemp()
+        os.close(fd)
+        try:
+            self.library.add(self.Frange(3))
+            self.library.save(filename)
+            with open(filename, "rb") as h:
+                assert is_binary_format(h.read())
+            assert not os.path.exists(filename + PICKLE_BACKUP_SUFFIX)
+        finally:
+            os.unlink(filename)
+
+    def test_migrate_pickle(self):
+        fd, filename = mkstemp()
+        os.write(fd, dump_audio_files(self.Frange(10)))
+        os.close(fd)
+        backup = filename + PICKLE_BACKUP_SUFFIX
+        try:
+            self.library.load(filename)
+            assert len(self.library) == 10
+            self.library.add(self.Frange(10, 15))
+            self.library.save()
+            assert os.path.exists(backup)
+
+            library = self.Library()
+            library.load(filename)
+            assert len(library) == 15
+
+            # a broken file falls back to the pickled backup
+            with open(filename, "wb") as h:
+                h.write(b"QLSONGS\x00broken")
+            library = self.Library()
+            library.load(filename)
+            assert len(library) == 10
+
+            # and so does one which can't be read
+            os.unlink(filename)
+            os.mkdir(filename)
+            library = self.Library()
+            library.load(filename)
+            assert len(library) == 10
+            os.rmdir(filename)
+        finally:
+            for path in [filename, backup, filename + ".not-valid"]:
+                if os.path.isfile(path):
+                    os.unlink(path)
+
 
 class Titer_paths(TestCase):
     def setUp(self):
@@ -370,3 +423,33 @@ class Titer_paths(TestCase):
         os.close(fd)
 
         assert list(iter_paths(self.root)) == []
+
+    def test_manifest(self):
+        manifest = DirectoryManifest()
+        manifest.MTIME_SLACK = 0
+        child = mkdtemp(dir=self.root)
+        fd, name = mkstemp(dir=child)
+        os.close(fd)
+
+        assert list(iter_paths(self.root, manifest=manifest)) == [name]
+        assert not len(manifest)
+        manifest.commit()
+        assert len(manifest) == 2
+
+        assert list(iter_paths(self.root, manifest=manifest)) == []
+        assert manifest.skipped_dirs == 2
+        assert manifest.skipped_files == 1
+
+        fd, other = mkstemp(dir=child)
+        os.close(fd)
+        assert set(iter_paths(self.root, manifest=manifest)) == {name, other}
+
+    def test_manifest_exclude(self):
+        manifest = DirectoryManifest()
+        manifest.MTIME_SLACK = 0
+        fd, name = mkstemp(dir=self.root)
+        os.close(fd)
+
+        assert list(iter_paths(self.root, [name], manifest=manifest)) == []
+        manifest.commit()
+        assert list(iter_paths(self.root, manifest=manifest)) == [name]
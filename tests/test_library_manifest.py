@@ -0,0 +1,68 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+
+import os
+import shutil
+
+from quodlibet.library.manifest import DirectoryManifest
+from tests import TestCase, mkdtemp
+
+
+class TDirectoryManifest(TestCase):
+    def setUp(self):
+        self.root = os.path.realpath(mkdtemp())
+        self.manifest = DirectoryManifest()
+        self.manifest.MTIME_SLACK = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_pending(self):
+        stat = os.stat(self.root)
+        self.manifest.record(self.root, stat, 3, ["a"])
+        assert not self.manifest.unchanged(self.root, stat)
+        self.manifest.discard()
+        assert not self.manifest.commit()
+
+        self.manifest.record(self.root, stat, 3, ["a"])
+        assert self.manifest.commit()
+        assert self.manifest.dirty
+        assert self.manifest.unchanged(self.root, stat)
+        assert self.manifest.subdirs(self.root) == ["a"]
+        assert self.manifest.skipped_files == 3
+
+    def test_changed(self):
+        stat = os.stat(self.root)
+        self.manifest.record(self.root, stat, 0, [])
+        self.manifest.commit()
+        os.mkdir(os.path.join(self.root, "new"))
+        os.utime(self.root, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert not self.manifest.unchanged(self.root, os.stat(self.root))
+
+    def test_recent(self):
+        self.manifest.MTIME_SLACK = 2.0
+        stat = os.stat(self.root)
+        self.manifest.record(self.root, stat, 0, [])
+        self.manifest.commit()
+        assert not self.manifest.unchanged(self.root, stat)
+
+    def test_save_load(self):
+        path = self.root + "/\udcff"
+        stat = os.stat(self.root)
+        self.manifest.record(path, stat, 2, ["\udcfe"])
+        self.manifest.commit()
+        filename = os.path.join(self.root, "songs.dirs")
+        self.manifest.save(filename, 10)
+        assert not self.manifest.dirty
+
+        other = DirectoryManifest()
+        other.MTIME_SLACK = 0
+        other.load(filename, 10)
+        assert len(other) == 1
+        assert other.unchanged(path, stat)
+        assert other.subdirs(path) == ["\udcfe"]
+
+        other.load(filename, 11)
+        assert not len(other)
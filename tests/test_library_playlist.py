@@ -154,6 +154,97 @@ class TPlaylistLibrary(TestCase):
         assert set(removed) == set(all_contents), "Not everything removed from lib"
         assert not pl, f"PL should be empty, has: {list(pl)}"
 
+    def test_playlists_featuring(self):
+        pl = self.library[PL_NAME]
+        songs = sorted(self.underlying)
+        featured = songs[-3:]
+        assert all(list(self.library.playlists_featuring(s)) == [pl] for s in featured)
+        assert not list(self.library.playlists_featuring(songs[0]))
+
+        other = self.library.create("other")
+        other.extend([songs[0], featured[0], featured[0]])
+        assert list(self.library.playlists_featuring(featured[0])) == [pl, other]
+        assert featured[0]("~playlists") == f"{PL_NAME}\nother"
+
+        other.remove_songs([featured[0]], leave_dupes=True)
+        assert list(self.library.playlists_featuring(featured[0])) == [pl, other]
+        other.remove_songs([featured[0]])
+        assert list(self.library.playlists_featuring(featured[0])) == [pl]
+
+        self.library.recreate(other, [songs[1]])
+        assert not list(self.library.playlists_featuring(songs[0]))
+        assert list(self.library.playlists_featuring(songs[1])) == [other]
+
+        other.delete()
+        assert not list(self.library.playlists_featuring(songs[1]))
+        assert other.pl_lib is None
+        other.append(songs[1])
+        assert not list(self.library.playlists_featuring(songs[1]))
+
+        self.underlying.remove([featured[1]])
+        assert not list(self.library.playlists_featuring(featured[1]))
+
+    def test_lazy(self):
+        songs = list(self.library[PL_NAME])
+        lazy_lib = PlaylistLibrary(self.underlying, self.library.pl_dir, lazy=True)
+        try:
+            pl = lazy_lib[PL_NAME]
+            assert not pl.loaded
+            assert len(pl) == 3
+            pl.load()
+            assert pl.loaded
+            assert list(pl) == songs
+            assert list(lazy_lib.playlists_featuring(songs[0])) == [pl]
+        finally:
+            lazy_lib.destroy()
+
+    def test_lazy_featuring(self):
+        songs = sorted(self.underlying)
+        self.library.create_from_songs(songs[:2], title="other")
+        lazy_lib = PlaylistLibrary(self.underlying, self.library.pl_dir, lazy=True)
+        try:
+            pl, other = lazy_lib[PL_NAME], lazy_lib["other"]
+            assert len(other) == 2
+            assert not pl.loaded
+            assert not other.loaded
+
+            assert list(lazy_lib.playlists_featuring(songs[0])) == [other]
+            assert other.loaded
+            assert pl.loaded
+        finally:
+            lazy_lib.destroy()
+
+    def test_lazy_songs_removed(self):
+        songs = list(self.library[PL_NAME])
+        lazy_lib = PlaylistLibrary(self.underlying, self.library.pl_dir, lazy=True)
+        try:
+            pl = lazy_lib[PL_NAME]
+            self.underlying.remove([songs[-1]])
+            assert pl.loaded
+            assert list(pl) == songs[:-1]
+        finally:
+            lazy_lib.destroy()
+
+    def test_lazy_file_changed(self):
+        songs = list(self.library[PL_NAME])
+        lazy_lib = PlaylistLibrary(self.underlying, self.library.pl_dir, lazy=True)
+        try:
+            pl = lazy_lib[PL_NAME]
+            self.library[PL_NAME].remove_songs(songs[:1])
+            self.library[PL_NAME].write()
+            # make sure the mtime differs
+            path = self.library[PL_NAME].path
+            os.utime(path, (0, os.path.getmtime(path) + 10))
+            assert list(pl) == songs[1:]
+
+            # membership lookups read the playlists listing the song
+            other = PlaylistLibrary(self.underlying, self.library.pl_dir, lazy=True)
+            assert list(other.playlists_featuring(songs[1])) == [other[PL_NAME]]
+            assert other[PL_NAME].loaded
+            other.destroy()
+        finally:
+            lazy_lib.destroy()
+
     def test_misc(self):
         # It shouldn't implement FileLibrary etc
         assert not getattr(self.library, "filename", None)
@@ -3,11 +3,15 @@
 # the Free Software Foundation; either version 2 of the License, or
 # (at your option) any later version.
 import os
+import shutil
 
 from quodlibet import config
-from quodlibet.formats import AudioFileError
+from quodlibet.formats import AudioFile, AudioFileError
 from quodlibet.library import SongLibrary, SongFileLibrary
-from tests import get_data_path, run_gtk_loop
+from quodlibet.query import Query
+from quodlibet.util import human_sort_key
+from senf import fsnative
+from tests import get_data_path, run_gtk_loop, mkdtemp
 from tests.helper import get_temp_copy, capture_output
 from tests.test_library_libraries import (
     TLibrary,
@@ -58,6 +62,146 @@ class TSongLibrary(TLibrary):
         self.assertEqual(sorted(self.library.tag_values(0)), [])
         assert not self.changed or self.added or self.removed
 
+    def test_numeric_columns(self):
+        songs = [AudioFile(song) for song in NUMERIC_SONGS]
+        self.library.add(songs)
+        columns = self.library.numeric_columns()
+        assert len(columns.songs) == len(songs)
+        lengths = dict(zip(columns.songs, columns.column("~#length"), strict=True))
+        assert lengths == {song: song("~#length") for song in songs}
+        assert [v != v for v in columns.column("~#tracks")] == [
+            song("~#tracks", None) is None for song in columns.songs
+        ]
+
+        song = songs[0]
+        song["~#length"] = 42
+        self.library.changed([song])
+        index = columns.songs.index(song)
+        assert columns.column("~#length")[index] == 42
+
+        self.library.remove([song])
+        assert song not in columns.songs
+
+    def test_numeric_columns_rating_default(self):
+        config.init()
+        try:
+            songs = [
+                AudioFile({"~filename": fsnative("/dir/a.mp3"), "~#rating": 1.0}),
+                AudioFile({"~filename": fsnative("/dir/b.mp3")}),
+            ]
+            self.library.add(songs)
+            columns = self.library.numeric_columns()
+            assert columns.get(songs, "~#rating") == [1.0, config.RATINGS.default]
+            default = config.RATINGS.default
+            config.RATINGS.default = 0.25
+            try:
+                assert columns.get(songs, "~#rating") == [1.0, 0.25]
+            finally:
+                config.RATINGS.default = default
+        finally:
+            config.quit()
+
+    def test_value_counts_synthetic(self):
+        config.init()
+        default = config.RATINGS.default
+        try:
+            song = AudioFile({"~filename": fsnative("/dir/a.mp3")})
+            self.library.add([song])
+            counts = self.library.value_counts()
+            assert counts.counts("~#rating") == {default: 1}
+            config.RATINGS.default = 0.25
+            assert counts.counts("~#rating") == {0.25: 1}
+        finally:
+            config.RATINGS.default = default
+            config.quit()
+
+    def test_value_counts(self):
+        songs = [
+            AudioFile({"artist": "Abba\nbar", "title": "a"}),
+            AudioFile({"artist": "abc", "performer": "Abba", "title": "b"}),
+            AudioFile({"artist": "Ab"}),
+        ]
+        for i, song in enumerate(songs):
+            song["~filename"] = fsnative(f"/dir/{i}.mp3")
+        self.library.add(songs)
+        counts = self.library.value_counts()
+        assert counts.counts("artist") == {"Abba": 1, "bar": 1, "abc": 1, "Ab": 1}
+        assert counts.counts("~people")["Abba"] == 2
+        assert self.library.tag_values_starting_with("~people", "ab") == [
+            "Ab",
+            "Abba",
+            "abc",
+        ]
+        assert self.library.tag_values_starting_with("artist", "AB", 2) == [
+            "Ab",
+            "Abba",
+        ]
+        names = {"~filename", "artist", "title"}
+        assert self.library.tag_names() == names | {"performer"}
+
+        songs[1]["artist"] = "bar"
+        del songs[1]["performer"]
+        self.library.changed([songs[1]])
+        assert counts.counts("~people") == {"Abba": 1, "bar": 2, "Ab": 1}
+        assert self.library.tag_values_starting_with("artist", "ab") == [
+            "Ab",
+            "Abba",
+        ]
+        assert self.library.tag_names() == names
+
+        self.library.remove(songs[:2])
+        assert self.library.tag_values("artist") == {"Ab"}
+        assert self.library.tag_names() == {"~filename", "artist"}
+
+    def test_sort_keys(self):
+        songs = [AudioFile(song) for song in NUMERIC_SONGS]
+        self.library.add(songs)
+        sort_keys = self.library.sort_keys()
+        for tag in ["date", "~#length", "artistsort", "", "~filename"]:
+            func = AudioFile.sort_by_func(tag) if tag else lambda s: s.sort_key
+            assert sort_keys.get(songs, tag) == list(map(func, songs))
+
+        song = songs[0]
+        assert sort_keys.key_func("date")(song) == human_sort_key("100")
+        song["date"] = "2000"
+        self.library.changed([song])
+        assert sort_keys.get([song], "date") == [human_sort_key("2000")]
+
+        other = AudioFile(song)
+        other["date"] = "1"
+        assert sort_keys.get([other], "date") == [human_sort_key("1")]
+        other["date"] = "2"
+        assert sort_keys.get([other], "date") == [human_sort_key("2")]
+
+    def test_sort_keys_order(self):
+        songs = [AudioFile(song) for song in NUMERIC_SONGS]
+        self.library.add(songs)
+        sort_keys = self.library.sort_keys()
+        for tags in [
+            [("", False), ("date", False), ("~#length", False)],
+            [("", True), ("originaldate", False), ("~#rating", True)],
+        ]:
+            expected = list(range(len(songs)))
+            for tag, reverse in tags:
+                keys = sort_keys.get(songs, tag)
+                expected.sort(key=keys.__getitem__, reverse=reverse)
+            assert sort_keys.order(songs, tags) == expected
+
+    def test_query_numeric(self):
+        self.library.add(NUMERIC_SONGS)
+        self.library.columnar_queries = True
+        for text in ["#(length > 3)", "|(#(tracks = 6), #(bitrate != 200))"]:
+            expected = Query(text)._match.filter(NUMERIC_SONGS)
+            assert set(self.library.query(text)) == set(expected)
+
+    def test_query_numeric_unannounced(self):
+        song = AudioFile({"~filename": fsnative("/dir/a.mp3"), "~#playcount": 1})
+        self.library.add([song])
+        query = Query("#(playcount > 1)")
+        assert query.filter(self.library) == []
+        song["~#playcount"] = 2
+        assert query.filter(self.library) == [song]
+
 
 class TSongFileLibrary(TSongLibrary):
     Fake = FakeSongFile
@@ -163,6 +307,85 @@ class TSongFileLibrary(TSongLibrary):
         finally:
             os.unlink(filename)
 
+    def test_scan_parallel(self):
+        config.init()
+        root = os.path.realpath(mkdtemp())
+        try:
+            config.set("library", "scan_workers", 4)
+            names = ["empty.flac", "empty.ogg", "silence-44-s.mp3", "test.m4a"]
+            for i, name in enumerate(names * 10):
+                dest = os.path.join(root, f"{i}_{name}")
+                shutil.copy(get_data_path(name), dest)
+            shutil.copy(get_data_path("image.png"), root)
+
+            for _ in self.library.scan([fsnative(root)]):
+                pass
+            assert len(self.library) == 40
+            assert len(self.added) == 40
+            for song in self.added:
+                assert self.library.contains_filename(song("~filename"))
+
+            # files which got added in the meantime don't get added again
+            class FakeTask:
+                def update(self, fraction):
+                    pass
+
+            paths = [song("~filename") for song in self.added[:2]]
+            for _ in self.library._load_parallel(paths, 2, FakeTask()):
+                pass
+            assert len(self.library) == 40
+            assert len(self.added) == 40
+        finally:
+            shutil.rmtree(root)
+            config.quit()
+
+    def test_rebuild_manifest(self):
+        config.init()
+        root = os.path.realpath(mkdtemp())
+        try:
+            dest = os.path.join(root, "empty.flac")
+            shutil.copy(get_data_path("empty.flac"), dest)
+            manifest = self.library.enable_manifest()
+            manifest.MTIME_SLACK = 0
+            for _ in self.library.rebuild([fsnative(root)]):
+                pass
+            assert len(self.added) == 1
+
+            # changed in place, the directory stays the same
+            mtime = os.path.getmtime(dest)
+            os.utime(dest, (mtime + 10, mtime + 10))
+            for _ in self.library.rebuild([fsnative(root)]):
+                pass
+            assert self.changed == self.added
+            assert manifest.skipped_dirs == 1
+        finally:
+            shutil.rmtree(root)
+            config.quit()
+
+    def test_load_parallel_error(self):
+        class FakeTask:
+            def update(self, fraction):
+                pass
+
+        paths = [self.__get_file() for _ in range(4)]
+        load_filename = self.library.load_filename
+
+        def broken_load(path):
+            if path == paths[1]:
+                raise Exception("broken")
+            return load_filename(path)
+
+        self.library.load_filename = broken_load
+        try:
+            with capture_output():
+                for _ in self.library._load_parallel(paths, 2, FakeTask()):
+                    pass
+            assert len(self.added) == 3
+            assert not self.library.contains_filename(paths[1])
+        finally:
+            for path in paths:
+                os.unlink(path)
+
     def test_add_filename_normalize_path(self):
         if not os.name == "nt":
             return
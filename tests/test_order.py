@@ -34,6 +34,15 @@ class TOrderWeighted(TestCase):
         assert scores[r2] > scores[r1]
         assert scores[r3] > scores[r2]
 
+    def test_unrated(self):
+        pl = PlaylistModel()
+        pl.set([r0, AudioFile({"~#rating": 0})])
+        order = OrderWeighted()
+        first = order.next_explicit(pl, None)
+        second = order.next_explicit(pl, first)
+        assert {pl[first][0], pl[second][0]} == set(pl.values())
+        assert order.next_explicit(pl, second) is None
+
 
 class TOrderShuffle(TestCase):
     def test_remaining(self):
@@ -49,6 +58,46 @@ class TOrderShuffle(TestCase):
         cur = order.next_explicit(pl, cur)
         self.assertEqual(len(order.remaining(pl)), len(songs))
 
+    def test_inserted_removed(self):
+        order = OrderShuffle()
+        pl = PlaylistModel()
+        pl.set([r0, r1, r2])
+        cur = order.next_explicit(pl, None)
+        played = [pl.get_value(cur)]
+        pl.append([r3])
+        pl.insert(0, [r1])
+        pl.remove(pl.get_iter_first())
+        while True:
+            cur = order.next_explicit(pl, cur)
+            if cur is None:
+                break
+            played.append(pl.get_value(cur))
+        self.assertEqual(sorted(played), sorted([r0, r1, r2, r3]))
+
+    def test_invalidate_weights(self):
+        order = OrderShuffle()
+        pl = PlaylistModel()
+        pl.set([r0, r1])
+        cur = order.next_explicit(pl, None)
+        picker = order._picker
+        order.invalidate_weights()
+        cur = order.next_explicit(pl, cur)
+        assert order._picker is not picker
+        assert order.next_explicit(pl, cur) is None
+
+    def test_previous(self):
+        order = OrderShuffle()
+        pl = PlaylistModel()
+        pl.set([r0, r1])
+        first = order.next_explicit(pl, None)
+        second = order.next_explicit(pl, first)
+        assert pl.get_path(first) != pl.get_path(second)
+        assert order.previous_explicit(pl, second) is first
+        # the first one can get picked again
+        third = order.next_explicit(pl, second)
+        self.assertEqual(pl.get_path(third), pl.get_path(first))
+        assert order.next_explicit(pl, third) is None
+
 
 class TOrderOneSong(TestCase):
     def test_remaining(self):
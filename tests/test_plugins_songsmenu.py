@@ -120,6 +120,19 @@ class TSongsMenuPlugins(TestCase):
         self.create_plugin(name="Name", desc="Desc", funcs=["plugin_song"])
         self.handler.menu(None, [AudioFile()])
 
+    def test_disable_calls_plugin_disabled(self):
+        class DisabledPlugin(FakeSongsMenuPlugin):
+            disabled = 0
+
+            @classmethod
+            def plugin_disabled(cls):
+                cls.disabled += 1
+
+        plugin = Plugin(DisabledPlugin)
+        self.handler.plugin_enable(plugin)
+        self.handler.plugin_disable(plugin)
+        assert DisabledPlugin.disabled == 1
+
     def test_handling_songs_without_confirmation(self):
         plugin = Plugin(FakeSongsMenuPlugin)
         self.handler.plugin_enable(plugin)
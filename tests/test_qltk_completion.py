@@ -8,9 +8,11 @@ from tests import TestCase
 from gi.repository import Gtk
 
 from quodlibet import config
+from quodlibet.formats import AudioFile
 from quodlibet.library import SongLibrary
 from quodlibet.qltk.completion import EntryWordCompletion, LibraryTagCompletion
 from quodlibet.qltk.completion import LibraryValueCompletion
+from senf import fsnative
 
 
 class TEntryWordCompletion(TestCase):
@@ -47,3 +49,24 @@ class TLibraryValueCompletion(TestCase):
         self.assertEqual(w.get_entry(), e)
         self.assertEqual(e.get_completion(), w)
         e.destroy()
+
+    def test_attach(self):
+        library = SongLibrary()
+        library.add(
+            [
+                AudioFile({"~filename": fsnative("/a"), "artist": "Abba"}),
+                AudioFile({"~filename": fsnative("/b"), "artist": "Bee"}),
+            ]
+        )
+        w = LibraryValueCompletion("artist", library)
+        e = Gtk.Entry()
+        w.attach(e)
+        e.set_text("ab")
+        assert [row[0] for row in w.get_model()] == ["Abba"]
+
+        # without a tag the entry isn't followed anymore
+        w.set_tag(None, library)
+        e.set_text("b")
+        assert [row[0] for row in w.get_model()] == ["Abba"]
+        e.destroy()
+        library.destroy()
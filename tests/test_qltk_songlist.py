@@ -198,6 +198,33 @@ class TSongList(TestCase):
 
         self.assertEqual(self.songlist.get_songs(), [song] * 4)
 
+    def test_add_songs_sorted_batch(self):
+        def song(i):
+            return AudioFile({"~filename": fsnative(f"/dev/{i}"), "foo": str(i)})
+
+        self.songlist.set_column_headers(["foo"])
+        self.songlist.toggle_column_sort(self.songlist.get_columns()[0])
+        self.songlist.set_songs([song(i) for i in range(0, 20, 4)])
+        self.songlist.add_songs([song(i) for i in [19, 3, 1, 8, 2, 0, 13]])
+        values = [int(s("foo")) for s in self.songlist.get_songs()]
+        assert values == [0, 0, 1, 2, 3, 4, 8, 8, 12, 13, 16, 19]
+
+    def test_add_songs_detached(self):
+        def song(i):
+            return AudioFile({"~filename": fsnative(f"/dev/{i}"), "foo": str(i)})
+
+        self.songlist._DETACH_ADDED = 2
+        self.songlist.set_column_headers(["foo"])
+        self.songlist.toggle_column_sort(self.songlist.get_columns()[0])
+        self.songlist.set_songs([song(i) for i in range(0, 20, 4)])
+        self.songlist.set_cursor(Gtk.TreePath.new_first())
+        selected = self.songlist.get_selected_songs()
+        self.songlist.add_songs([song(i) for i in [19, 3, 1]])
+        values = [int(s("foo")) for s in self.songlist.get_songs()]
+        assert values == [0, 1, 3, 4, 8, 12, 16, 19]
+        assert self.songlist.get_model() is not None
+        assert self.songlist.get_selected_songs() == selected
+
     def test_remove_songs(self):
         song = AudioFile({"~filename": "/dev/null"})
         song.sanitize()
@@ -474,6 +474,28 @@ class TQuery(TestCase):
         assert q.filter([self.s1, self.s2]), [self.s1 == self.s2]
         assert q.filter(iter([self.s1, self.s2])), [self.s1 == self.s2]
 
+    def test_compiled_matches_nodes(self):
+        songs = [self.s1, self.s2, self.s3]
+        queries = [
+            "piman",
+            "!mu",
+            "&(artist=piman, #(playcount > 10))",
+            "|(#(track = 12), title=/^Å/)",
+            "#(10 < skipcount)",
+            "#(3:00 < length < 4:00)",
+            "#(playcount > 2 * skipcount)",
+            "#(lastplayed > 1 week)",
+            "#(date > 2005-07-19)",
+            "~dirname=öäü",
+            "mountpoint=foü",
+            "~people=mu",
+        ]
+        for text in queries:
+            query = Query(text)
+            expected = query._match.filter(songs)
+            assert query.filter(songs) == expected, text
+            assert [s for s in songs if query.search(s)] == expected, text
+
     def test_match_all(self):
         assert Query("").matches_all
         assert Query("    ").matches_all
@@ -581,3 +603,9 @@ class TestQuery_get_type:
     def test_green(self):
         for p in ["a = /b/", "&(a = b, c = d)", "/abc/", "!x", "!&(abc, def)"]:
             assert Query(p).type == QueryType.VALID
+
+    def test_words(self):
+        assert Query("a test").words == ["a", "test"]
+        assert Query("a.b* (c").words == ["a.b*", "(c"]
+        assert Query("a = /b/").words is None
+        assert Query("|(sa#").words is None
@@ -10,7 +10,7 @@ import unicodedata
 
 from tests import TestCase
 
-from quodlibet.unisearch import compile
+from quodlibet.unisearch import compile, fold, literal
 from quodlibet.unisearch.db import diacritic_for_letters
 from quodlibet.unisearch.parser import re_replace_literals, re_add_variants
 
@@ -190,3 +190,21 @@ class TCompileMatch(TestCase):
 
         with self.assertRaises(ValueError):
             compile("(F", asym=True)
+
+    def test_fold(self):
+        assert fold("Motörhead") == "motorhead"
+        assert fold("\u00c5NGSTR\u00d6M") == "angstrom"
+        assert fold("\u0131") == "i"
+        for letter in "adeiloz":
+            for text in ["\u00f8", "\u0111", "\u0142", "\u00e9", "\u017e"]:
+                if compile(letter, asym=True)(text):
+                    assert fold(letter) in fold(text)
+
+    def test_literal(self):
+        assert literal("foo") == ("foo", False, False)
+        assert literal("^foo$") == ("foo", True, True)
+        assert literal("a\\.b$") == ("a.b", False, True)
+        assert literal("") == ("", False, False)
+        assert literal("a.b") is None
+        assert literal("a|b") is None
+        assert literal("(a") is None
@@ -15,11 +15,15 @@ import pytest
 from quodlibet import config, app
 from quodlibet.formats import AudioFile as Fakesong
 from quodlibet.formats._audio import NUMERIC_ZERO_DEFAULT, PEOPLE, AudioFile
+from quodlibet.library import SongLibrary
 from quodlibet.library.file import FileLibrary
 from quodlibet.library.playlist import PlaylistLibrary
 from quodlibet.util import format_rating
+from quodlibet.util.logging import get_content
 from quodlibet.util.collection import (
+    NUM_DEFAULT_FUNCS,
     Album,
+    Collection,
     Playlist,
     avg,
     bayesian_average,
@@ -102,6 +106,20 @@ class TAlbum(TestCase):
 
         assert album.comma("~peoplesort") == "aa, a, b"
 
+    def test_search_text(self):
+        songs = [
+            Fakesong({"album": "Ça Va", "artist": "Björk"}),
+            Fakesong({"album": "Ça Va", "performer": "Foo"}),
+        ]
+
+        album = Album(songs[0])
+        album.songs = set(songs)
+        assert album.search_text == "bjork\nfoo\nca va"
+
+        album.songs.remove(songs[1])
+        album.finalize()
+        assert album.search_text == "bjork\nca va"
+
     def test_tied_tags(self):
         songs = [
             Fakesong({"artist": "a", "title": "c"}),
@@ -167,6 +185,51 @@ class TAlbum(TestCase):
         assert album.get("~#rating") == 0.3
         assert album.get("~#originalyear") == 2002
 
+    def test_numeric_values_with_columns(self):
+        songs = [AudioFile(song) for song in NUMERIC_SONGS]
+        library = SongLibrary()
+        library.add(songs)
+        album = Album(songs[0])
+        album.songs = set(songs)
+        other = Album(songs[0])
+        other.songs = set(songs)
+        other.numeric_columns = library.numeric_columns()
+
+        keys = ["~#tracks", "~#discs", "~#bitrate", "~#length:avg", "~#foo"]
+        keys += ["~#" + key for key in NUM_DEFAULT_FUNCS]
+        for key in keys:
+            assert album(key) == other(key), key
+
+        songs[0]["~#length"] = 100
+        library.changed([songs[0]])
+        assert album("~#length") == other("~#length") == 12
+        album.finalize()
+        other.finalize()
+        length = sum(song("~#length") for song in songs)
+        assert album("~#length") == other("~#length") == length
+        library.destroy()
+
+    def test_cache_size(self):
+        songs = [Fakesong({"artist": "a", "title": "b", "genre": "c"})]
+        config.set("browsers", "collection_cache_size", 2)
+        Collection._configured_cache_size = None
+        try:
+            album = Album(songs[0])
+            # only read once
+            config.reset("browsers", "collection_cache_size")
+            Album(songs[0])
+            assert Collection._configured_cache_size == 2
+        finally:
+            Collection._configured_cache_size = None
+        album.songs = set(songs)
+        assert album("artist") == "a"
+        songs[0]["artist"] = "x"
+        assert album("title") == "b"
+        assert album("artist") == "a"
+        assert album("genre") == "c"
+        assert album("title") == "b"
+        assert album("artist") == "x"
+
     def test_numeric_comma(self):
         songs = [
             Fakesong(
@@ -725,6 +788,49 @@ class TXSPFBackedPlaylist(TFileBackedPlaylist):
                 lines = f.readlines()
                 assert len(lines) >= 1 + 2 + len(pl), "Was expecting a semi-pretty-file"
 
+    def _songs_lib(self):
+        songs = [
+            AudioFile(
+                {
+                    "~filename": fsnative(os.path.join(self.temp, f"{i}.mp3")),
+                    "~mountpoint": fsnative(self.temp),
+                    "title": f"Title {i}",
+                    "~#length": 1,
+                }
+            )
+            for i in range(3)
+        ]
+        songs_lib = FileLibrary()
+        songs_lib.add(songs)
+        return songs_lib, songs
+
+    def test_load_missing_track(self):
+        songs_lib, songs = self._songs_lib()
+        with self.wrap("playlist") as pl:
+            pl.extend(songs)
+            pl.write()
+            songs_lib.remove(songs[:1])
+            read = XSPFBackedPlaylist(
+                self.temp, pl.filename_for(pl.name), songs_lib=songs_lib
+            )
+            assert list(read) == [songs[0]("~filename")] + songs[1:]
+            warnings = [m for m in get_content() if "Couldn't find" in m]
+            assert "Perhaps its metadata will help" in warnings[-1]
+            assert "Title 0" in warnings[-1]
+
+    def test_load_lazy(self):
+        songs_lib, songs = self._songs_lib()
+        with self.wrap("playlist") as pl:
+            pl.extend(songs)
+            pl.write()
+            read = XSPFBackedPlaylist(
+                self.temp, pl.filename_for(pl.name), songs_lib=songs_lib, lazy=True
+            )
+            assert not read.loaded
+            assert len(read) == len(songs)
+            assert list(read) == songs
+            assert read.loaded
+
     def test_load_legacy_format_to_xspf(self):
         playlist_fn = "old"
         songs_lib = FileLibrary()
@@ -4,7 +4,7 @@
 # (at your option) any later version.
 
 from tests import TestCase
-from quodlibet.util.collections import HashedList, DictProxy
+from quodlibet.util.collections import HashedList, DictProxy, FenwickTree
 
 
 class TDictMixin(TestCase):
@@ -98,6 +98,27 @@ class THashedList(TestCase):
         l = HashedList()
         assert 1 not in l
 
+    def test_added_removed(self):
+        events = []
+
+        class Observed(HashedList):
+            def _added(self, item):
+                events.append(("added", item))
+
+            def _removed(self, item):
+                events.append(("removed", item))
+
+        l = Observed([1, 2, 2])
+        assert events == [("added", 1), ("added", 2)]
+        del events[:]
+        l[1] = l[2]
+        l.remove(2)
+        assert not events
+        l.append(3)
+        l.remove(2)
+        del l[0]
+        assert events == [("added", 3), ("removed", 2), ("removed", 1)]
+
     def test_length(self):
         l = HashedList([1, 2, 3, 3])
         self.assertEqual(len(l), 4)
@@ -148,3 +169,31 @@ class THashedList(TestCase):
         assert not l.has_duplicates()
         l.append(5)
         assert l.has_duplicates()
+
+
+class TFenwickTree(TestCase):
+    def test_sum(self):
+        values = [3, 0, 1, 4, 1, 5, 9, 2, 6]
+        tree = FenwickTree(values[:4])
+        for value in values[4:]:
+            tree.append(value)
+        assert list(tree) == values
+        assert len(tree) == len(values)
+        for end in range(len(values) + 1):
+            assert tree.sum(end) == sum(values[:end])
+        assert tree.sum() == sum(values)
+
+    def test_set(self):
+        tree = FenwickTree([1, 2, 3])
+        tree[1] = 5
+        tree[-1] = 0
+        assert list(tree) == [1, 5, 0]
+        assert tree.sum(2) == 6
+        assert tree.sum() == 6
+
+    def test_find(self):
+        values = [0, 2, 0, 1, 3]
+        tree = FenwickTree(values)
+        found = [tree.find(target) for target in range(sum(values) + 1)]
+        assert found == [1, 1, 3, 4, 4, 4, 5]
+        assert FenwickTree().find(0) == 0